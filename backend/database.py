@@ -1,9 +1,124 @@
-from sqlalchemy import create_engine
+import time
+
+from sqlalchemy import create_engine, event
+from sqlalchemy.engine import make_url
 from sqlalchemy.orm import sessionmaker, declarative_base
+from sqlalchemy.pool import AsyncAdaptedQueuePool, QueuePool
+
+from backend import config
+
+DATABASE_URL = config.DATABASE_URL
+
+
+# ----------------------
+# Pool checkout metrics
+# ----------------------
+_pool_wait_hooks = []
+pool_wait_stats = {"checkouts": 0, "total_wait_seconds": 0.0, "max_wait_seconds": 0.0}
+
+
+def add_pool_wait_hook(hook):
+    """Register hook(wait_seconds) called after every pool checkout."""
+    _pool_wait_hooks.append(hook)
+
+
+def _report_pool_wait(wait: float):
+    pool_wait_stats["checkouts"] += 1
+    pool_wait_stats["total_wait_seconds"] += wait
+    if wait > pool_wait_stats["max_wait_seconds"]:
+        pool_wait_stats["max_wait_seconds"] = wait
+    for hook in _pool_wait_hooks:
+        hook(wait)
+
+
+class _TimedPoolMixin:
+    """Measures how long each checkout waited for a pooled connection."""
+
+    def _do_get(self):
+        start = time.perf_counter()
+        try:
+            return super()._do_get()
+        finally:
+            _report_pool_wait(time.perf_counter() - start)
+
+
+class TimedQueuePool(_TimedPoolMixin, QueuePool):
+    pass
+
+
+class TimedAsyncAdaptedQueuePool(_TimedPoolMixin, AsyncAdaptedQueuePool):
+    pass
+
+
+# ----------------------
+# Engine construction
+# ----------------------
+def _is_sqlite(url: str) -> bool:
+    return make_url(url).get_backend_name() == "sqlite"
+
+
+def _is_sqlite_memory(url: str) -> bool:
+    database = make_url(url).database
+    return not database or database == ":memory:"
+
 
-DATABASE_URL = "sqlite:///./flightbooking.db"
+def _engine_options(url: str, async_mode: bool = False) -> dict:
+    """Pooling and driver options for the configured backend."""
+    if _is_sqlite(url) and _is_sqlite_memory(url):
+        # single shared in-memory database; SQLAlchemy's default StaticPool/SingletonThreadPool
+        return {} if async_mode else {"connect_args": {"check_same_thread": False}}
 
-engine = create_engine(DATABASE_URL, connect_args={"check_same_thread": False})
+    options = {
+        "poolclass": TimedAsyncAdaptedQueuePool if async_mode else TimedQueuePool,
+        "pool_size": config.DB_POOL_SIZE,
+        "max_overflow": config.DB_MAX_OVERFLOW,
+        "pool_timeout": config.DB_POOL_TIMEOUT,
+        "pool_recycle": config.DB_POOL_RECYCLE,
+    }
+    if _is_sqlite(url):
+        options["connect_args"] = {"timeout": config.SQLITE_BUSY_TIMEOUT_MS / 1000.0}
+        if not async_mode:
+            options["connect_args"]["check_same_thread"] = False
+    else:
+        # Postgres-ready pooled mode: validate connections handed out of the pool
+        options["pool_pre_ping"] = config.DB_POOL_PRE_PING
+    return options
+
+
+def _sqlite_pragmas(url: str):
+    pragmas = [
+        f"PRAGMA synchronous={config.SQLITE_SYNCHRONOUS}",
+        f"PRAGMA busy_timeout={config.SQLITE_BUSY_TIMEOUT_MS}",
+        f"PRAGMA cache_size={config.SQLITE_CACHE_SIZE}",
+        f"PRAGMA mmap_size={config.SQLITE_MMAP_SIZE}",
+    ]
+    if not _is_sqlite_memory(url):
+        # WAL lets readers run alongside the writer (bookings vs. demand simulator)
+        pragmas.insert(0, f"PRAGMA journal_mode={config.SQLITE_JOURNAL_MODE}")
+    return pragmas
+
+
+def _install_sqlite_pragmas(sync_engine, url: str):
+    pragmas = _sqlite_pragmas(url)
+
+    @event.listens_for(sync_engine, "connect")
+    def _apply_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        try:
+            for pragma in pragmas:
+                cursor.execute(pragma)
+        finally:
+            cursor.close()
+
+
+def build_engine(url: str = DATABASE_URL):
+    new_engine = create_engine(url, **_engine_options(url))
+    if _is_sqlite(url):
+        _install_sqlite_pragmas(new_engine, url)
+    return new_engine
+
+
+engine = build_engine()
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 Base = declarative_base()
 
@@ -13,3 +128,42 @@ def get_db():
         yield db
     finally:
         db.close()
+
+
+def _async_url(url: str) -> str:
+    """Map a sync driver URL to its asyncio driver (aiosqlite / asyncpg)."""
+    parsed = make_url(url)
+    drivers = {"sqlite": "sqlite+aiosqlite", "postgresql": "postgresql+asyncpg"}
+    if parsed.get_backend_name() not in drivers:
+        return url
+    return parsed.set(drivername=drivers[parsed.get_backend_name()]).render_as_string(hide_password=False)
+
+
+# Async engine/session for DB_MODE=async, only created in that mode so sync
+# deployments do not need the asyncio drivers installed
+async_engine = None
+AsyncSessionLocal = None
+
+if config.DB_MODE == "async":
+    from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+
+    ASYNC_DATABASE_URL = config.ASYNC_DATABASE_URL or _async_url(DATABASE_URL)
+    async_engine = create_async_engine(ASYNC_DATABASE_URL, **_engine_options(ASYNC_DATABASE_URL, async_mode=True))
+    if _is_sqlite(ASYNC_DATABASE_URL):
+        _install_sqlite_pragmas(async_engine.sync_engine, ASYNC_DATABASE_URL)
+    # objects stay usable after commit: reloading an expired attribute would need I/O
+    AsyncSessionLocal = async_sessionmaker(async_engine, class_=AsyncSession, autoflush=False,
+                                           expire_on_commit=False)
+
+
+async def get_async_db():
+    async with AsyncSessionLocal() as db:
+        yield db
+
+
+def pool_gauges(db_engine=None) -> dict:
+    """Numeric pool occupancy of the engine (or of db_engine), for /metrics."""
+    pool = (db_engine or engine).pool
+    gauges = {name: getattr(pool, name)() for name in ("size", "checkedout", "overflow", "checkedin")
+              if hasattr(pool, name)}
+    return {**gauges, "checkout_wait_max_seconds": pool_wait_stats["max_wait_seconds"]}
@@ -1,13 +1,23 @@
 from fastapi import FastAPI
-from backend.database import Base, engine
+from fastapi.responses import PlainTextResponse
+from backend import config
+from backend import database
+from backend.database import engine, SessionLocal
+from backend.migrations import setup_schema
 from backend.models import (
     airport, flight, user, booking, traveller,
-    billing_address, seat, booking_seat, meal, booking_meal, payment
+    billing_address, seat, booking_seat, meal, booking_meal, payment,
+    flight_inventory, seat_hold, flight_price_snapshot, worker_lease, cache_invalidation
 )
 from backend.routers import flight_routes
-from backend.utils.background_demand import simulate_demand  
-import asyncio
-
+from backend.utils.background_demand import demand_simulator
+from backend.utils.hold_expiry import hold_reaper
+from backend.utils.invalidation_bus import connect_caches, invalidation_bus
+from backend.utils.leader import leader
+from backend.utils.metrics import QueryMetricsMiddleware, install_query_hooks, metrics
+from backend.utils.price_cache import price_cache
+from backend.utils.price_snapshot import repricer
+from backend.utils.seat_inventory import reconcile_inventory
 # from fastapi.middleware.cors import CORSMiddleware
 
 from backend.routers import booking_routes
@@ -20,23 +30,159 @@ from backend.routers import booking_routes
 #     allow_headers=["*"],
 # )
 
-Base.metadata.create_all(bind=engine)
+setup_schema(engine)
 
 app = FastAPI(title="Flight Booking API")
 
-app.include_router(flight_routes.router)
+if config.QUERY_METRICS_ENABLED:
+    # per-request query counts and timings, slow-query log, GET /metrics
+    install_query_hooks(engine)
+    if database.async_engine is not None:
+        install_query_hooks(database.async_engine.sync_engine)
+    database.add_pool_wait_hook(metrics.observe_pool_wait)
+    app.add_middleware(QueryMetricsMiddleware)
+
+metrics.add_gauges("db_pool", database.pool_gauges)
+if database.async_engine is not None:
+    metrics.add_gauges("async_db_pool", lambda: database.pool_gauges(database.async_engine))
+metrics.add_gauges("price_cache", price_cache.stats)
+metrics.add_gauges("demand_simulator", demand_simulator.stats)
+metrics.add_gauges("hold_reaper", hold_reaper.stats)
+metrics.add_gauges("repricer", repricer.stats)
+metrics.add_gauges("invalidation_bus", invalidation_bus.stats)
+if config.MULTI_WORKER:
+    metrics.add_gauges("leader", leader.stats)
 
+# per-worker caches tell the other workers what they invalidated
+connect_caches(invalidation_bus)
+
+app.include_router(flight_routes.router)
 app.include_router(booking_routes.router)
 
 
+def start_background_jobs():
+    """
+    Reconcile the seat inventory and start the demand simulator, hold reaper
+    and repricer. Runs in every worker's startup, or only in the elected
+    leader when MULTI_WORKER is set.
+    """
+    # make sure the seat inventory counters match the base tables
+    db = SessionLocal()
+    try:
+        drift = reconcile_inventory(db)
+        if drift:
+            print(f"Reconciled seat inventory counters for {len(drift)} flight(s)")
+    finally:
+        db.close()
+
+    if config.DEMAND_SIMULATOR_MODE == "thread":
+        demand_simulator.start()
+        print("Background demand simulation started...")
+
+    if config.HOLD_REAPER_ENABLED:
+        hold_reaper.start()
+        print("Seat hold expiry reaper started...")
+
+    if config.REPRICER_ENABLED:
+        repricer.start()
+        print("Price snapshot repricer started...")
+
+
+def stop_background_jobs():
+    """
+    Stop the demand simulator, hold reaper and repricer threads.
+    """
+    demand_simulator.stop()
+    hold_reaper.stop()
+    repricer.stop()
+
+
 @app.on_event("startup")
-async def start_background_tasks():
+def start_background_tasks():
     """
     Start background simulation when app starts.
     """
-    loop = asyncio.get_event_loop()
-    loop.create_task(simulate_demand())
-    print("Background demand simulation started...")
+    invalidation_bus.start()
+    if config.MULTI_WORKER:
+        # uvicorn --workers N: only the lease holder runs the background jobs
+        leader.on_elected(start_background_jobs)
+        leader.on_demoted(stop_background_jobs)
+        leader.start()
+    else:
+        start_background_jobs()
+
+
+@app.on_event("shutdown")
+def stop_background_tasks():
+    """
+    Stop the background jobs (handing over leadership) and the invalidation bus when the app stops.
+    """
+    if config.MULTI_WORKER:
+        leader.stop()
+    stop_background_jobs()
+    invalidation_bus.stop()
+
+
+@app.on_event("shutdown")
+async def close_async_engine():
+    """
+    Release pooled async connections when the app stops (DB_MODE=async).
+    """
+    if database.async_engine is not None:
+        await database.async_engine.dispose()
+
+
+@app.get("/simulator/stats")
+def get_simulator_stats():
+    """
+    Demand simulator metrics: cycle duration, rows touched and lag.
+    """
+    return {"mode": config.DEMAND_SIMULATOR_MODE, **demand_simulator.stats()}
+
+
+@app.get("/holds/stats")
+def get_hold_stats():
+    """
+    Hold reaper metrics: tracked pending holds, next expiry and released seats.
+    """
+    return hold_reaper.stats()
+
+
+@app.get("/repricer/stats")
+def get_repricer_stats():
+    """
+    Price snapshot repricer metrics: passes, flights repriced and the next tier boundary.
+    """
+    return repricer.stats()
+
+
+@app.get("/workers/stats")
+def get_worker_stats():
+    """
+    Multi-worker state of this worker: leader election and invalidation bus.
+    """
+    return {
+        "multi_worker": config.MULTI_WORKER,
+        "leader": leader.stats() if config.MULTI_WORKER else None,
+        "invalidation_bus": invalidation_bus.stats(),
+    }
+
+
+@app.get("/metrics", response_class=PlainTextResponse)
+def get_metrics():
+    """
+    Prometheus metrics: requests, latency and SQL queries per route, pool
+    checkout waits and the background services' counters.
+    """
+    return PlainTextResponse(metrics.render(), media_type="text/plain; version=0.0.4")
+
+
+@app.get("/metrics/slow_queries")
+def get_slow_queries():
+    """
+    Most recent statements slower than SLOW_QUERY_MS, newest first, with their query plans.
+    """
+    return {"threshold_ms": config.SLOW_QUERY_MS, "queries": metrics.slow_queries()}
 
 
 @app.get("/")
@@ -0,0 +1,161 @@
+# backend/migrations.py
+"""
+In-place schema migrations for existing SQLite databases.
+
+Base.metadata.create_all() only creates missing tables, so changes to
+existing tables (column formats, new indexes) are applied here. The
+applied version is tracked with SQLite's PRAGMA user_version.
+
+Run `python -m backend.migrations` to migrate ./flightbooking.db by hand;
+the app also runs setup_schema() on import of backend.main, in every worker.
+"""
+from sqlalchemy import text
+
+from backend.utils.dynamic_pricing import _parse_departure_time
+
+# SQLAlchemy's storage format for DateTime columns on SQLite
+_SQLITE_DATETIME_FORMAT = "%Y-%m-%d %H:%M:%S.%f"
+
+
+def _flights_native_datetimes(conn):
+    """
+    flights.departure_time / arrival_time used to be free-form ISO strings
+    ('2025-10-22T06:30:00' or '2025-10-22 06:30:00'). Rewrite them in the
+    DateTime storage format so they load as datetimes and compare correctly
+    in range queries, and add the route + departure index.
+    """
+    rows = conn.execute(text("SELECT flight_id, departure_time, arrival_time FROM flights")).fetchall()
+    for flight_id, departure_time, arrival_time in rows:
+        values = {}
+        for column, raw in (("departure_time", departure_time), ("arrival_time", arrival_time)):
+            parsed = _parse_departure_time(raw)
+            if parsed is None:
+                print(f"Migration: could not parse flights.{column}={raw!r} for flight {flight_id}, left as is")
+                continue
+            normalized = parsed.strftime(_SQLITE_DATETIME_FORMAT)
+            if normalized != raw:
+                values[column] = normalized
+        if values:
+            assignments = ", ".join(f"{column} = :{column}" for column in values)
+            conn.execute(text(f"UPDATE flights SET {assignments} WHERE flight_id = :flight_id"),
+                         {"flight_id": flight_id, **values})
+
+    conn.execute(text(
+        "CREATE INDEX IF NOT EXISTS ix_flights_route_departure "
+        "ON flights (origin_airport_id, destination_airport_id, departure_time)"
+    ))
+
+
+def _booking_child_indexes(conn):
+    """
+    Passenger attachment, payment and cancellation look up travellers and
+    booking_seats by booking_id; index those foreign keys.
+    """
+    conn.execute(text("CREATE INDEX IF NOT EXISTS ix_travellers_booking_id ON travellers (booking_id)"))
+    conn.execute(text("CREATE INDEX IF NOT EXISTS ix_booking_seats_booking_id ON booking_seats (booking_id)"))
+
+
+def _bookings_user_index(conn):
+    """Booking history pages through a user's bookings by (user_id, booking_id)."""
+    conn.execute(text("CREATE INDEX IF NOT EXISTS ix_bookings_user_id ON bookings (user_id)"))
+
+
+def _flights_natural_key(conn):
+    """
+    Unique index on (flight_code, origin, destination, departure_time) for
+    the sync upsert. Existing duplicates are removed first, together with
+    their rows in every per-flight table, keeping the copy with bookings (or
+    the oldest); duplicates that both have bookings must be merged by hand.
+    """
+    from backend.database import Base
+
+    # seats, holds, inventory, price snapshots, ...: children first, flights last
+    per_flight_tables = [
+        table.name for table in reversed(Base.metadata.sorted_tables)
+        if "flight_id" in table.c and table.name != "bookings"
+    ]
+    groups = conn.execute(text(
+        "SELECT flight_code, origin_airport_id, destination_airport_id, departure_time "
+        "FROM flights GROUP BY 1, 2, 3, 4 HAVING COUNT(*) > 1"
+    )).fetchall()
+    for key in groups:
+        rows = conn.execute(text(
+            "SELECT f.flight_id, COUNT(b.booking_id) FROM flights f "
+            "LEFT JOIN bookings b ON b.flight_id = f.flight_id "
+            "WHERE f.flight_code = :code AND f.origin_airport_id = :origin "
+            "AND f.destination_airport_id = :destination AND f.departure_time = :departure "
+            "GROUP BY f.flight_id ORDER BY COUNT(b.booking_id) > 0 DESC, f.flight_id"
+        ), {"code": key[0], "origin": key[1], "destination": key[2], "departure": key[3]}).fetchall()
+        for flight_id, bookings in rows[1:]:
+            if bookings:
+                raise RuntimeError(f"Flights {rows[0][0]} and {flight_id} are duplicates with bookings; merge them first")
+            for table in per_flight_tables:
+                conn.execute(text(f"DELETE FROM {table} WHERE flight_id = :flight_id"), {"flight_id": flight_id})
+        print(f"Migration: removed {len(rows) - 1} duplicate(s) of flight {key[0]} ({rows[0][0]} kept)")
+
+    conn.execute(text(
+        "CREATE UNIQUE INDEX IF NOT EXISTS ux_flights_code_route_departure "
+        "ON flights (flight_code, origin_airport_id, destination_airport_id, departure_time)"
+    ))
+
+
+def _bookings_flight_index(conn):
+    """The demand simulator looks up the live bookings of each flight it rewrites."""
+    conn.execute(text("CREATE INDEX IF NOT EXISTS ix_bookings_flight_id ON bookings (flight_id)"))
+
+
+# Ordered migrations; the list index + 1 is the schema version they produce
+MIGRATIONS = [
+    _flights_native_datetimes,
+    _booking_child_indexes,
+    _bookings_user_index,
+    _flights_natural_key,
+    _bookings_flight_index,
+]
+
+
+def _run_migrations(conn) -> int:
+    """Apply pending migrations on conn (inside the caller's transaction) and return how many ran."""
+    applied = 0
+    version = conn.execute(text("PRAGMA user_version")).scalar() or 0
+    for target, migration in enumerate(MIGRATIONS[version:], start=version + 1):
+        migration(conn)
+        conn.execute(text(f"PRAGMA user_version = {target}"))
+        applied += 1
+    return applied
+
+
+def setup_schema(engine) -> int:
+    """
+    Create missing tables and apply pending migrations; returns how many ran.
+
+    Serialized across processes, so workers starting together (uvicorn
+    --workers N) don't race on CREATE TABLE: on SQLite everything runs in
+    one BEGIN EXCLUSIVE transaction, on Postgres under an advisory lock.
+    Only SQLite needs the migrations; other backends get the current schema
+    from create_all.
+    """
+    from backend.database import Base
+    import backend.models  # noqa: F401  (register every table)
+
+    if engine.dialect.name != "sqlite":
+        with engine.begin() as conn:
+            if engine.dialect.name == "postgresql":
+                conn.execute(text("SELECT pg_advisory_xact_lock(hashtext('flightbooking_schema'))"))
+            Base.metadata.create_all(bind=conn)
+        return 0
+
+    with engine.connect() as conn:
+        # waits (busy_timeout) while another process holds the lock, then sees its tables
+        conn.exec_driver_sql("BEGIN EXCLUSIVE")
+        Base.metadata.create_all(bind=conn)
+        applied = _run_migrations(conn)
+        conn.commit()
+    return applied
+
+
+if __name__ == "__main__":
+    from backend.database import engine
+
+    count = setup_schema(engine)
+    print(f"Applied {count} migration(s)." if count else "Database schema is up to date.")
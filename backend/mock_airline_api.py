@@ -1,6 +1,13 @@
 # backend/mock_airline_api.py
+import asyncio
 import random
+from abc import ABC, abstractmethod
+import time
+import zlib
 from datetime import datetime, timedelta
+from typing import Awaitable, Callable, Dict, List, Optional, Sequence
+
+from backend import config
 
 def fetch_external_flights():
     """Simulate external airline API returning mock flights consistent with existing airport data."""
@@ -34,3 +41,163 @@ def fetch_external_flights():
         })
 
     return mock_flights
+
+
+# ----------------------
+# Multi-airline ingestion
+# ----------------------
+class SourceError(Exception):
+    """An airline source failed to deliver its feed."""
+
+
+class FlightSource(ABC):
+    """
+    One airline feed. Subclasses implement fetch() and return records shaped
+    like fetch_external_flights() items (city names or IATA codes for the
+    airports, ISO strings for the times).
+    """
+
+    name = "source"
+
+    def __init__(self, timeout: Optional[float] = None):
+        self.timeout = config.FEED_SOURCE_TIMEOUT_SECONDS if timeout is None else timeout
+
+    @abstractmethod
+    async def fetch(self) -> List[dict]:
+        ...
+
+
+class MockAirlineSource(FlightSource):
+    """
+    Offline stand-in for an airline API: sleeps for a random latency, fails
+    with probability failure_rate and otherwise returns a schedule for the
+    next `days` days. The schedule is seeded by airline and date, so repeated
+    syncs on the same day return the same flights (and update them in place).
+    """
+
+    ROUTES = [
+        ("Chennai", "Delhi", 4100),
+        ("Delhi", "Bengaluru", 4800),
+        ("Bengaluru", "Mumbai", 4600),
+        ("Mumbai", "Chennai", 4300),
+        ("Delhi", "Mumbai", 4400),
+        ("Chennai", "Bengaluru", 2900),
+    ]
+
+    def __init__(self, airline: str, code_prefix: str, latency: Sequence[float] = (0.05, 0.5),
+                 failure_rate: float = 0.1, days: int = 3, flights_per_route: int = 2,
+                 timeout: Optional[float] = None):
+        super().__init__(timeout)
+        self.name = airline
+        self.code_prefix = code_prefix
+        self.latency = latency
+        self.failure_rate = failure_rate
+        self.days = days
+        self.flights_per_route = flights_per_route
+
+    def schedule(self, today=None) -> List[dict]:
+        today = today or datetime.now().date()
+        rng = random.Random(zlib.crc32(f"{self.name}:{today.isoformat()}".encode()))
+        records = []
+        for day in range(self.days):
+            midnight = datetime.combine(today + timedelta(days=day), datetime.min.time())
+            for route_no, (origin, destination, base_fare) in enumerate(self.ROUTES):
+                for slot in range(self.flights_per_route):
+                    dep_time = midnight + timedelta(hours=rng.randint(5, 22), minutes=rng.choice([0, 15, 30, 45]))
+                    arr_time = dep_time + timedelta(hours=rng.choice([2, 2.5, 3]))
+                    records.append({
+                        "company_name": self.name,
+                        "flight_code": f"{self.code_prefix}{100 + route_no * 10 + slot}",
+                        "origin": origin,
+                        "destination": destination,
+                        "departure_time": dep_time.isoformat(),
+                        "arrival_time": arr_time.isoformat(),
+                        "duration_minutes": int((arr_time - dep_time).total_seconds() / 60),
+                        "stops": rng.choice([0, 0, 1]),
+                        "base_fare": round(base_fare * rng.uniform(0.9, 1.2)),
+                        "travel_class": rng.choice(["Economy", "Business"]),
+                    })
+        return records
+
+    async def fetch(self) -> List[dict]:
+        await asyncio.sleep(random.uniform(*self.latency))
+        if random.random() < self.failure_rate:
+            raise SourceError(f"{self.name} feed unavailable (simulated)")
+        return self.schedule()
+
+
+# Sources pulled by POST /flights/sync
+DEFAULT_SOURCES: List[FlightSource] = [
+    MockAirlineSource("IndiGo", "6E"),
+    MockAirlineSource("Air India", "AI", latency=(0.2, 1.0)),
+    MockAirlineSource("Vistara", "UK"),
+    MockAirlineSource("SpiceJet", "SG", latency=(0.1, 0.8), failure_rate=0.2),
+]
+
+# natural key of a feed record, before airport resolution
+_RECORD_KEY = ("flight_code", "origin", "destination", "departure_time")
+
+
+async def _fetch_source(source: FlightSource, semaphore: asyncio.Semaphore):
+    """Fetch one source under the concurrency limit and its own timeout; never raises."""
+    async with semaphore:
+        start = time.perf_counter()
+        timing = {"source": source.name, "status": "ok", "records": 0}
+        records: List[dict] = []
+        try:
+            records = await asyncio.wait_for(source.fetch(), source.timeout)
+            timing["records"] = len(records)
+        except asyncio.TimeoutError:
+            timing["status"] = "timeout"
+        except Exception as e:
+            timing["status"] = "error"
+            timing["error"] = str(e)
+        timing["seconds"] = round(time.perf_counter() - start, 4)
+        return timing, records
+
+
+async def ingest_flights(
+    write_batch: Callable[[List[dict]], Awaitable[Dict[str, int]]],
+    sources: Optional[Sequence[FlightSource]] = None,
+    batch_size: int = 1000,
+    max_concurrency: Optional[int] = None,
+) -> dict:
+    """
+    Fetch every source concurrently and stream their records into
+    write_batch() as sources finish: duplicates across sources are dropped on
+    the record key and the rest is handed over in batches of batch_size.
+    write_batch returns counters (inserted/updated/...) that are summed up.
+    A failing or slow source only loses its own records.
+    """
+    sources = DEFAULT_SOURCES if sources is None else sources
+    semaphore = asyncio.Semaphore(max_concurrency or config.FEED_MAX_CONCURRENCY)
+    start = time.perf_counter()
+
+    totals: Dict[str, int] = {"received": 0, "duplicates": 0}
+    timings = []
+    seen = set()
+    buffer: List[dict] = []
+
+    async def flush():
+        if not buffer:
+            return
+        for key, value in (await write_batch(list(buffer))).items():
+            totals[key] = totals.get(key, 0) + value
+        buffer.clear()
+
+    for next_done in asyncio.as_completed([_fetch_source(s, semaphore) for s in sources]):
+        timing, records = await next_done
+        timings.append(timing)
+        totals["received"] += len(records)
+        for record in records:
+            key = tuple(record.get(field) for field in _RECORD_KEY)
+            if key in seen:
+                totals["duplicates"] += 1
+                continue
+            seen.add(key)
+            buffer.append(record)
+            if len(buffer) >= batch_size:
+                await flush()
+    await flush()
+
+    return {**totals, "sources": timings, "seconds": round(time.perf_counter() - start, 4)}
@@ -9,3 +9,8 @@ from .booking_seat import BookingSeat
 from .meal import Meal
 from .booking_meal import BookingMeal 
 from .payment import Payment 
+from .flight_inventory import FlightInventory
+from .seat_hold import SeatHold
+from .flight_price_snapshot import FlightPriceSnapshot
+from .worker_lease import WorkerLease
+from .cache_invalidation import CacheInvalidation
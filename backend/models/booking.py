@@ -6,8 +6,8 @@ class Booking(Base):
     __tablename__ = "bookings"
 
     booking_id = Column(Integer, primary_key=True, index=True, autoincrement=True)
-    user_id = Column(Integer, ForeignKey("users.user_id"), nullable=False)
-    flight_id = Column(Integer, ForeignKey("flights.flight_id"), nullable=False)
+    user_id = Column(Integer, ForeignKey("users.user_id"), nullable=False, index=True)
+    flight_id = Column(Integer, ForeignKey("flights.flight_id"), nullable=False, index=True)
     booking_date = Column(String, nullable=False)  # Use String for ISO datetime
     trip_type = Column(String, nullable=False)
     return_date = Column(String, nullable=True)
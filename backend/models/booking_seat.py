@@ -6,7 +6,7 @@ class BookingSeat(Base):
     __tablename__ = "booking_seats"
 
     booking_seat_id = Column(Integer, primary_key=True, index=True, autoincrement=True)
-    booking_id = Column(Integer, ForeignKey("bookings.booking_id"), nullable=False)
+    booking_id = Column(Integer, ForeignKey("bookings.booking_id"), nullable=False, index=True)
     traveller_id = Column(Integer, ForeignKey("travellers.traveller_id"), nullable=False)
     seat_id = Column(Integer, ForeignKey("seats.seat_id"), nullable=False)
     seat_price = Column(Float, nullable=False)
@@ -0,0 +1,12 @@
+from sqlalchemy import Column, Integer, String, DateTime, Text
+from backend.database import Base
+
+class CacheInvalidation(Base):
+    # cross-worker cache invalidation events, polled by the SQLite invalidation bus
+    __tablename__ = "cache_invalidations"
+
+    event_id = Column(Integer, primary_key=True, autoincrement=True)
+    topic = Column(String, nullable=False)              # price, seat_map, airports, route_graph, hold
+    keys = Column(Text, nullable=True)                  # JSON list of keys; NULL = everything
+    origin = Column(String, nullable=False)             # publishing worker, skipped by itself
+    created_at = Column(DateTime, nullable=False, index=True)
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Float, ForeignKey, CheckConstraint
+from sqlalchemy import Column, Integer, String, Float, DateTime, ForeignKey, CheckConstraint, Index
 from sqlalchemy.orm import relationship
 from backend.database import Base
 
@@ -10,8 +10,8 @@ class Flight(Base):
     flight_code = Column(String, nullable=False)
     origin_airport_id = Column(Integer, ForeignKey("airports.airport_id"), nullable=False)
     destination_airport_id = Column(Integer, ForeignKey("airports.airport_id"), nullable=False)
-    departure_time = Column(String, nullable=False)  # Use String for ISO datetime
-    arrival_time = Column(String, nullable=False)
+    departure_time = Column(DateTime, nullable=False)
+    arrival_time = Column(DateTime, nullable=False)
     duration_minutes = Column(Integer, nullable=False)
     stops = Column(Integer, nullable=False)
     base_fare = Column(Float, nullable=False)
@@ -20,6 +20,11 @@ class Flight(Base):
     __table_args__ = (
         CheckConstraint("travel_class IN ('Economy', 'Business', 'First')", name="check_travel_class"),
         CheckConstraint("origin_airport_id != destination_airport_id", name="check_airports_different"),
+        # route + date search
+        Index("ix_flights_route_departure", "origin_airport_id", "destination_airport_id", "departure_time"),
+        # natural key used by the bulk sync upsert
+        Index("ux_flights_code_route_departure", "flight_code", "origin_airport_id",
+              "destination_airport_id", "departure_time", unique=True),
     )
 
     # Define relationships for easier access if needed
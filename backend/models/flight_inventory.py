@@ -0,0 +1,14 @@
+from sqlalchemy import Column, Integer, String, ForeignKey
+from backend.database import Base
+
+class FlightInventory(Base):
+    # per-flight seat inventory counters, kept in step with seats/booking_seats/bookings
+    __tablename__ = "flight_inventory"
+
+    flight_id = Column(Integer, ForeignKey("flights.flight_id"), primary_key=True)
+    total_seats = Column(Integer, nullable=False, default=0)
+    booked_seats = Column(Integer, nullable=False, default=0)   # seats with is_booked = 1
+    linked_seats = Column(Integer, nullable=False, default=0)   # booking_seats rows
+    booking_count = Column(Integer, nullable=False, default=0)  # bookings (any status)
+    version = Column(Integer, nullable=False, default=0)        # bumped on every change
+    updated_at = Column(String, nullable=True)  # ISO datetime as string
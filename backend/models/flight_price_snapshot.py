@@ -0,0 +1,15 @@
+from sqlalchemy import Column, Integer, String, Float, DateTime, ForeignKey, Text
+from backend.database import Base
+
+class FlightPriceSnapshot(Base):
+    # precomputed dynamic price per flight, kept current by the background repricer
+    __tablename__ = "flight_price_snapshot"
+
+    flight_id = Column(Integer, ForeignKey("flights.flight_id"), primary_key=True)
+    final_price = Column(Float, nullable=False)
+    breakdown = Column(Text, nullable=False)              # JSON of the full price breakdown
+    base_fare = Column(Float, nullable=False)             # inputs the price was computed from,
+    travel_class = Column(String, nullable=False)         # compared with the flight row on read
+    inventory_version = Column(Integer, nullable=False)   # flight_inventory.version at compute time
+    computed_at = Column(String, nullable=False)          # ISO datetime as string
+    valid_until = Column(DateTime, nullable=True)         # next time-tier boundary; NULL = no more tiers
@@ -0,0 +1,16 @@
+from sqlalchemy import Column, Integer, Float, ForeignKey
+from sqlalchemy.orm import relationship
+from backend.database import Base
+
+class SeatHold(Base):
+    # seats reserved by a booking at initiate time (released on expiry, failure or cancellation)
+    __tablename__ = "seat_holds"
+
+    hold_id = Column(Integer, primary_key=True, index=True, autoincrement=True)
+    booking_id = Column(Integer, ForeignKey("bookings.booking_id"), nullable=False, index=True)
+    flight_id = Column(Integer, ForeignKey("flights.flight_id"), nullable=False)
+    seat_id = Column(Integer, ForeignKey("seats.seat_id"), nullable=False)
+    seat_price = Column(Float, nullable=False)
+
+    booking = relationship("Booking", backref="seat_holds")
+    seat = relationship("Seat")
@@ -0,0 +1,11 @@
+from sqlalchemy import Column, String, DateTime
+from backend.database import Base
+
+class WorkerLease(Base):
+    # time-limited lease held by the worker that runs a singleton job (see utils/leader.py)
+    __tablename__ = "worker_leases"
+
+    name = Column(String, primary_key=True)             # e.g. "background-jobs"
+    holder = Column(String, nullable=False)             # host:pid:token of the current leader
+    acquired_at = Column(DateTime, nullable=False)
+    expires_at = Column(DateTime, nullable=False)       # others may take over after this
@@ -1,121 +1,300 @@
-from sqlalchemy.orm import Session
-from backend.database import engine, Base, get_db
+# backend/populate_sample_data.py
+"""
+Sample and synthetic data loader.
+
+    python -m backend.populate_sample_data
+    python -m backend.populate_sample_data --flights 200000 --seats-per-flight 60 --days 30 --seed 7
+
+Without options it loads the fixed demo data (4 airports, 3 flights, 45
+seats). With --flights it generates a realistic schedule: hub-weighted
+routes between up to 20 Indian airports, durations and fares from the
+great-circle distance, morning/evening departure banks, a class mix and
+stops on long routes. Seats follow seat_layout.cabin_layout().
+
+Rows are written with Core executemany inserts, one transaction per chunk
+of flights. The seats and inventory counters of a flight go in the same
+transaction as the flight. On SQLite the connection runs with bulk-load
+pragmas (synchronous=OFF, in-memory temp store) while loading. Flight ids
+are assigned up front, so no RETURNING round trip is needed.
+"""
+import argparse
+import json
+import math
+import random
+import time
+from datetime import date, datetime, timedelta
+from typing import Optional
+
+from sqlalchemy import func, insert, select
+
+from backend import config
+from backend.database import engine
 from backend.models.airport import Airport
 from backend.models.flight import Flight
+from backend.models.flight_inventory import FlightInventory
 from backend.models.user import User
 from backend.models.meal import Meal
 from backend.models.seat import Seat
+from backend.utils.seat_layout import cabin_layout, seat_template
+
+# Flights per transaction in synthetic mode
+CHUNK_SIZE = 10000
+
+# name, city, IATA code, latitude, longitude; earlier entries are bigger hubs
+AIRPORTS = [
+    ("Chennai International", "Chennai", "MAA", 12.99, 80.17),
+    ("Delhi Indira Gandhi", "Delhi", "DEL", 28.56, 77.10),
+    ("Bengaluru International", "Bengaluru", "BLR", 13.20, 77.71),
+    ("Mumbai Chhatrapati Shivaji", "Mumbai", "BOM", 19.09, 72.87),
+    ("Hyderabad Rajiv Gandhi", "Hyderabad", "HYD", 17.24, 78.43),
+    ("Kolkata Netaji Subhas Chandra Bose", "Kolkata", "CCU", 22.65, 88.45),
+    ("Ahmedabad Sardar Vallabhbhai Patel", "Ahmedabad", "AMD", 23.07, 72.63),
+    ("Pune International", "Pune", "PNQ", 18.58, 73.92),
+    ("Goa Dabolim", "Goa", "GOI", 15.38, 73.83),
+    ("Kochi International", "Kochi", "COK", 10.15, 76.40),
+    ("Jaipur International", "Jaipur", "JAI", 26.82, 75.81),
+    ("Lucknow Chaudhary Charan Singh", "Lucknow", "LKO", 26.76, 80.89),
+    ("Guwahati Lokpriya Gopinath Bordoloi", "Guwahati", "GAU", 26.11, 91.59),
+    ("Thiruvananthapuram International", "Thiruvananthapuram", "TRV", 8.48, 76.92),
+    ("Bhubaneswar Biju Patnaik", "Bhubaneswar", "BBI", 20.24, 85.82),
+    ("Coimbatore International", "Coimbatore", "CJB", 11.03, 77.04),
+    ("Nagpur Dr. Babasaheb Ambedkar", "Nagpur", "NAG", 21.09, 79.05),
+    ("Patna Jay Prakash Narayan", "Patna", "PAT", 25.59, 85.09),
+    ("Indore Devi Ahilya Bai Holkar", "Indore", "IDR", 22.72, 75.80),
+    ("Chandigarh International", "Chandigarh", "IXC", 30.67, 76.79),
+]
+# (airline, code prefix, share of flights)
+AIRLINES = [("IndiGo", "6E", 0.45), ("Air India", "AI", 0.25), ("Vistara", "UK", 0.12),
+            ("SpiceJet", "SG", 0.1), ("Akasa Air", "QP", 0.08)]
+# departure hour weights: morning and evening banks
+HOUR_WEIGHTS = {5: 2, 6: 6, 7: 8, 8: 7, 9: 5, 10: 3, 11: 3, 12: 3, 13: 3, 14: 3, 15: 3,
+                16: 4, 17: 6, 18: 7, 19: 7, 20: 6, 21: 4, 22: 2}
+TRAVEL_CLASS_WEIGHTS = {"Economy": 70, "Business": 22, "First": 8}
+
+
+def create_schema(bind=engine):
+    from backend.migrations import setup_schema
 
-# Create all tables
-Base.metadata.create_all(bind=engine)
-
-# Function to populate sample data
-def populate_sample_data():
-    db: Session = Session(bind=engine)
-
-    # ----------------------
-    # Airports
-    # ----------------------
-    airports = [
-        Airport(name="Chennai International", city="Chennai", country="India", code="MAA"),
-        Airport(name="Delhi Indira Gandhi", city="Delhi", country="India", code="DEL"),
-        Airport(name="Bengaluru International", city="Bengaluru", country="India", code="BLR"),
-        Airport(name="Mumbai Chhatrapati Shivaji", city="Mumbai", country="India", code="BOM"),
-    ]
-    db.add_all(airports)
-    db.commit()
-
-    # ----------------------
-    # Flights
-    # ----------------------
-    flights = [
-        Flight(
-            company_name="IndiGo",
-            flight_code="6E123",
-            origin_airport_id=1,
-            destination_airport_id=2,
-            departure_time="2025-10-22T06:30:00",
-            arrival_time="2025-10-22T08:30:00",
-            duration_minutes=120,
-            stops=0,
-            base_fare=4000,
-            travel_class="Economy"
-        ),
-        Flight(
-            company_name="Air India",
-            flight_code="AI456",
-            origin_airport_id=2,
-            destination_airport_id=3,
-            departure_time="2025-10-23T09:00:00",
-            arrival_time="2025-10-23T11:30:00",
-            duration_minutes=150,
-            stops=0,
-            base_fare=5000,
-            travel_class="Business"
-        ),
-        Flight(
-            company_name="SpiceJet",
-            flight_code="SG789",
-            origin_airport_id=3,
-            destination_airport_id=4,
-            departure_time="2025-10-24T14:00:00",
-            arrival_time="2025-10-24T16:00:00",
-            duration_minutes=120,
-            stops=0,
-            base_fare=4500,
-            travel_class="Economy"
-        ),
-    ]
-    db.add_all(flights)
-    db.commit()
-
-    # ----------------------
-    # Users
-    # ----------------------
-    users = [
-        User(name="Nagavalli M", email="nagavalli@example.com", phone="9876543210"),
-        User(name="Arun Kumar", email="arun@example.com", phone="9123456780"),
-    ]
-    db.add_all(users)
-    db.commit()
-
-    # ----------------------
-    # Meals
-    # ----------------------
-    meals = [
-        Meal(meal_name="Veg Meal", description="Vegetarian meal", price=300),
-        Meal(meal_name="Non-Veg Meal", description="Non-vegetarian meal", price=350),
-        Meal(meal_name="Snacks", description="Light snacks", price=150),
-    ]
-    db.add_all(meals)
-    db.commit()
-
-    # ----------------------
-    # Seats
-    # ----------------------
-    seats = []
-    seat_classes = ["Economy", "Business", "First"]
-    for flight_id in range(1, 4):  # 3 flights
-        seat_number = 1
-        for cls in seat_classes:
-            for _ in range(5):  # 5 seats per class
-                seats.append(
-                    Seat(
-                        flight_id=flight_id,
-                        seat_number=f"{cls[0]}{seat_number}",
-                        travel_class=cls,
-                        is_booked=0,
-                        seat_price=1000 + seat_number * 200
-                    )
-                )
-                seat_number += 1
-    db.add_all(seats)
-    db.commit()
+    setup_schema(bind)
+
+
+# ----------------------
+# Fixed demo data
+# ----------------------
+def populate_sample_data(bind=engine):
+    """The original demo data (4 airports, 3 flights, 2 users, 3 meals, 45 seats) in one transaction."""
+    create_schema(bind)
+    with bind.begin() as conn:
+        conn.execute(insert(Airport.__table__), [
+            {"name": "Chennai International", "city": "Chennai", "country": "India", "code": "MAA"},
+            {"name": "Delhi Indira Gandhi", "city": "Delhi", "country": "India", "code": "DEL"},
+            {"name": "Bengaluru International", "city": "Bengaluru", "country": "India", "code": "BLR"},
+            {"name": "Mumbai Chhatrapati Shivaji", "city": "Mumbai", "country": "India", "code": "BOM"},
+        ])
+        conn.execute(insert(Flight.__table__), [
+            {"company_name": "IndiGo", "flight_code": "6E123", "origin_airport_id": 1, "destination_airport_id": 2,
+             "departure_time": datetime(2025, 10, 22, 6, 30), "arrival_time": datetime(2025, 10, 22, 8, 30),
+             "duration_minutes": 120, "stops": 0, "base_fare": 4000, "travel_class": "Economy"},
+            {"company_name": "Air India", "flight_code": "AI456", "origin_airport_id": 2, "destination_airport_id": 3,
+             "departure_time": datetime(2025, 10, 23, 9, 0), "arrival_time": datetime(2025, 10, 23, 11, 30),
+             "duration_minutes": 150, "stops": 0, "base_fare": 5000, "travel_class": "Business"},
+            {"company_name": "SpiceJet", "flight_code": "SG789", "origin_airport_id": 3, "destination_airport_id": 4,
+             "departure_time": datetime(2025, 10, 24, 14, 0), "arrival_time": datetime(2025, 10, 24, 16, 0),
+             "duration_minutes": 120, "stops": 0, "base_fare": 4500, "travel_class": "Economy"},
+        ])
+        conn.execute(insert(User.__table__), [
+            {"name": "Nagavalli M", "email": "nagavalli@example.com", "phone": "9876543210"},
+            {"name": "Arun Kumar", "email": "arun@example.com", "phone": "9123456780"},
+        ])
+        _insert_sample_meals(conn)
+        template = seat_template((5, 5, 5))  # 5 seats per class
+        conn.execute(insert(Seat.__table__), [
+            {"flight_id": flight_id, "seat_number": number, "travel_class": travel_class,
+             "is_booked": 0, "seat_price": price}
+            for flight_id in range(1, 4)
+            for number, travel_class, price in template
+        ])
 
     print("Sample data populated successfully!")
 
+
+def _insert_sample_meals(conn):
+    conn.execute(insert(Meal.__table__), [
+        {"meal_name": "Veg Meal", "description": "Vegetarian meal", "price": 300},
+        {"meal_name": "Non-Veg Meal", "description": "Non-vegetarian meal", "price": 350},
+        {"meal_name": "Snacks", "description": "Light snacks", "price": 150},
+    ])
+
+
+# ----------------------
+# Synthetic schedule
+# ----------------------
+def _distance_km(a, b) -> float:
+    """Great-circle distance between two AIRPORTS entries."""
+    lat1, lon1, lat2, lon2 = map(math.radians, (a[3], a[4], b[3], b[4]))
+    h = math.sin((lat2 - lat1) / 2) ** 2 + math.cos(lat1) * math.cos(lat2) * math.sin((lon2 - lon1) / 2) ** 2
+    return 2 * 6371 * math.asin(math.sqrt(h))
+
+
+def _routes(airport_rows):
+    """(origin_id, destination_id, block minutes, base fare, long haul) and a traffic weight per route."""
+    routes, weights = [], []
+    for i, (origin_id, origin) in enumerate(airport_rows):
+        for j, (destination_id, destination) in enumerate(airport_rows):
+            if i == j:
+                continue
+            km = _distance_km(origin, destination)
+            minutes = int(round((30 + km / 12.5) / 5) * 5)     # taxi/climb + ~750 km/h cruise
+            fare = float(round(1800 + km * 3.2, -1))
+            routes.append((origin_id, destination_id, minutes, fare, km > 1200))
+            weights.append(1 / ((i + 1) * (j + 1)) ** 0.5)    # hub-to-hub routes are busiest
+    return routes, weights
+
+
+def _ensure_reference_rows(conn, airports: int, users: int):
+    """Insert whichever demo airports, users and meals are missing; returns the airports to schedule."""
+    wanted = AIRPORTS[:max(2, min(airports, len(AIRPORTS)))]
+    existing = dict(conn.execute(select(Airport.code, Airport.airport_id)).all())
+    missing = [{"name": name, "city": city, "country": "India", "code": code}
+               for name, city, code, _, _ in wanted if code not in existing]
+    if missing:
+        conn.execute(insert(Airport.__table__), missing)
+        existing = dict(conn.execute(select(Airport.code, Airport.airport_id)).all())
+
+    emails = {email for (email,) in conn.execute(select(User.email).where(User.email.like("user%@example.com")))}
+    new_users = [{"name": f"User {i}", "email": f"user{i}@example.com", "phone": f"8{i:09d}"}
+                 for i in range(1, users + 1) if f"user{i}@example.com" not in emails]
+    if new_users:
+        conn.execute(insert(User.__table__), new_users)
+
+    if not conn.execute(select(func.count()).select_from(Meal.__table__)).scalar():
+        _insert_sample_meals(conn)
+    return [(existing[entry[2]], entry) for entry in wanted]
+
+
+def _bulk_load_pragmas(conn, on: bool):
+    if conn.dialect.name != "sqlite":
+        return
+    if on:
+        conn.exec_driver_sql("PRAGMA synchronous=OFF")
+        conn.exec_driver_sql("PRAGMA temp_store=MEMORY")
+    else:
+        conn.exec_driver_sql(f"PRAGMA synchronous={config.SQLITE_SYNCHRONOUS}")
+        conn.exec_driver_sql("PRAGMA temp_store=DEFAULT")
+    conn.commit()  # end the autobegun transaction; chunks begin their own
+
+
+def generate_flights(flights: int, seats_per_flight: int = 15, days: int = 30, seed: int = 42,
+                     airports: int = 20, users: int = 100, start: Optional[date] = None,
+                     bind=engine, chunk_size: int = CHUNK_SIZE) -> dict:
+    """
+    Append `flights` synthetic flights (departing over `days` days from
+    `start`, default tomorrow) with their seats and inventory counters.
+    Deterministic for a given seed, start date and starting flight id.
+    Returns row counts and timing.
+    """
+    started = time.perf_counter()
+    create_schema(bind)
+    rng = random.Random(seed)
+    start = start or date.today() + timedelta(days=1)
+    layout = cabin_layout(seats_per_flight)
+    template = seat_template(layout)
+    hours, hour_weights = list(HOUR_WEIGHTS), list(HOUR_WEIGHTS.values())
+    classes, class_weights = list(TRAVEL_CLASS_WEIGHTS), list(TRAVEL_CLASS_WEIGHTS.values())
+    airline_weights = [share for _, _, share in AIRLINES]
+
+    with bind.connect() as conn:
+        with conn.begin():
+            airport_rows = _ensure_reference_rows(conn, airports, users)
+            next_id = (conn.execute(select(func.max(Flight.flight_id))).scalar() or 0) + 1
+        routes, route_weights = _routes(airport_rows)
+
+        placeholder = "?" if conn.dialect.paramstyle == "qmark" else "%s"
+        insert_seats = (
+            "INSERT INTO seats (flight_id, seat_number, travel_class, is_booked, seat_price) "
+            f"VALUES ({', '.join([placeholder] * 5)})"
+        )
+        _bulk_load_pragmas(conn, True)
+        try:
+            written = 0
+            now = datetime.utcnow().isoformat()
+            while written < flights:
+                count = min(chunk_size, flights - written)
+                flight_rows, seat_rows, inventory_rows = [], [], []
+                picked = rng.choices(routes, weights=route_weights, k=count)
+                airline_picks = rng.choices(AIRLINES, weights=airline_weights, k=count)
+                hour_picks = rng.choices(hours, weights=hour_weights, k=count)
+                class_picks = rng.choices(classes, weights=class_weights, k=count)
+                for k in range(count):
+                    flight_id = next_id + written + k
+                    origin_id, destination_id, minutes, fare, long_haul = picked[k]
+                    airline, prefix, _ = airline_picks[k]
+                    stops = 1 if long_haul and rng.random() < 0.25 else 0
+                    duration = minutes + 50 * stops
+                    departure = datetime.combine(start + timedelta(days=rng.randrange(days)), datetime.min.time()) \
+                        + timedelta(hours=hour_picks[k], minutes=rng.choice((0, 5, 10, 15, 20, 30, 40, 45, 50)))
+                    flight_rows.append({
+                        "flight_id": flight_id,
+                        "company_name": airline,
+                        "flight_code": f"{prefix}{flight_id}",
+                        "origin_airport_id": origin_id,
+                        "destination_airport_id": destination_id,
+                        "departure_time": departure,
+                        "arrival_time": departure + timedelta(minutes=duration),
+                        "duration_minutes": duration,
+                        "stops": stops,
+                        "base_fare": float(round(fare * rng.uniform(0.85, 1.25), -1)),
+                        "travel_class": class_picks[k],
+                    })
+                    seat_rows.extend((flight_id, number, travel_class, 0, price)
+                                     for number, travel_class, price in template)
+                    inventory_rows.append({
+                        "flight_id": flight_id, "total_seats": len(template), "booked_seats": 0,
+                        "linked_seats": 0, "booking_count": 0, "version": 1, "updated_at": now,
+                    })
+                with conn.begin():
+                    conn.execute(insert(Flight.__table__), flight_rows)
+                    if seat_rows:
+                        # plain DBAPI executemany: seats are most of the volume
+                        conn.exec_driver_sql(insert_seats, seat_rows)
+                    conn.execute(insert(FlightInventory.__table__), inventory_rows)
+                written += count
+        finally:
+            _bulk_load_pragmas(conn, False)
+
+    return {
+        "flights": flights,
+        "seats": flights * len(template),
+        "cabin_layout": dict(zip(classes, layout)),
+        "airports": len(airport_rows),
+        "first_flight_id": next_id,
+        "seconds": round(time.perf_counter() - started, 3),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--flights", type=int, default=None, help="generate this many synthetic flights")
+    parser.add_argument("--seats-per-flight", type=int, default=15)
+    parser.add_argument("--days", type=int, default=30, help="spread departures over this many days")
+    parser.add_argument("--start-date", type=date.fromisoformat, default=None,
+                        help="first departure day, YYYY-MM-DD (default: tomorrow)")
+    parser.add_argument("--airports", type=int, default=20, help="airports to schedule between (max 20)")
+    parser.add_argument("--users", type=int, default=100, help="synthetic users to create")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--chunk-size", type=int, default=CHUNK_SIZE, help="flights per transaction")
+    args = parser.parse_args()
+
+    if args.flights is None:
+        populate_sample_data()
+        return
+    stats = generate_flights(args.flights, args.seats_per_flight, args.days, args.seed,
+                             args.airports, args.users, args.start_date, chunk_size=args.chunk_size)
+    print(json.dumps(stats, indent=2))
+
+
 # ----------------------
 # Run the function
 # ----------------------
 if __name__ == "__main__":
-    populate_sample_data()
+    main()
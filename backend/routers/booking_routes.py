@@ -1,22 +1,33 @@
-from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.orm import Session
+from fastapi import APIRouter, Depends, HTTPException, Query, status
+from sqlalchemy import func, insert, select, update
+from sqlalchemy.orm import Session, selectinload
 from sqlalchemy.exc import IntegrityError, SQLAlchemyError
-from datetime import datetime, timedelta
+from sqlalchemy.ext.asyncio import AsyncSession
+from datetime import date, datetime, timedelta
+from typing import Optional
 import secrets
 import string
 
-from backend.database import get_db
-from backend import models
+from backend.database import get_async_db, get_db
+from backend import config, models
 from backend.models.booking import Booking
 from backend.models.seat import Seat
 from backend.models.traveller import Traveller
 from backend.models.booking_seat import BookingSeat
 from backend.models.payment import Payment
-from backend.utils.dynamic_pricing import calculate_dynamic_price
+from backend.models.seat_hold import SeatHold
+from backend.utils.dynamic_pricing import calculate_dynamic_prices, calculate_dynamic_prices_async
+from backend.utils.seat_inventory import adjust_inventory
+from backend.utils.price_cache import price_cache
+from backend.utils.seat_map import seat_maps
+from backend.utils.hold_expiry import hold_reaper
+from backend.utils.db_retry import is_lock_error, run_with_retry, run_with_retry_async
 from backend.schemas.booking import (
     SeatSelectionRequest, SeatSelectionResponse,
     PassengerInfoRequest, PassengerInfoResponse,
-    PaymentRequest, PaymentResponse, TravellerInfo
+    PaymentRequest, PaymentResponse, TravellerInfo,
+    BookingHistoryResponse,
+    BatchBookingRequest, BatchBookingResponse, BatchItemResult
 )
 
 router = APIRouter(prefix="/bookings", tags=["Bookings"])
@@ -32,7 +43,88 @@ def _ensure_unique_pnr(pnr_candidate: str, db: Session) -> bool:
     return exists is None
 
 
-@router.post("/initiate", response_model=SeatSelectionResponse, status_code=201)
+def _held_seat_ids(db: Session, booking_id: int) -> list:
+    """Seats reserved by a booking: its hold rows plus seats linked to travellers."""
+    held = db.query(SeatHold.seat_id).filter(SeatHold.booking_id == booking_id)
+    linked = db.query(BookingSeat.seat_id).filter(BookingSeat.booking_id == booking_id)
+    return [seat_id for (seat_id,) in held.union(linked).all()]
+
+
+def _hold_expired(booking: Booking) -> bool:
+    return booking.timer_expiry is not None and booking.timer_expiry <= datetime.utcnow().isoformat()
+
+
+def _claim_seats(db: Session, flight_id: int, seat_ids) -> int:
+    """Mark the given seats booked in one conditional UPDATE; returns how many were still free."""
+    result = db.execute(
+        update(Seat)
+        .where(Seat.seat_id.in_(list(seat_ids)), Seat.flight_id == flight_id, Seat.is_booked == 0)
+        .values(is_booked=1)
+        .execution_options(synchronize_session=False)
+    )
+    return result.rowcount
+
+
+def _release_seats(db: Session, seat_ids) -> int:
+    """Mark the given seats free in one UPDATE; returns how many were actually booked."""
+    if not seat_ids:
+        return 0
+    result = db.execute(
+        update(Seat)
+        .where(Seat.seat_id.in_(list(seat_ids)), Seat.is_booked == 1)
+        .values(is_booked=0)
+        .execution_options(synchronize_session=False)
+    )
+    return result.rowcount
+
+
+def _pending_booking(payload: SeatSelectionRequest, seat_ids: list, travel_class, total_price: float,
+                     pnr: str, timer_expiry: datetime) -> Booking:
+    return Booking(
+        user_id=payload.user_id,
+        flight_id=payload.flight_id,
+        booking_date=datetime.utcnow().isoformat(),
+        trip_type="One Way",
+        return_date=None,
+        travellers_count=len(seat_ids),
+        travel_class=travel_class,
+        total_price=total_price,
+        status="PENDING",
+        pnr=pnr,
+        timer_expiry=timer_expiry.isoformat()
+    )
+
+
+def _seat_holds(booking_id: int, flight_id: int, seat_ids: list, seat_prices: dict) -> list:
+    """Durable record of the reserved seats, released by the hold reaper on expiry."""
+    return [
+        SeatHold(booking_id=booking_id, flight_id=flight_id, seat_id=seat_id, seat_price=seat_prices[seat_id])
+        for seat_id in seat_ids
+    ]
+
+
+def _check_seats(payload: SeatSelectionRequest, seat_ids: list, seats: list):
+    if len(seats) != len(seat_ids):
+        raise HTTPException(status_code=400, detail="One or more selected seats not found")
+
+    # ensure seats belong to flight
+    for s in seats:
+        if s.flight_id != payload.flight_id:
+            raise HTTPException(status_code=400, detail=f"Seat {s.seat_id} does not belong to flight {payload.flight_id}")
+
+
+def _selection_response(new_booking: Booking, seat_ids: list) -> SeatSelectionResponse:
+    return SeatSelectionResponse(
+        booking_id=new_booking.booking_id,
+        pnr=new_booking.pnr,
+        flight_id=new_booking.flight_id,
+        reserved_seat_ids=[int(seat_id) for seat_id in seat_ids],
+        total_price=new_booking.total_price,
+        status=new_booking.status,
+        timer_expiry=new_booking.timer_expiry
+    )
+
+
 def initiate_booking(payload: SeatSelectionRequest, db: Session = Depends(get_db)):
  
     # basic checks
@@ -42,77 +134,396 @@ def initiate_booking(payload: SeatSelectionRequest, db: Session = Depends(get_db
 
     seat_ids = list(dict.fromkeys(payload.seat_ids))  # unique preserve order
     seats = db.query(Seat).filter(Seat.seat_id.in_(seat_ids)).all()
-    if len(seats) != len(seat_ids):
-        raise HTTPException(status_code=400, detail="One or more selected seats not found")
-
-    # ensure seats belong to flight
-    for s in seats:
-        if s.flight_id != payload.flight_id:
-            raise HTTPException(status_code=400, detail=f"Seat {s.seat_id} does not belong to flight {payload.flight_id}")
+    _check_seats(payload, seat_ids, seats)
 
     # get dynamic price per passenger 
     try:
-        pricing = calculate_dynamic_price(payload.flight_id, db)
+        pricing = calculate_dynamic_prices([payload.flight_id], db).get(payload.flight_id, {})
         dynamic_per_passenger = float(pricing.get("final_price", float(flight.base_fare)))
     except Exception:
         dynamic_per_passenger = float(getattr(flight, "base_fare", 0.0))
 
     # seat addons
-    seat_addons_total = sum(float(getattr(s, "seat_price", 0.0) or 0.0) for s in seats)
-    total_price = dynamic_per_passenger * len(seats) + seat_addons_total
+    seat_prices = {s.seat_id: float(getattr(s, "seat_price", 0.0) or 0.0) for s in seats}
+    total_price = dynamic_per_passenger * len(seats) + sum(seat_prices.values())
     total_price = round(total_price, 2)
+    travel_class = flight.travel_class
+
+    # end the read transaction: the claim below then starts a fresh write
+    # transaction instead of upgrading a stale read snapshot
+    db.rollback()
 
     temp_pnr = "TMP" + _gen_pnr(5)
     timer_expiry = datetime.utcnow() + timedelta(minutes=payload.hold_minutes or 15)
+
+    def reserve(db: Session) -> Booking:
+        # atomic claim: only seats that are still free flip to booked
+        claimed = _claim_seats(db, payload.flight_id, seat_ids)
+        if claimed != len(seat_ids):
+            raise HTTPException(status_code=status.HTTP_409_CONFLICT,
+                                detail="One or more selected seats already booked/reserved")
+
+        new_booking = _pending_booking(payload, seat_ids, travel_class, total_price, temp_pnr, timer_expiry)
+        db.add(new_booking)
+        db.flush()
+        db.add_all(_seat_holds(new_booking.booking_id, payload.flight_id, seat_ids, seat_prices))
+
+        adjust_inventory(db, payload.flight_id, booked=len(seat_ids), bookings=1)
+        db.commit()
+        return new_booking
+
     try:
-        with db.begin():
-            # re-query seats inside transaction
-            seats_tx = db.query(Seat).filter(Seat.seat_id.in_(seat_ids)).with_for_update(read=False).all()
-            # re-check availability
-            for s in seats_tx:
-                if int(s.is_booked) == 1:
-                    raise HTTPException(status_code=status.HTTP_409_CONFLICT,
-                                        detail=f"Seat {s.seat_id} already booked/reserved")
-
-            for s in seats_tx:
-                s.is_booked = 1
-                db.add(s)
-
-            new_booking = Booking(
-                user_id=payload.user_id,
-                flight_id=payload.flight_id,
-                booking_date=datetime.utcnow().isoformat(),
-                trip_type="One Way",
-                return_date=None,
-                travellers_count=len(seats_tx),
-                travel_class=flight.travel_class,
-                total_price=total_price,
-                status="PENDING",
-                pnr=temp_pnr,
-                timer_expiry=timer_expiry.isoformat()
-            )
-            db.add(new_booking)
+        # partial claims are rolled back by run_with_retry; lock contention is retried with backoff
+        new_booking = run_with_retry(db, reserve)
+        price_cache.invalidate([payload.flight_id])
+        seat_maps.mark(payload.flight_id, seat_ids, booked=True)
+        hold_reaper.add(new_booking.booking_id, timer_expiry)
 
         # refresh booking to get id
         db.refresh(new_booking)
 
     except HTTPException:
+        db.rollback()
         raise
     except SQLAlchemyError as e:
         db.rollback()
+        if is_lock_error(e):
+            raise HTTPException(status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                                detail="Seats are busy, please retry")
         raise HTTPException(status_code=500, detail=f"DB error during initiate: {e}")
     except Exception as e:
         db.rollback()
         raise HTTPException(status_code=500, detail=f"Unexpected error: {e}")
 
-    return SeatSelectionResponse(
-        booking_id=new_booking.booking_id,
-        pnr=new_booking.pnr,
-        flight_id=new_booking.flight_id,
-        reserved_seat_ids=[int(s.seat_id) for s in seats],
-        total_price=new_booking.total_price,
-        status=new_booking.status,
-        timer_expiry=new_booking.timer_expiry
+    return _selection_response(new_booking, seat_ids)
+
+
+async def initiate_booking_async(payload: SeatSelectionRequest, db: AsyncSession = Depends(get_async_db)):
+    """
+    Async version of initiate_booking (DB_MODE=async): the same atomic seat
+    claim, awaited on the event loop; lock contention backs off with asyncio.sleep.
+    """
+    Flight = models.flight.Flight
+    flight = (await db.execute(
+        select(Flight.base_fare, Flight.travel_class).where(Flight.flight_id == payload.flight_id)
+    )).first()
+    if not flight:
+        raise HTTPException(status_code=404, detail="Flight not found")
+
+    seat_ids = list(dict.fromkeys(payload.seat_ids))  # unique preserve order
+    seats = (await db.execute(
+        select(Seat.seat_id, Seat.flight_id, Seat.seat_price).where(Seat.seat_id.in_(seat_ids))
+    )).all()
+    _check_seats(payload, seat_ids, seats)
+
+    try:
+        pricing = (await calculate_dynamic_prices_async([payload.flight_id], db)).get(payload.flight_id, {})
+        dynamic_per_passenger = float(pricing.get("final_price", float(flight.base_fare)))
+    except Exception:
+        dynamic_per_passenger = float(flight.base_fare or 0.0)
+
+    seat_prices = {s.seat_id: float(s.seat_price or 0.0) for s in seats}
+    total_price = round(dynamic_per_passenger * len(seats) + sum(seat_prices.values()), 2)
+
+    # end the read transaction before the write one, as in the sync handler
+    await db.rollback()
+
+    temp_pnr = "TMP" + _gen_pnr(5)
+    timer_expiry = datetime.utcnow() + timedelta(minutes=payload.hold_minutes or 15)
+
+    async def reserve(db: AsyncSession) -> Booking:
+        claimed = await db.run_sync(_claim_seats, payload.flight_id, seat_ids)
+        if claimed != len(seat_ids):
+            raise HTTPException(status_code=status.HTTP_409_CONFLICT,
+                                detail="One or more selected seats already booked/reserved")
+
+        new_booking = _pending_booking(payload, seat_ids, flight.travel_class, total_price, temp_pnr, timer_expiry)
+        db.add(new_booking)
+        await db.flush()
+        db.add_all(_seat_holds(new_booking.booking_id, payload.flight_id, seat_ids, seat_prices))
+
+        await db.run_sync(adjust_inventory, payload.flight_id, booked=len(seat_ids), bookings=1)
+        await db.commit()
+        return new_booking
+
+    try:
+        new_booking = await run_with_retry_async(db, reserve)
+        price_cache.invalidate([payload.flight_id])
+        seat_maps.mark(payload.flight_id, seat_ids, booked=True)
+        hold_reaper.add(new_booking.booking_id, timer_expiry)
+
+    except HTTPException:
+        await db.rollback()
+        raise
+    except SQLAlchemyError as e:
+        await db.rollback()
+        if is_lock_error(e):
+            raise HTTPException(status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                                detail="Seats are busy, please retry")
+        raise HTTPException(status_code=500, detail=f"DB error during initiate: {e}")
+    except Exception as e:
+        await db.rollback()
+        raise HTTPException(status_code=500, detail=f"Unexpected error: {e}")
+
+    return _selection_response(new_booking, seat_ids)
+
+
+# DB_MODE=async serves initiate and payment with the async handlers
+router.add_api_route(
+    "/initiate",
+    initiate_booking_async if config.DB_MODE == "async" else initiate_booking,
+    methods=["POST"],
+    response_model=SeatSelectionResponse,
+    status_code=201,
+)
+
+
+def _claim_seat_ids(db: Session, seat_ids) -> set:
+    """Mark the given seats booked in one conditional UPDATE; returns the ids that were still free."""
+    if not seat_ids:
+        return set()
+    result = db.execute(
+        update(Seat)
+        .where(Seat.seat_id.in_(list(seat_ids)), Seat.is_booked == 0)
+        .values(is_booked=1)
+        .returning(Seat.seat_id)
+        .execution_options(synchronize_session=False)
+    )
+    return set(result.scalars().all())
+
+
+def _unique_pnrs(db: Session, count: int) -> list:
+    """count new PNRs, checked against existing bookings with one query per round."""
+    pnrs = set()
+    while len(pnrs) < count:
+        candidates = {_gen_pnr(6) for _ in range(count - len(pnrs))} - pnrs
+        taken = {pnr for (pnr,) in db.query(Booking.pnr).filter(Booking.pnr.in_(candidates))}
+        pnrs |= candidates - taken
+    return list(pnrs)
+
+
+class _BatchRejected(Exception):
+    """All-or-nothing batch with failed items; rolls back the claim transaction."""
+
+
+@router.post("/batch", response_model=BatchBookingResponse, status_code=201)
+def batch_booking(payload: BatchBookingRequest, db: Session = Depends(get_db)):
+    """
+    Book many (flight, seats, travellers) items at once: one pricing call,
+    one transaction claiming every seat and bulk inserts of the bookings,
+    holds, travellers and booking seats (plus payments with
+    simulate_payment). In all_or_nothing mode any failed item fails the
+    whole batch (400 for invalid items, 409 for taken seats) with the
+    per-item results in the error detail; best_effort books what it can.
+    """
+    items = payload.items
+    results = [
+        BatchItemResult(index=i, flight_id=item.flight_id, status="FAILED")
+        for i, item in enumerate(items)
+    ]
+    seat_ids_of = [list(dict.fromkeys(item.seat_ids)) for item in items]  # unique preserve order
+
+    # validate every item against one flights and one seats query
+    flight_ids = list(dict.fromkeys(item.flight_id for item in items))
+    flights = {
+        f.flight_id: f for f in
+        db.query(models.flight.Flight).filter(models.flight.Flight.flight_id.in_(flight_ids)).all()
+    }
+    all_seat_ids = {seat_id for seat_ids in seat_ids_of for seat_id in seat_ids}
+    seats = {
+        s.seat_id: s for s in
+        db.query(Seat.seat_id, Seat.flight_id, Seat.seat_price).filter(Seat.seat_id.in_(all_seat_ids)).all()
+    }
+    requested = set()
+    valid = []
+    for i, (item, seat_ids) in enumerate(zip(items, seat_ids_of)):
+        if item.flight_id not in flights:
+            results[i].error = "Flight not found"
+        elif len(item.travellers) != len(seat_ids):
+            results[i].error = "Number of travellers must match selected seats count"
+        elif any(seat_id not in seats for seat_id in seat_ids):
+            results[i].error = "One or more selected seats not found"
+        elif any(seats[seat_id].flight_id != item.flight_id for seat_id in seat_ids):
+            results[i].error = f"One or more seats do not belong to flight {item.flight_id}"
+        elif requested.intersection(seat_ids):
+            results[i].error = "One or more seats are already requested by an earlier item"
+        else:
+            requested.update(seat_ids)
+            valid.append(i)
+
+    def reject(status_code: int, message: str):
+        for result in results:
+            result.error = result.error or "Not booked: another item of the batch failed"
+        raise HTTPException(status_code=status_code, detail={
+            "message": message,
+            "results": [r.dict() for r in results],
+        })
+
+    if payload.mode == "all_or_nothing" and len(valid) != len(items):
+        reject(400, "One or more batch items are invalid")
+
+    # one pricing call for every flight in the batch
+    try:
+        pricing = calculate_dynamic_prices(flight_ids, db)
+    except Exception:
+        pricing = {}
+    per_passenger = {
+        fid: float(pricing.get(fid, {}).get("final_price", float(flight.base_fare)))
+        for fid, flight in flights.items()
+    }
+    for i in valid:
+        fid = items[i].flight_id
+        seat_total = sum(float(seats[seat_id].seat_price or 0.0) for seat_id in seat_ids_of[i])
+        results[i].total_price = round(per_passenger[fid] * len(seat_ids_of[i]) + seat_total, 2)
+    # read before the rollback below expires the flights
+    travel_classes = {fid: flight.travel_class for fid, flight in flights.items()}
+
+    # end the read transaction: the claim below then starts a fresh write
+    # transaction instead of upgrading a stale read snapshot
+    db.rollback()
+
+    paid = bool(payload.simulate_payment)
+    now = datetime.utcnow()
+    timer_expiry = now + timedelta(minutes=payload.hold_minutes or 15)
+
+    def reserve(db: Session) -> list:
+        # atomic claim of every requested seat; items missing any seat fail
+        claimed = _claim_seat_ids(db, requested)
+        booked, partial = [], []
+        for i in valid:
+            missing = [seat_id for seat_id in seat_ids_of[i] if seat_id not in claimed]
+            if missing:
+                results[i].error = "One or more selected seats already booked/reserved"
+                partial.extend(seat_id for seat_id in seat_ids_of[i] if seat_id in claimed)
+            else:
+                results[i].error = None
+                booked.append(i)
+        if payload.mode == "all_or_nothing" and len(booked) != len(valid):
+            raise _BatchRejected()
+        _release_seats(db, partial)
+        if not booked:
+            db.commit()
+            return booked
+
+        pnrs = _unique_pnrs(db, len(booked)) if paid else ["TMP" + _gen_pnr(5) for _ in booked]
+        booking_ids = db.execute(
+            insert(Booking).returning(Booking.booking_id, sort_by_parameter_order=True),
+            [
+                {
+                    "user_id": payload.user_id,
+                    "flight_id": items[i].flight_id,
+                    "booking_date": now.isoformat(),
+                    "trip_type": "One Way",
+                    "return_date": None,
+                    "travellers_count": len(seat_ids_of[i]),
+                    "travel_class": travel_classes[items[i].flight_id],
+                    "total_price": results[i].total_price,
+                    "status": "CONFIRMED" if paid else "PENDING",
+                    "pnr": pnr,
+                    "timer_expiry": timer_expiry.isoformat(),
+                }
+                for i, pnr in zip(booked, pnrs)
+            ],
+        ).scalars().all()
+
+        # durable record of the reserved seats, released by the hold reaper on expiry
+        db.execute(insert(SeatHold), [
+            {
+                "booking_id": booking_id,
+                "flight_id": items[i].flight_id,
+                "seat_id": seat_id,
+                "seat_price": seats[seat_id].seat_price,
+            }
+            for i, booking_id in zip(booked, booking_ids)
+            for seat_id in seat_ids_of[i]
+        ])
+
+        # one multi-row INSERT for all travellers, ids returned in parameter order
+        traveller_ids = db.execute(
+            insert(Traveller).returning(Traveller.traveller_id, sort_by_parameter_order=True),
+            [
+                {"booking_id": booking_id, **trav_info.dict()}
+                for i, booking_id in zip(booked, booking_ids)
+                for trav_info in items[i].travellers
+            ],
+        ).scalars().all()
+
+        # traveller k of an item gets its k-th seat
+        seat_rows = [
+            (booking_id, seat_id)
+            for i, booking_id in zip(booked, booking_ids)
+            for seat_id in seat_ids_of[i]
+        ]
+        db.execute(insert(BookingSeat), [
+            {
+                "booking_id": booking_id,
+                "traveller_id": traveller_id,
+                "seat_id": seat_id,
+                "seat_price": seats[seat_id].seat_price,
+            }
+            for traveller_id, (booking_id, seat_id) in zip(traveller_ids, seat_rows)
+        ])
+
+        if paid:
+            db.execute(insert(Payment), [
+                {
+                    "booking_id": booking_id,
+                    "payment_method": "SIMULATED",
+                    "payment_time": now.isoformat(),
+                    "amount": results[i].total_price,
+                    "status": "SUCCESS",
+                }
+                for i, booking_id in zip(booked, booking_ids)
+            ])
+
+        per_flight = {}
+        for i in booked:
+            counts = per_flight.setdefault(items[i].flight_id, [0, 0])
+            counts[0] += len(seat_ids_of[i])
+            counts[1] += 1
+        for fid, (seat_count, booking_count) in per_flight.items():
+            adjust_inventory(db, fid, booked=seat_count, linked=seat_count, bookings=booking_count)
+        db.commit()
+
+        for i, booking_id, pnr in zip(booked, booking_ids, pnrs):
+            results[i].booking_id = booking_id
+            results[i].pnr = pnr
+        return booked
+
+    try:
+        # lock contention is retried with backoff; every attempt re-runs the whole claim
+        booked = run_with_retry(db, reserve)
+    except _BatchRejected:
+        reject(409, "One or more selected seats already booked/reserved")
+    except HTTPException:
+        db.rollback()
+        raise
+    except SQLAlchemyError as e:
+        db.rollback()
+        if is_lock_error(e):
+            raise HTTPException(status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                                detail="Seats are busy, please retry")
+        raise HTTPException(status_code=500, detail=f"DB error during batch booking: {e}")
+    except Exception as e:
+        db.rollback()
+        raise HTTPException(status_code=500, detail=f"Unexpected error: {e}")
+
+    if booked:
+        price_cache.invalidate({items[i].flight_id for i in booked})
+    for i in booked:
+        seat_maps.mark(items[i].flight_id, seat_ids_of[i], booked=True)
+        results[i].status = "CONFIRMED" if paid else "PENDING"
+        results[i].reserved_seat_ids = [int(seat_id) for seat_id in seat_ids_of[i]]
+        results[i].timer_expiry = timer_expiry.isoformat()
+        if not paid:
+            hold_reaper.add(results[i].booking_id, timer_expiry)
+
+    return BatchBookingResponse(
+        mode=payload.mode,
+        booked=len(booked),
+        failed=len(items) - len(booked),
+        total_price=round(sum(results[i].total_price for i in booked), 2),
+        results=results,
     )
 
 
@@ -123,51 +534,67 @@ def add_passengers(booking_id: int, payload: PassengerInfoRequest, db: Session =
     if not booking:
         raise HTTPException(status_code=404, detail="Booking not found")
 
+    if booking.status in ("EXPIRED", "CANCELLED", "FAILED"):
+        raise HTTPException(status_code=400, detail=f"Booking is {booking.status.lower()}, passengers can no longer be added")
+
     if len(payload.travellers) != int(booking.travellers_count):
         raise HTTPException(status_code=400, detail="Number of travellers must match reserved seats count")
 
     try:
-        with db.begin():
-            created = 0
-            reserved_seats = db.query(Seat).filter(
-                Seat.flight_id == booking.flight_id,
-                Seat.is_booked == 1
-            ).all()
-
-            existing_bs = db.query(BookingSeat).filter(BookingSeat.booking_id == booking_id).all()
-            linked_seat_ids = {bs.seat_id for bs in existing_bs}
-
-            assignable = [s for s in reserved_seats if s.seat_id not in linked_seat_ids]
-            if len(assignable) < len(payload.travellers):
-                raise HTTPException(status_code=400, detail="Not enough reserved seats available to attach travellers")
-
-            for idx, trav_info in enumerate(payload.travellers):
-                # create traveller
-                t = Traveller(
-                    booking_id=booking.booking_id,
-                    first_name=trav_info.first_name,
-                    middle_name=trav_info.middle_name,
-                    last_name=trav_info.last_name,
-                    dob=trav_info.dob,
-                    government_id_type=trav_info.government_id_type,
-                    government_id_number=trav_info.government_id_number,
-                    email=trav_info.email,
-                    phone=trav_info.phone
-                )
-                db.add(t)
-                db.flush() 
-
-                # attach to a seat
-                seat_obj = assignable[idx]
-                bs = BookingSeat(
-                    booking_id=booking.booking_id,
-                    traveller_id=t.traveller_id,
-                    seat_id=seat_obj.seat_id,
-                    seat_price=seat_obj.seat_price
-                )
-                db.add(bs)
-                created += 1
+        # this booking's own reserved seats (indexed lookups by booking_id)
+        holds = (
+            db.query(SeatHold.seat_id, SeatHold.seat_price)
+            .filter(SeatHold.booking_id == booking_id)
+            .order_by(SeatHold.hold_id)
+            .all()
+        )
+        linked_seat_ids = {
+            seat_id for (seat_id,) in
+            db.query(BookingSeat.seat_id).filter(BookingSeat.booking_id == booking_id)
+        }
+
+        assignable = [h for h in holds if h.seat_id not in linked_seat_ids]
+        if len(assignable) < len(payload.travellers):
+            raise HTTPException(status_code=400, detail="Not enough reserved seats available to attach travellers")
+
+        # one multi-row INSERT for the travellers, ids returned in parameter order
+        traveller_ids = db.execute(
+            insert(Traveller).returning(Traveller.traveller_id, sort_by_parameter_order=True),
+            [
+                {
+                    "booking_id": booking.booking_id,
+                    "first_name": trav_info.first_name,
+                    "middle_name": trav_info.middle_name,
+                    "last_name": trav_info.last_name,
+                    "dob": trav_info.dob,
+                    "government_id_type": trav_info.government_id_type,
+                    "government_id_number": trav_info.government_id_number,
+                    "email": trav_info.email,
+                    "phone": trav_info.phone,
+                }
+                for trav_info in payload.travellers
+            ],
+        ).scalars().all()
+
+        # attach each traveller to a held seat
+        db.execute(insert(BookingSeat), [
+            {
+                "booking_id": booking.booking_id,
+                "traveller_id": traveller_id,
+                "seat_id": hold.seat_id,
+                "seat_price": hold.seat_price,
+            }
+            for traveller_id, hold in zip(traveller_ids, assignable)
+        ])
+        created = len(traveller_ids)
+
+        adjust_inventory(db, booking.flight_id, linked=created)
+        db.commit()
+        price_cache.invalidate([booking.flight_id])
 
+    except HTTPException:
+        db.rollback()
+        raise
     except SQLAlchemyError as e:
         db.rollback()
         raise HTTPException(status_code=500, detail=f"DB error adding passengers: {e}")
@@ -178,59 +605,106 @@ def add_passengers(booking_id: int, payload: PassengerInfoRequest, db: Session =
     return PassengerInfoResponse(booking_id=booking_id, travellers_created=created)
 
 
-@router.post("/{booking_id}/pay", response_model=PaymentResponse)
-def process_payment(booking_id: int, payload: PaymentRequest, db: Session = Depends(get_db)):
-  
-    booking = db.query(Booking).filter(Booking.booking_id == booking_id).first()
+def _payment_precheck(booking_id: int, booking) -> Optional[PaymentResponse]:
+    """Reject bookings that can't be paid; returns the response for an already confirmed one."""
     if not booking:
         raise HTTPException(status_code=404, detail="Booking not found")
 
     if booking.status == "CONFIRMED":
         return PaymentResponse(booking_id=booking_id, status="ALREADY_CONFIRMED", pnr=booking.pnr, message="Booking already confirmed")
 
-    linked_bs = db.query(BookingSeat).filter(BookingSeat.booking_id == booking_id).all()
-    linked_seat_ids = [bs.seat_id for bs in linked_bs]
+    if booking.status == "EXPIRED" or (booking.status == "PENDING" and _hold_expired(booking)):
+        raise HTTPException(status_code=400, detail="Seat hold expired, please start a new booking")
+
+    if booking.status != "PENDING":
+        raise HTTPException(status_code=400, detail=f"Booking is {booking.status.lower()}, it can no longer be paid")
+    return None
+
+
+def _settle_statement(booking_id: int, new_status: str, pnr: str):
+    # flip the status only while the hold is still live, so a hold expiring or a
+    # cancel landing concurrently can't leave a confirmed booking without seats
+    return (
+        update(Booking)
+        .where(
+            Booking.booking_id == booking_id,
+            Booking.status == "PENDING",
+            Booking.timer_expiry > datetime.utcnow().isoformat(),
+        )
+        .values(status=new_status, pnr=pnr)
+        .execution_options(synchronize_session=False)
+    )
+
+
+def _not_pending():
+    return HTTPException(status_code=status.HTTP_409_CONFLICT,
+                         detail="Booking is no longer pending (hold expired or booking cancelled)")
+
+
+def _payment(booking_id: int, amount, success: bool) -> Payment:
+    return Payment(
+        booking_id=booking_id,
+        payment_method="SIMULATED",
+        payment_time=datetime.utcnow().isoformat(),
+        amount=amount,
+        status="SUCCESS" if success else "FAILED"
+    )
+
+
+def _release_booking_seats(db: Session, booking_id: int, flight_id: int) -> list:
+    """Free a booking's seats and their inventory count; returns the seat ids."""
+    seat_ids = _held_seat_ids(db, booking_id)
+    released = _release_seats(db, seat_ids)
+    adjust_inventory(db, flight_id, booked=-released)
+    return seat_ids
+
+
+def process_payment(booking_id: int, payload: PaymentRequest, db: Session = Depends(get_db)):
+  
+    booking = db.query(Booking).filter(Booking.booking_id == booking_id).first()
+    confirmed = _payment_precheck(booking_id, booking)
+    if confirmed is not None:
+        return confirmed
 
     success = bool(payload.simulate_success)
+    flight_id = booking.flight_id
+    amount = booking.total_price
+    new_status = "CONFIRMED" if success else "FAILED"
+    pnr = booking.pnr
+    linked_seat_ids = []
 
     try:
-        with db.begin():
-            pay = Payment(
-                booking_id=booking.booking_id,
-                payment_method="SIMULATED",
-                payment_time=datetime.utcnow().isoformat(),
-                amount=booking.total_price,
-                status="SUCCESS" if success else "FAILED"
-            )
-            db.add(pay)
-            db.flush()
-
-            if success:
-                # generate unique PNR
-                pnr_attempts = 0
-                pnr = None
-                while pnr_attempts < 6:
-                    candidate = _gen_pnr(6)
-                    if _ensure_unique_pnr(candidate, db):
-                        pnr = candidate
-                        break
-                    pnr_attempts += 1
-
-                if not pnr:
-                    pnr = f"PNR{booking.booking_id:06d}"
-
-                booking.status = "CONFIRMED"
-                booking.pnr = pnr
-                db.add(booking)
-            else:
-                for seat_id in linked_seat_ids:
-                    s = db.query(Seat).filter(Seat.seat_id == seat_id).first()
-                    if s:
-                        s.is_booked = 0
-                        db.add(s)
-                booking.status = "FAILED"
-                db.add(booking)
+        if success:
+            # generate unique PNR
+            pnr_attempts = 0
+            pnr = None
+            while pnr_attempts < 6:
+                candidate = _gen_pnr(6)
+                if _ensure_unique_pnr(candidate, db):
+                    pnr = candidate
+                    break
+                pnr_attempts += 1
+
+            if not pnr:
+                pnr = f"PNR{booking_id:06d}"
+
+        if not db.execute(_settle_statement(booking_id, new_status, pnr)).rowcount:
+            raise _not_pending()
+
+        db.add(_payment(booking_id, amount, success))
+
+        if not success:
+            # the seats are still this booking's: the status flip above won the race
+            linked_seat_ids = _release_booking_seats(db, booking_id, flight_id)
+
+        db.commit()
+        if not success:
+            price_cache.invalidate([flight_id])
+            seat_maps.mark(flight_id, linked_seat_ids, booked=False)
 
+    except HTTPException:
+        db.rollback()
+        raise
     except IntegrityError as e:
         db.rollback()
         raise HTTPException(status_code=500, detail=f"PNR uniqueness or Integrity error: {e}")
@@ -241,7 +715,74 @@ def process_payment(booking_id: int, payload: PaymentRequest, db: Session = Depe
         db.rollback()
         raise HTTPException(status_code=500, detail=f"Unexpected error during payment: {e}")
 
-    return PaymentResponse(booking_id=booking.booking_id, status=booking.status, pnr=booking.pnr, message="Payment processed")
+    return PaymentResponse(booking_id=booking_id, status=new_status, pnr=pnr, message="Payment processed")
+
+
+async def process_payment_async(booking_id: int, payload: PaymentRequest,
+                                db: AsyncSession = Depends(get_async_db)):
+    """
+    Async version of process_payment (DB_MODE=async), with the same
+    conditional PENDING -> CONFIRMED/FAILED flip.
+    """
+    booking = (await db.execute(
+        select(Booking.status, Booking.pnr, Booking.timer_expiry, Booking.flight_id, Booking.total_price)
+        .where(Booking.booking_id == booking_id)
+    )).first()
+    confirmed = _payment_precheck(booking_id, booking)
+    if confirmed is not None:
+        return confirmed
+
+    success = bool(payload.simulate_success)
+    new_status = "CONFIRMED" if success else "FAILED"
+    pnr = booking.pnr
+    linked_seat_ids = []
+
+    try:
+        if success:
+            for _ in range(6):
+                candidate = _gen_pnr(6)
+                taken = (await db.execute(select(Booking.booking_id).where(Booking.pnr == candidate))).first()
+                if taken is None:
+                    pnr = candidate
+                    break
+            else:
+                pnr = f"PNR{booking_id:06d}"
+
+        if not (await db.execute(_settle_statement(booking_id, new_status, pnr))).rowcount:
+            raise _not_pending()
+
+        db.add(_payment(booking_id, booking.total_price, success))
+
+        if not success:
+            linked_seat_ids = await db.run_sync(_release_booking_seats, booking_id, booking.flight_id)
+
+        await db.commit()
+        if not success:
+            price_cache.invalidate([booking.flight_id])
+            seat_maps.mark(booking.flight_id, linked_seat_ids, booked=False)
+
+    except HTTPException:
+        await db.rollback()
+        raise
+    except IntegrityError as e:
+        await db.rollback()
+        raise HTTPException(status_code=500, detail=f"PNR uniqueness or Integrity error: {e}")
+    except SQLAlchemyError as e:
+        await db.rollback()
+        raise HTTPException(status_code=500, detail=f"DB error during payment: {e}")
+    except Exception as e:
+        await db.rollback()
+        raise HTTPException(status_code=500, detail=f"Unexpected error during payment: {e}")
+
+    return PaymentResponse(booking_id=booking_id, status=new_status, pnr=pnr, message="Payment processed")
+
+
+router.add_api_route(
+    "/{booking_id}/pay",
+    process_payment_async if config.DB_MODE == "async" else process_payment,
+    methods=["POST"],
+    response_model=PaymentResponse,
+)
 
 # Booking Cancellation
 @router.post("/{booking_id}/cancel", status_code=200)
@@ -254,18 +795,24 @@ def cancel_booking(booking_id: int, db: Session = Depends(get_db)):
         raise HTTPException(status_code=400, detail="Only confirmed or pending bookings can be cancelled")
 
     try:
-        with db.begin():
-            linked_bs = db.query(BookingSeat).filter(BookingSeat.booking_id == booking_id).all()
-            for bs in linked_bs:
-                seat = db.query(Seat).filter(Seat.seat_id == bs.seat_id).first()
-                if seat:
-                    seat.is_booked = 0
-                    db.add(seat)
-
-            # update booking
-            booking.status = "CANCELLED"
-            db.add(booking)
+        # flip the status first, so a hold expiring concurrently releases the seats only once
+        claimed = db.execute(
+            update(Booking)
+            .where(Booking.booking_id == booking_id, Booking.status.in_(["CONFIRMED", "PENDING"]))
+            .values(status="CANCELLED")
+            .execution_options(synchronize_session=False)
+        ).rowcount
+        if not claimed:
+            raise HTTPException(status_code=400, detail="Only confirmed or pending bookings can be cancelled")
+
+        linked_seat_ids = _release_booking_seats(db, booking_id, booking.flight_id)
+        db.commit()
+        price_cache.invalidate([booking.flight_id])
+        seat_maps.mark(booking.flight_id, linked_seat_ids, booked=False)
 
+    except HTTPException:
+        db.rollback()
+        raise
     except SQLAlchemyError as e:
         db.rollback()
         raise HTTPException(status_code=500, detail=f"DB error cancelling booking: {e}")
@@ -276,28 +823,47 @@ def cancel_booking(booking_id: int, db: Session = Depends(get_db)):
     return {"booking_id": booking.booking_id, "status": "CANCELLED", "message": "Booking cancelled and seats released."}
 
 #Booking History Retrieval
-@router.get("/history/{user_id}", status_code=200)
-def get_booking_history(user_id: int, db: Session = Depends(get_db)):
-    bookings = db.query(Booking).filter(Booking.user_id == user_id).all()
-    if not bookings:
+@router.get("/history/{user_id}", response_model=BookingHistoryResponse, status_code=200)
+def get_booking_history(
+    user_id: int,
+    cursor: Optional[int] = Query(None, description="Return bookings after this booking_id (next_cursor of the previous page)"),
+    limit: int = Query(50, ge=1, le=200, description="Bookings per page"),
+    status: Optional[str] = Query(None, description="Only bookings with this status (e.g. CONFIRMED)"),
+    from_date: Optional[date] = Query(None, description="Booked on or after this date (YYYY-MM-DD)"),
+    to_date: Optional[date] = Query(None, description="Booked on or before this date (YYYY-MM-DD)"),
+    db: Session = Depends(get_db),
+):
+    query = db.query(Booking).filter(Booking.user_id == user_id)
+    if status:
+        query = query.filter(func.upper(Booking.status) == status.upper())
+    # booking_date is an ISO string, so date bounds compare lexically
+    if from_date:
+        query = query.filter(Booking.booking_date >= from_date.isoformat())
+    if to_date:
+        query = query.filter(Booking.booking_date < (to_date + timedelta(days=1)).isoformat())
+    if cursor is not None:
+        query = query.filter(Booking.booking_id > cursor)
+
+    # keyset page on (user_id, booking_id); children in two IN queries instead of per booking
+    bookings = (
+        query.options(
+            selectinload(Booking.travellers),
+            selectinload(Booking.booking_seats).joinedload(BookingSeat.seat),
+        )
+        .order_by(Booking.booking_id)
+        .limit(limit + 1)
+        .all()
+    )
+    if not bookings and cursor is None and not (status or from_date or to_date):
         raise HTTPException(status_code=404, detail="No bookings found for this user")
 
+    next_cursor = None
+    if len(bookings) > limit:
+        bookings = bookings[:limit]
+        next_cursor = bookings[-1].booking_id
+
     history = []
     for b in bookings:
-        # get travellers and seats
-        travellers = db.query(Traveller).filter(Traveller.booking_id == b.booking_id).all()
-        booking_seats = db.query(BookingSeat).filter(BookingSeat.booking_id == b.booking_id).all()
-
-        seat_details = []
-        for bs in booking_seats:
-            seat = db.query(Seat).filter(Seat.seat_id == bs.seat_id).first()
-            if seat:
-                seat_details.append({
-                    "seat_number": seat.seat_number,
-                    "travel_class": seat.travel_class,
-                    "price": seat.seat_price
-                })
-
         history.append({
             "booking_id": b.booking_id,
             "pnr": b.pnr,
@@ -312,9 +878,15 @@ def get_booking_history(user_id: int, db: Session = Depends(get_db)):
                     "last_name": t.last_name,
                     "email": t.email,
                     "phone": t.phone
-                } for t in travellers
+                } for t in b.travellers
             ],
-            "seats": seat_details
+            "seats": [
+                {
+                    "seat_number": bs.seat.seat_number,
+                    "travel_class": bs.seat.travel_class,
+                    "price": bs.seat.seat_price
+                } for bs in b.booking_seats if bs.seat is not None
+            ]
         })
 
-    return {"user_id": user_id, "bookings": history}
+    return {"user_id": user_id, "bookings": history, "next_cursor": next_cursor}
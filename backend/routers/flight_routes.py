@@ -1,12 +1,26 @@
-from fastapi import APIRouter, Depends, HTTPException, Query
-from sqlalchemy.orm import Session, joinedload, aliased
-from backend import models, database
+from fastapi import APIRouter, Depends, Header, HTTPException, Query, Response
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import StreamingResponse
+from typing import Annotated, Optional
+import heapq
+import json
+from sqlalchemy import func, select
+from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+from backend import config, models, database
 from backend.schemas.flight import FlightSearchParams
 
-from backend.mock_airline_api import fetch_external_flights
-from datetime import datetime
+from backend.mock_airline_api import ingest_flights
+from datetime import datetime, timedelta
 
-from backend.utils.dynamic_pricing import calculate_dynamic_price
+from backend.utils.dynamic_pricing import _EPOCH, calculate_dynamic_prices, calculate_dynamic_prices_async
+from backend.utils.price_cache import price_cache
+from backend.utils.airport_index import airport_index
+from backend.utils.seat_map import SEAT_CLASSES, seat_maps
+from backend.utils.flight_sync import SYNC_BATCH_SIZE, sync_flights
+from backend.utils.price_snapshot import repricer, snapshot_is_fresh
+from backend.utils.route_graph import Itinerary, route_graph
 
 # ✅ Router instance
 router = APIRouter(prefix="/flights", tags=["Flights"])
@@ -14,164 +28,547 @@ router = APIRouter(prefix="/flights", tags=["Flights"])
 # ----------------------
 # 1. Retrieve all flights
 # ----------------------
+# rows fetched per round trip when streaming the listing
+FLIGHT_STREAM_CHUNK_SIZE = 1000
+
+_LISTING_COLUMNS = (
+    models.flight.Flight.flight_id,
+    models.flight.Flight.flight_code,
+    models.flight.Flight.company_name,
+    models.flight.Flight.origin_airport_id,
+    models.flight.Flight.destination_airport_id,
+    models.flight.Flight.departure_time,
+    models.flight.Flight.arrival_time,
+    models.flight.Flight.duration_minutes,
+    models.flight.Flight.stops,
+    models.flight.Flight.base_fare,
+    models.flight.Flight.travel_class,
+)
+
+
+def _listing_query(db: Session, order_by: str, cursor: Optional[str]):
+    """Flight columns only (airport cities come from the airport index), in keyset order."""
+    Flight = models.flight.Flight
+    query = db.query(*_LISTING_COLUMNS)
+    if order_by == "departure_time":
+        if cursor:
+            departure, flight_id = _parse_listing_cursor(cursor)
+            query = query.filter(
+                (Flight.departure_time > departure)
+                | ((Flight.departure_time == departure) & (Flight.flight_id > flight_id))
+            )
+        return query.order_by(Flight.departure_time, Flight.flight_id)
+    if cursor:
+        query = query.filter(Flight.flight_id > _parse_listing_cursor(cursor)[1])
+    return query.order_by(Flight.flight_id)
+
+
+def _parse_listing_cursor(cursor: str):
+    """'<flight_id>' or '<departure ISO time>|<flight_id>' -> (departure or None, flight_id)."""
+    try:
+        if "|" in cursor:
+            departure, flight_id = cursor.rsplit("|", 1)
+            return datetime.fromisoformat(departure), int(flight_id)
+        return None, int(cursor)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+
+def _listing_cursor(row, order_by: str) -> str:
+    if order_by == "departure_time":
+        return f"{row.departure_time.isoformat()}|{row.flight_id}"
+    return str(row.flight_id)
+
+
+def _flight_summary(row, db: Session) -> dict:
+    origin = airport_index.get(row.origin_airport_id, db)
+    destination = airport_index.get(row.destination_airport_id, db)
+    return {
+        "flight_code": row.flight_code,
+        "company_name": row.company_name,
+        "origin": origin.city if origin else None,
+        "destination": destination.city if destination else None,
+        "departure_time": row.departure_time,
+        "arrival_time": row.arrival_time,
+        "duration_minutes": row.duration_minutes,
+        "stops": row.stops,
+        "base_fare": row.base_fare,
+        "travel_class": row.travel_class
+    }
+
+
+def _json_default(value):
+    if isinstance(value, datetime):
+        return value.isoformat()
+    raise TypeError(f"{type(value).__name__} is not JSON serializable")
+
+
+def _stream_flights(fmt: str, order_by: str, cursor: Optional[str]):
+    """
+    Yield the listing as NDJSON lines or as one JSON array, reading
+    FLIGHT_STREAM_CHUNK_SIZE rows per round trip from a server-side cursor,
+    so memory stays flat whatever the table size. Uses its own session:
+    the request's session is closed before the body is sent.
+    """
+    db = database.SessionLocal()
+    try:
+        statement = _listing_query(db, order_by, cursor).statement
+        result = db.execute(statement.execution_options(yield_per=FLIGHT_STREAM_CHUNK_SIZE))
+        first = True
+        if fmt == "json":
+            yield "["
+        # one body chunk per partition of rows
+        for rows in result.partitions():
+            items = [json.dumps(_flight_summary(row, db), default=_json_default) for row in rows]
+            if fmt == "ndjson":
+                yield "\n".join(items) + "\n"
+            else:
+                yield ("" if first else ",") + ",".join(items)
+            first = False
+        if fmt == "json":
+            yield "]"
+    finally:
+        db.close()
+
+
 @router.get("/")
-def get_all_flights(db: Session = Depends(database.get_db)):
+def get_all_flights(
+    limit: Optional[int] = Query(None, ge=1, le=1000, description="Page size; returns {flights, next_cursor}"),
+    cursor: Optional[str] = Query(None, description="next_cursor of the previous page"),
+    order_by: str = Query("flight_id", pattern="^(flight_id|departure_time)$", description="Keyset order"),
+    stream: Optional[str] = Query(None, pattern="^(ndjson|json)$", description="Stream every flight as NDJSON or a JSON array"),
+    db: Session = Depends(database.get_db)
+):
+    """
+    Retrieve all flights with readable origin and destination.
+
+    Without parameters the full list is returned as before. Pass `limit`
+    (and then `cursor`) to page through it, or `stream` to receive the
+    whole listing incrementally.
+    """
+    if stream:
+        if cursor:
+            _parse_listing_cursor(cursor)  # reject bad cursors before the response starts
+        media_type = "application/x-ndjson" if stream == "ndjson" else "application/json"
+        return StreamingResponse(_stream_flights(stream, order_by, cursor), media_type=media_type)
+
+    query = _listing_query(db, order_by, cursor)
+    if limit is None:
+        return [_flight_summary(row, db) for row in query.all()]
+
+    rows = query.limit(limit + 1).all()
+    next_cursor = _listing_cursor(rows[limit - 1], order_by) if len(rows) > limit else None
+    return {"flights": [_flight_summary(row, db) for row in rows[:limit]], "next_cursor": next_cursor}
+
+def _time_of_day(value: str) -> timedelta:
+    hours, minutes = value.split(":")
+    return timedelta(hours=int(hours), minutes=int(minutes))
+
+
+def _rank_fields(item):
+    """(departure, duration_minutes, kind, flight ids) for a flight row or an itinerary."""
+    if isinstance(item, Itinerary):
+        departure = _EPOCH + timedelta(seconds=item.departure)
+        return departure, item.duration_minutes, 1, tuple(leg.flight_id for leg in item.legs)
+    return item.departure_time, item.duration_minutes, 0, (item.flight_id,)
+
+
+def _matching_connections(params: FlightSearchParams, itineraries) -> list:
+    """Itineraries passing the stop, airline and travel class filters."""
+    airline = params.airline.strip().lower() if params.airline else None
+    return [
+        itinerary for itinerary in itineraries
+        if itinerary.stops <= params.max_stops
+        and (airline is None or all(leg.company_name.lower() == airline for leg in itinerary.legs))
+        and (params.travel_class is None or all(leg.travel_class == params.travel_class for leg in itinerary.legs))
+    ]
+
+
+def _base_fares_statement(flight_ids):
+    Flight = models.flight.Flight
+    return select(Flight.flight_id, Flight.base_fare).where(Flight.flight_id.in_(flight_ids))
+
+
+def _priced_connections(params: FlightSearchParams, itineraries, prices: dict, base_fares: dict) -> list:
+    """(itinerary, total price) pairs within max_price; legs without a dynamic price cost their base fare."""
+    candidates = []
+    for itinerary in itineraries:
+        total = round(sum(
+            prices[leg.flight_id]["final_price"] if leg.flight_id in prices else base_fares.get(leg.flight_id, 0)
+            for leg in itinerary.legs
+        ), 2)
+        if params.max_price is None or total <= params.max_price:
+            candidates.append((itinerary, total))
+    return candidates
+
+
+def _connection_candidates(params: FlightSearchParams, origin_ids, destination_ids,
+                           window_start: datetime, window_end: datetime, db: Session):
     """
-    Retrieve all flights with readable origin and destination
+    Connecting itineraries (2..max_stops + 1 legs) from the in-memory route
+    graph, filtered like direct flights and priced as the sum of their legs'
+    dynamic prices. Returns (itinerary, total price) pairs.
     """
-    flights = (
-        db.query(models.flight.Flight)
-        .options(
-            joinedload(models.flight.Flight.origin_airport),
-            joinedload(models.flight.Flight.destination_airport)
+    itineraries = _matching_connections(params, route_graph.connections(
+        db, origin_ids, destination_ids, window_start, window_end, max_legs=params.max_stops + 1
+    ))
+    if not itineraries:
+        return []
+
+    leg_ids = {leg.flight_id for itinerary in itineraries for leg in itinerary.legs}
+    try:
+        prices = calculate_dynamic_prices(leg_ids, db)
+    except Exception:
+        prices = {}  # fallback to base fare if pricing fails
+    missing = [fid for fid in leg_ids if fid not in prices]
+    base_fares = dict(db.execute(_base_fares_statement(missing)).all()) if missing else {}
+    return _priced_connections(params, itineraries, prices, base_fares)
+
+
+async def _connection_candidates_async(params: FlightSearchParams, origin_ids, destination_ids,
+                                       window_start: datetime, window_end: datetime, db: AsyncSession):
+    """_connection_candidates on an AsyncSession."""
+    itineraries = await db.run_sync(lambda session: route_graph.connections(
+        session, origin_ids, destination_ids, window_start, window_end, max_legs=params.max_stops + 1
+    ))
+    itineraries = _matching_connections(params, itineraries)
+    if not itineraries:
+        return []
+
+    leg_ids = {leg.flight_id for itinerary in itineraries for leg in itinerary.legs}
+    try:
+        prices = await calculate_dynamic_prices_async(leg_ids, db)
+    except Exception:
+        prices = {}  # fallback to base fare if pricing fails
+    missing = [fid for fid in leg_ids if fid not in prices]
+    base_fares = dict((await db.execute(_base_fares_statement(missing))).all()) if missing else {}
+    return _priced_connections(params, itineraries, prices, base_fares)
+
+
+def _itinerary_summary(itinerary: Itinerary, price: float, leg_rows: dict, leg_prices: dict, db: Session) -> dict:
+    legs = [_flight_summary(leg_rows[leg.flight_id], db) for leg in itinerary.legs]
+    for leg, summary in zip(itinerary.legs, legs):
+        summary["dynamic_price"] = leg_prices.get(leg.flight_id, {}).get("final_price", summary["base_fare"])
+    classes = {leg["travel_class"] for leg in legs}
+    return {
+        "flight_code": " + ".join(leg["flight_code"] for leg in legs),
+        "company_name": " / ".join(dict.fromkeys(leg["company_name"] for leg in legs)),
+        "origin": legs[0]["origin"],
+        "destination": legs[-1]["destination"],
+        "departure_time": legs[0]["departure_time"],
+        "arrival_time": legs[-1]["arrival_time"],
+        "duration_minutes": itinerary.duration_minutes,
+        "stops": itinerary.stops,
+        "base_fare": round(sum(leg["base_fare"] for leg in legs), 2),
+        "travel_class": classes.pop() if len(classes) == 1 else "Mixed",
+        "dynamic_price": price,
+        "connections": len(legs) - 1,
+        "legs": legs,
+    }
+
+
+class _SearchPlan:
+    """The SQL side of one search: statements, ranking key and top-K."""
+
+    def __init__(self, params: FlightSearchParams, origin_ids, destination_ids):
+        day_start = datetime.strptime(params.date, "%Y-%m-%d")
+        Flight = models.flight.Flight
+        Snapshot = models.flight_price_snapshot.FlightPriceSnapshot
+        Inventory = models.flight_inventory.FlightInventory
+        is_fresh = snapshot_is_fresh(datetime.utcnow())
+
+        # Departure window within the requested day
+        self.window_start = day_start + (_time_of_day(params.departure_after) if params.departure_after else timedelta(0))
+        self.window_end = day_start + (_time_of_day(params.departure_before) if params.departure_before else timedelta(days=1))
+
+        # Base query: served by ix_flights_route_departure; precomputed prices joined by primary key
+        query = (
+            select(*_LISTING_COLUMNS, Snapshot.final_price)
+            .outerjoin(Snapshot, Snapshot.flight_id == Flight.flight_id)
+            .outerjoin(Inventory, Inventory.flight_id == Flight.flight_id)
+            .where(Flight.origin_airport_id.in_(origin_ids))
+            .where(Flight.destination_airport_id.in_(destination_ids))
+            .where(Flight.departure_time >= self.window_start)
+            .where(Flight.departure_time < self.window_end)
         )
-        .all()
-    )
+        if params.max_stops is not None:
+            query = query.where(Flight.stops <= params.max_stops)
+        if params.airline:
+            query = query.where(func.lower(Flight.company_name) == params.airline.strip().lower())
+        if params.travel_class:
+            query = query.where(Flight.travel_class == params.travel_class)
+
+        # Ranking key, in SQL and for the merge below (direct flights before
+        # connections on ties; both kinds expose departure/duration/ids)
+        if params.sort_by == "price":
+            order_columns = (Snapshot.final_price, Flight.flight_id)
+            primary = lambda item: item[1]
+        elif params.sort_by == "duration":
+            order_columns = (Flight.duration_minutes, Flight.flight_id)
+            primary = lambda item: _rank_fields(item[0])[1]
+        else:
+            order_columns = (Flight.departure_time, Flight.flight_id)
+            primary = lambda item: _rank_fields(item[0])[0]
+        self.sort_key = lambda item: (primary(item), *_rank_fields(item[0])[2:])
+        self.top_k = params.offset + params.limit if params.limit else None
+
+        # Fresh snapshots: filter, sort and cut in SQL
+        fresh_query = query.where(is_fresh)
+        if params.max_price is not None:
+            fresh_query = fresh_query.where(Snapshot.final_price <= params.max_price)
+        fresh_query = fresh_query.order_by(*order_columns)
+        if self.top_k is not None:
+            fresh_query = fresh_query.limit(self.top_k)
+        self.fresh_query = fresh_query
+
+        # Missing or stale snapshots are priced live, so quotes are never out of date
+        self.stale_query = query.where(~is_fresh)
+
+
+def _live_priced(params: FlightSearchParams, stale_rows, live_prices: dict) -> list:
+    """(row, price) candidates for the stale rows within max_price; base fare when pricing failed."""
+    candidates = []
+    for row in stale_rows:
+        price = live_prices.get(row.flight_id, {}).get("final_price", row.base_fare)
+        if params.max_price is None or price <= params.max_price:
+            candidates.append((row, price))
+    return candidates
+
+
+def _rank(params: FlightSearchParams, plan: _SearchPlan, candidates: list, merged: bool) -> list:
+    """Top-K over the SQL page plus the live-priced rows and connections."""
+    if not candidates:
+        raise HTTPException(status_code=404, detail="No flights found for given criteria")
+    if plan.top_k is not None:
+        return heapq.nsmallest(plan.top_k, candidates, key=plan.sort_key)[params.offset:]
+    return sorted(candidates, key=plan.sort_key) if merged else candidates
+
+
+def _ranked_leg_ids(ranked) -> list:
+    return [leg.flight_id for item, _ in ranked if isinstance(item, Itinerary) for leg in item.legs]
+
+
+def _leg_rows_statement(leg_ids):
+    return select(*_LISTING_COLUMNS).where(models.flight.Flight.flight_id.in_(leg_ids))
+
+
+def _search_results(ranked, leg_rows: dict, leg_prices: dict, db: Session) -> list:
+    return [
+        _itinerary_summary(item, price, leg_rows, leg_prices, db) if isinstance(item, Itinerary)
+        else {**_flight_summary(item, db), "dynamic_price": price}
+        for item, price in ranked
+    ]
+
 
-    results = []
-    for f in flights:
-        results.append({
-            "flight_code": f.flight_code,
-            "company_name": f.company_name,
-            "origin": f.origin_airport.city,
-            "destination": f.destination_airport.city,
-            "departure_time": f.departure_time,
-            "arrival_time": f.arrival_time,
-            "duration_minutes": f.duration_minutes,
-            "stops": f.stops,
-            "base_fare": f.base_fare,
-            "travel_class": f.travel_class
-        })
-    return results
-
-@router.get("/search")
 def search_flights(
-    origin: str = Query(..., description="Origin city name"),
-    destination: str = Query(..., description="Destination city name"),
-    date: str = Query(..., description="Departure date (YYYY-MM-DD)"),
-    sort_by: str = Query(None, description="Sort by 'price' or 'duration'"),
+    params: Annotated[FlightSearchParams, Query()],
     db: Session = Depends(database.get_db)
 ):
+    """
+    Flights on one route and day, with optional filters and top-K paging.
 
-    origin_airport = aliased(models.airport.Airport)
-    destination_airport = aliased(models.airport.Airport)
-
-    # Base query
-    query = (
-        db.query(models.flight.Flight)
-        .join(origin_airport, models.flight.Flight.origin_airport)
-        .join(destination_airport, models.flight.Flight.destination_airport)
-        .options(
-            joinedload(models.flight.Flight.origin_airport),
-            joinedload(models.flight.Flight.destination_airport)
-        )
-        .filter(origin_airport.city.ilike(f"%{origin}%"))
-        .filter(destination_airport.city.ilike(f"%{destination}%"))
-        .filter(models.flight.Flight.departure_time.like(f"{date}%"))
-    )
+    Prices come from the precomputed snapshots: sorting, the max_price filter
+    and limit/offset run in SQL over fresh snapshots. Flights whose snapshot
+    is stale are priced live and merged in with heapq.nsmallest, so only
+    offset + limit rows are ever ranked and serialized.
+
+    With max_stops >= 1, connecting itineraries (at most max_stops + 1 legs,
+    minimum connection time enforced) are found on the in-memory route graph
+    and ranked alongside the direct flights by total price or duration.
+    """
+    # Resolve cities / codes to airport ids in memory before touching flights
+    origin_ids = airport_index.resolve(params.origin, db)
+    destination_ids = airport_index.resolve(params.destination, db)
+    if not origin_ids or not destination_ids:
+        raise HTTPException(status_code=404, detail="No flights found for given criteria")
+
+    plan = _SearchPlan(params, origin_ids, destination_ids)
+    candidates = [(row, row.final_price) for row in db.execute(plan.fresh_query).all()]
+
+    stale_rows = db.execute(plan.stale_query).all()
+    if stale_rows:
+        stale_ids = [row.flight_id for row in stale_rows]
+        try:
+            live_prices = calculate_dynamic_prices(stale_ids, db)
+        except Exception:
+            live_prices = {}  # fallback to base fare if pricing fails
+        repricer.notify(stale_ids)
+        candidates.extend(_live_priced(params, stale_rows, live_prices))
+
+    # max_stops >= 1 also admits connecting itineraries from the route graph
+    connections = []
+    if params.max_stops:
+        connections = _connection_candidates(params, origin_ids, destination_ids,
+                                              plan.window_start, plan.window_end, db)
+        candidates.extend(connections)
+
+    ranked = _rank(params, plan, candidates, merged=bool(stale_rows or connections))
+
+    # Legs of the returned itineraries: one query, prices from the cache warmed above
+    leg_rows, leg_prices = {}, {}
+    leg_ids = _ranked_leg_ids(ranked)
+    if leg_ids:
+        leg_rows = {row.flight_id: row for row in db.execute(_leg_rows_statement(leg_ids))}
+        try:
+            leg_prices = calculate_dynamic_prices(leg_ids, db)
+        except Exception:
+            leg_prices = {}
+    return _search_results(ranked, leg_rows, leg_prices, db)
 
-    # Apply sorting before fetching results
-    if sort_by == "price":
-        query = query.order_by(models.flight.Flight.base_fare)
-    elif sort_by == "duration":
-        query = query.order_by(models.flight.Flight.duration_minutes)
 
-    flights = query.all()
-    if not flights:
+async def search_flights_async(
+    params: Annotated[FlightSearchParams, Query()],
+    db: AsyncSession = Depends(database.get_async_db)
+):
+    """
+    Flights on one route and day, with optional filters and top-K paging.
+
+    Async version of the search (DB_MODE=async): same ranking and results,
+    every query awaited on the event loop. The airport index and route
+    graph load through the session's async connection when they are cold.
+    """
+    origin_ids, destination_ids = await db.run_sync(
+        lambda session: (airport_index.resolve(params.origin, session),
+                         airport_index.resolve(params.destination, session))
+    )
+    if not origin_ids or not destination_ids:
         raise HTTPException(status_code=404, detail="No flights found for given criteria")
 
-    # Build response list with dynamic price
-    results = []
-    for f in flights:
+    plan = _SearchPlan(params, origin_ids, destination_ids)
+    candidates = [(row, row.final_price) for row in (await db.execute(plan.fresh_query)).all()]
+
+    stale_rows = (await db.execute(plan.stale_query)).all()
+    if stale_rows:
+        stale_ids = [row.flight_id for row in stale_rows]
         try:
-            pricing = calculate_dynamic_price(f.flight_id, db)
-            dynamic_price = pricing.get("final_price", f.base_fare)
+            live_prices = await calculate_dynamic_prices_async(stale_ids, db)
         except Exception:
-            dynamic_price = f.base_fare  # fallback if pricing fails
+            live_prices = {}  # fallback to base fare if pricing fails
+        repricer.notify(stale_ids)
+        candidates.extend(_live_priced(params, stale_rows, live_prices))
 
-        results.append({
-            "flight_code": f.flight_code,
-            "company_name": f.company_name,
-            "origin": f.origin_airport.city,
-            "destination": f.destination_airport.city,
-            "departure_time": f.departure_time,
-            "arrival_time": f.arrival_time,
-            "duration_minutes": f.duration_minutes,
-            "stops": f.stops,
-            "base_fare": f.base_fare,
-            "dynamic_price": dynamic_price, 
-            "travel_class": f.travel_class
-        })
+    connections = []
+    if params.max_stops:
+        connections = await _connection_candidates_async(params, origin_ids, destination_ids,
+                                                         plan.window_start, plan.window_end, db)
+        candidates.extend(connections)
 
-    if sort_by == "price":
-        results.sort(key=lambda x: x["dynamic_price"])
-    elif sort_by == "duration":
-        results.sort(key=lambda x: x["duration_minutes"])
+    ranked = _rank(params, plan, candidates, merged=bool(stale_rows or connections))
 
-    return results
+    leg_rows, leg_prices = {}, {}
+    leg_ids = _ranked_leg_ids(ranked)
+    if leg_ids:
+        leg_rows = {row.flight_id: row for row in await db.execute(_leg_rows_statement(leg_ids))}
+        try:
+            leg_prices = await calculate_dynamic_prices_async(leg_ids, db)
+        except Exception:
+            leg_prices = {}
+    # airport cities come from the index, which may need reloading
+    return await db.run_sync(lambda session: _search_results(ranked, leg_rows, leg_prices, session))
 
 
+# DB_MODE=async serves search and pricing with the async handlers
+router.add_api_route(
+    "/search", search_flights_async if config.DB_MODE == "async" else search_flights, methods=["GET"]
+)
 
 
 @router.post("/sync")
-def sync_external_flights(db: Session = Depends(database.get_db)):
-   
-    external_flights = fetch_external_flights()
-    added_count = 0
-
-    for flight_data in external_flights:
-        # Match origin and destination airports
-        origin = db.query(models.airport.Airport).filter(
-            models.airport.Airport.city.ilike(flight_data["origin"])
-        ).first()
-        destination = db.query(models.airport.Airport).filter(
-            models.airport.Airport.city.ilike(flight_data["destination"])
-        ).first()
-
-        if not origin or not destination:
-            continue
-
-        existing = db.query(models.flight.Flight).filter(
-            models.flight.Flight.flight_code == flight_data["flight_code"],
-            models.flight.Flight.origin_airport_id == origin.airport_id,
-            models.flight.Flight.destination_airport_id == destination.airport_id,
-        ).first()
-        if existing:
-            continue
-
-        # Create new flight
-        new_flight = models.flight.Flight(
-            company_name=flight_data["company_name"],
-            flight_code=flight_data["flight_code"],
-            origin_airport_id=origin.airport_id,
-            destination_airport_id=destination.airport_id,
-            departure_time=datetime.fromisoformat(flight_data["departure_time"]),
-            arrival_time=datetime.fromisoformat(flight_data["arrival_time"]),
-            duration_minutes=flight_data["duration_minutes"],
-            stops=flight_data["stops"],
-            base_fare=flight_data["base_fare"],
-            travel_class=flight_data["travel_class"]
-        )
-
-        db.add(new_flight)
-        added_count += 1
+async def sync_external_flights(db: Session = Depends(database.get_db)):
+    """
+    Pull every airline feed concurrently (per-source timeout and concurrency
+    limit) and upsert the records in bulk as the sources come in: airports
+    resolved from the in-memory index, one INSERT ... ON CONFLICT DO UPDATE
+    per batch, seats and inventory counters generated for new flights.
+    Returns the write counters and per-source timings.
+    """
+    async def write_batch(records):
+        return await run_in_threadpool(sync_flights, db, records)
 
-    db.commit()
+    try:
+        result = await ingest_flights(write_batch, batch_size=SYNC_BATCH_SIZE)
+    except SQLAlchemyError as e:
+        await run_in_threadpool(db.rollback)
+        raise HTTPException(status_code=500, detail=f"DB error during sync: {e}")
 
-    if added_count == 0:
-        raise HTTPException(status_code=200, detail="No new flights added. All routes up to date.")
-    return {"message": f"{added_count} new flights synced successfully!"}
+    if not result.get("inserted"):
+        # keep the per-source timings visible even when nothing new arrived
+        return {"message": "No new flights added. All routes up to date.", **result}
+    return {"message": f"{result['inserted']} new flights synced successfully!", **result}
 
-@router.get("/{flight_id}/dynamic_price", summary="Get dynamic price for a flight")
 def get_dynamic_price(flight_id: int, db: Session = Depends(database.get_db)):
     """
     Returns dynamic price breakdown and final price for the given flight_id.
     """
     try:
-        breakdown = calculate_dynamic_price(flight_id, db)
-    except ValueError as e:
-        raise HTTPException(status_code=404, detail=str(e))
+        breakdown = calculate_dynamic_prices([flight_id], db).get(flight_id)
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Failed to calculate price: {e}")
 
+    if breakdown is None:
+        raise HTTPException(status_code=404, detail=f"Flight id {flight_id} not found")
     return breakdown
+
+
+async def get_dynamic_price_async(flight_id: int, db: AsyncSession = Depends(database.get_async_db)):
+    """
+    Returns dynamic price breakdown and final price for the given flight_id.
+    """
+    try:
+        breakdown = (await calculate_dynamic_prices_async([flight_id], db)).get(flight_id)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Failed to calculate price: {e}")
+
+    if breakdown is None:
+        raise HTTPException(status_code=404, detail=f"Flight id {flight_id} not found")
+    return breakdown
+
+
+router.add_api_route(
+    "/{flight_id}/dynamic_price",
+    get_dynamic_price_async if config.DB_MODE == "async" else get_dynamic_price,
+    methods=["GET"],
+    summary="Get dynamic price for a flight",
+)
+
+
+@router.get("/{flight_id}/seats", summary="Get the seat map for a flight")
+def get_seat_map(
+    flight_id: int,
+    response: Response,
+    travel_class: Optional[str] = Query(None, description="Only seats of this class (Economy, Business, First)"),
+    adjacent: Optional[int] = Query(None, ge=1, le=10, description="Also return blocks of N adjacent free seats"),
+    if_none_match: Optional[str] = Header(None),
+    db: Session = Depends(database.get_db)
+):
+    """
+    Returns every seat with its class, price and booked/held state.
+    Supports conditional GET: send the last ETag in If-None-Match to get
+    304 Not Modified while nothing changed.
+    """
+    if travel_class is not None and travel_class not in SEAT_CLASSES:
+        raise HTTPException(status_code=400, detail=f"travel_class must be one of {', '.join(SEAT_CLASSES)}")
+
+    seat_map = seat_maps.get(flight_id, db)
+    if len(seat_map) == 0:
+        flight = db.query(models.flight.Flight.flight_id).filter(models.flight.Flight.flight_id == flight_id).first()
+        if not flight:
+            raise HTTPException(status_code=404, detail="Flight not found")
+
+    etag = seat_map.etag
+    if if_none_match and etag in [tag.strip() for tag in if_none_match.split(",")]:
+        return Response(status_code=304, headers={"ETag": etag})
+
+    result = seat_map.to_dict(travel_class)
+    if adjacent:
+        result["adjacent_blocks"] = seat_map.find_adjacent(adjacent, travel_class)
+    response.headers["ETag"] = etag
+    return result
+
+
+@router.get("/price_cache/stats", summary="Dynamic price cache statistics")
+def get_price_cache_stats():
+    """
+    Returns hit/miss/eviction counters of the dynamic price cache.
+    """
+    return price_cache.stats()
@@ -1,5 +1,6 @@
-from pydantic import BaseModel, Field, EmailStr
+from pydantic import BaseModel, Field, EmailStr, validator
 from typing import List, Optional
+from backend import config
 
 # Step 1: Initiate / Seat selection
 class SeatSelectionRequest(BaseModel):
@@ -46,3 +47,68 @@ class PaymentResponse(BaseModel):
     status: str
     pnr: Optional[str] = None
     message: Optional[str] = None
+
+# Booking history
+class HistoryTraveller(BaseModel):
+    first_name: str
+    last_name: str
+    email: Optional[str] = None
+    phone: Optional[str] = None
+
+class HistorySeat(BaseModel):
+    seat_number: str
+    travel_class: str
+    price: float
+
+class BookingHistoryItem(BaseModel):
+    booking_id: int
+    pnr: Optional[str] = None
+    flight_id: int
+    status: str
+    booking_date: str
+    travel_class: str
+    total_price: float
+    travellers: List[HistoryTraveller]
+    seats: List[HistorySeat]
+
+class BookingHistoryResponse(BaseModel):
+    user_id: int
+    bookings: List[BookingHistoryItem]
+    next_cursor: Optional[int] = Field(None, description="Pass as ?cursor= to fetch the next page")
+
+# Batch booking (groups / agencies): initiate + passengers (+ pay) for many items at once
+class BatchBookingItem(BaseModel):
+    flight_id: int
+    seat_ids: List[int] = Field(..., min_items=1)
+    travellers: List[TravellerInfo] = Field(..., min_items=1, description="One traveller per seat, in seat order")
+
+class BatchBookingRequest(BaseModel):
+    user_id: int
+    items: List[BatchBookingItem] = Field(..., min_items=1, max_items=config.BATCH_BOOKING_MAX_ITEMS)
+    mode: str = Field("all_or_nothing", description="'all_or_nothing' books every item or none; 'best_effort' books what it can")
+    hold_minutes: Optional[int] = Field(15, ge=1, le=24 * 60, description="How long to hold seats (minutes) of unpaid bookings")
+    simulate_payment: Optional[bool] = Field(False, description="True => also pay (simulated) and confirm the booked items")
+
+    @validator("mode")
+    def validate_mode(cls, v):
+        if v not in ["all_or_nothing", "best_effort"]:
+            raise ValueError("mode must be 'all_or_nothing' or 'best_effort'")
+        return v
+
+class BatchItemResult(BaseModel):
+    index: int
+    flight_id: int
+    status: str = Field(..., description="PENDING or CONFIRMED when booked, otherwise FAILED")
+    booking_id: Optional[int] = None
+    pnr: Optional[str] = None
+    reserved_seat_ids: List[int] = []
+    total_price: Optional[float] = None
+    timer_expiry: Optional[str] = None
+    error: Optional[str] = None
+
+class BatchBookingResponse(BaseModel):
+    mode: str
+    booked: int
+    failed: int
+    total_price: float
+    results: List[BatchItemResult]
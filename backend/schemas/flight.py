@@ -3,11 +3,23 @@ from typing import Optional
 from datetime import datetime
 
 class FlightSearchParams(BaseModel):
-    origin: str = Field(..., min_length=2)
-    destination: str = Field(..., min_length=2)
-    date: str
+    origin: str = Field(..., min_length=2, description="Origin city name or IATA code")
+    destination: str = Field(..., min_length=2, description="Destination city name or IATA code")
+    date: str = Field(..., description="Departure date (YYYY-MM-DD)")
     sort_by: Optional[str] = Field(None, description="Sort by 'price' or 'duration'")
 
+    # paging: the cheapest/shortest `limit` results after skipping `offset`
+    limit: Optional[int] = Field(None, ge=1, le=100, description="Return at most this many flights")
+    offset: int = Field(0, ge=0, le=1000, description="Skip this many flights first")
+
+    # filters
+    max_stops: Optional[int] = Field(None, ge=0, description="At most this many stops; 1 or more also returns connecting itineraries")
+    max_price: Optional[float] = Field(None, gt=0, description="Only flights whose dynamic price is at most this")
+    airline: Optional[str] = Field(None, min_length=1, description="Airline name (case-insensitive)")
+    travel_class: Optional[str] = Field(None, description="Economy, Business or First")
+    departure_after: Optional[str] = Field(None, description="Departing at or after HH:MM")
+    departure_before: Optional[str] = Field(None, description="Departing before HH:MM")
+
     @validator("date")
     def validate_date(cls, v):
         try:
@@ -21,3 +33,18 @@ class FlightSearchParams(BaseModel):
         if v and v not in ["price", "duration"]:
             raise ValueError("sort_by must be 'price' or 'duration'")
         return v
+
+    @validator("travel_class")
+    def validate_travel_class(cls, v):
+        if v and v not in ["Economy", "Business", "First"]:
+            raise ValueError("travel_class must be 'Economy', 'Business' or 'First'")
+        return v
+
+    @validator("departure_after", "departure_before")
+    def validate_time_of_day(cls, v):
+        if v:
+            try:
+                datetime.strptime(v, "%H:%M")
+            except ValueError:
+                raise ValueError("Time must be in HH:MM format")
+        return v
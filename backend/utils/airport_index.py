@@ -0,0 +1,103 @@
+# backend/utils/airport_index.py
+import threading
+from collections import OrderedDict
+from typing import Callable, Dict, List, Optional
+
+from sqlalchemy.orm import Session
+from backend import models
+
+# Search terms whose resolved airport ids are kept (LRU)
+RESOLVED_CACHE_SIZE = 1024
+
+
+class AirportIndex:
+    """
+    In-memory index of the airports table, so search can resolve a city name
+    or IATA code to airport ids without joining and ilike-scanning airports.
+
+    Loaded lazily on first use; call invalidate() after airports change
+    (listeners added with add_listener() hear about it).
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._loaded = False
+        self._by_id: Dict[int, "models.airport.Airport"] = {}
+        self._by_code: Dict[str, int] = {}
+        self._cities: List[tuple] = []  # (lowercased city, airport_id)
+        self._by_city: Dict[str, int] = {}
+        self._resolved: "OrderedDict[str, List[int]]" = OrderedDict()
+        self._listeners: List[Callable[[None], None]] = []
+
+    def add_listener(self, listener: Callable[[None], None]):
+        self._listeners.append(listener)
+
+    def load(self, db: Session):
+        airports = db.query(models.airport.Airport).all()
+        with self._lock:
+            self._by_id = {a.airport_id: a for a in airports}
+            self._by_code = {a.code.upper(): a.airport_id for a in airports if a.code}
+            self._cities = [(a.city.lower(), a.airport_id) for a in airports if a.city]
+            # first airport wins for a city, like the old ilike(...).first()
+            self._by_city = {}
+            for city, airport_id in self._cities:
+                self._by_city.setdefault(city, airport_id)
+            self._resolved = OrderedDict()
+            self._loaded = True
+        for a in airports:
+            db.expunge(a)
+
+    def _ensure_loaded(self, db: Session):
+        if not self._loaded:
+            self.load(db)
+
+    def resolve(self, term: str, db: Session) -> List[int]:
+        """
+        Airport ids matching term: an exact IATA code, otherwise every airport
+        whose city contains term (case-insensitive, like the old ilike '%term%').
+        """
+        self._ensure_loaded(db)
+        key = (term or "").strip().lower()
+        if not key:
+            return []
+        with self._lock:
+            cached = self._resolved.get(key)
+            if cached is not None:
+                self._resolved.move_to_end(key)
+                return cached
+            code_match = self._by_code.get(key.upper())
+            if code_match is not None:
+                ids = [code_match]
+            else:
+                ids = [airport_id for city, airport_id in self._cities if key in city]
+            if ids:
+                # misses are cheap to recompute and would let arbitrary terms fill the cache
+                self._resolved[key] = ids
+                if len(self._resolved) > RESOLVED_CACHE_SIZE:
+                    self._resolved.popitem(last=False)
+            return ids
+
+    def lookup(self, term: str, db: Session) -> Optional[int]:
+        """Single airport id for an exact IATA code or exact city name (case-insensitive)."""
+        self._ensure_loaded(db)
+        key = (term or "").strip()
+        with self._lock:
+            airport_id = self._by_code.get(key.upper())
+            if airport_id is None:
+                airport_id = self._by_city.get(key.lower())
+            return airport_id
+
+    def get(self, airport_id: int, db: Session) -> Optional["models.airport.Airport"]:
+        self._ensure_loaded(db)
+        return self._by_id.get(airport_id)
+
+    def invalidate(self):
+        with self._lock:
+            self._loaded = False
+            self._resolved = OrderedDict()
+        for listener in self._listeners:
+            listener(None)
+
+
+# Shared index used by the routers
+airport_index = AirportIndex()
@@ -1,54 +1,288 @@
-import asyncio
 import random
+import threading
+import time
+from datetime import datetime
+from typing import Callable, Dict, Iterator, List, Optional
+
+from sqlalchemy import bindparam, case, literal, select, union, update
 from sqlalchemy.orm import Session
+from backend import config
 from backend.database import SessionLocal
+from backend.models.booking import Booking
+from backend.models.booking_seat import BookingSeat
 from backend.models.flight import Flight
 from backend.models.seat import Seat
+from backend.models.seat_hold import SeatHold
+from backend.utils.seat_inventory import set_booked_seats
+from backend.utils.price_cache import price_cache
+from backend.utils.seat_map import seat_maps
+
+_seats = Seat.__table__
+_flights = Flight.__table__
+_bookings = Booking.__table__
+
+# Bookings whose seats belong to a customer; the simulator never touches those seats
+LIVE_BOOKING_STATUSES = ("PENDING", "CONFIRMED")
+
+# (plain binds, not an expanding IN: _rewrite_seats runs as an executemany)
+_live_bookings = select(_bookings.c.booking_id).where(
+    _bookings.c.flight_id == bindparam("fid"),
+    _bookings.c.status.in_([literal(status) for status in LIVE_BOOKING_STATUSES]),
+)
+# seats held or linked by the live bookings of one flight
+_live_seats = union(
+    select(SeatHold.__table__.c.seat_id).where(SeatHold.__table__.c.booking_id.in_(_live_bookings)),
+    select(BookingSeat.__table__.c.seat_id).where(BookingSeat.__table__.c.booking_id.in_(_live_bookings)),
+)
+
+# is_booked rewrite for one flight: of the seats no live booking holds,
+# the ones up to seat :cutoff (by seat_id) become booked
+_rewrite_seats = (
+    update(_seats)
+    .where(_seats.c.flight_id == bindparam("fid"), _seats.c.seat_id.not_in(_live_seats))
+    .values(is_booked=case((_seats.c.seat_id <= bindparam("cutoff"), 1), else_=0))
+)
+_update_fare = (
+    update(_flights)
+    .where(_flights.c.flight_id == bindparam("fid"))
+    .values(base_fare=bindparam("fare"))
+)
 
 
-async def simulate_demand():
+def _simulate_chunk(db: Session, flights: List[tuple]) -> int:
     """
-    Background process that runs forever.
-    Every few minutes it randomly changes seat booking status
-    and updates the flight's dynamic price based on current demand.
+    Simulate demand for one chunk of (flight_id, base_fare) rows using bulk
+    UPDATEs. Returns the number of seat and flight rows touched.
     """
-    while True:
-        print("Simulating demand and availability changes...")
-        db: Session = SessionLocal()
+    flight_ids = [fid for fid, _ in flights]
 
-        try:
-            flights = db.query(Flight).all()
-            for flight in flights:
-                seats = db.query(Seat).filter(Seat.flight_id == flight.flight_id).all()
-                total_seats = len(seats)
-                if total_seats == 0:
-                    continue
+    # seats of PENDING / CONFIRMED bookings stay booked and out of the rewrite
+    live_bookings = db.query(Booking.booking_id).filter(
+        Booking.flight_id.in_(flight_ids), Booking.status.in_(LIVE_BOOKING_STATUSES)
+    )
+    live = {
+        seat_id for (seat_id,) in
+        db.query(SeatHold.seat_id).filter(SeatHold.booking_id.in_(live_bookings))
+        .union(db.query(BookingSeat.seat_id).filter(BookingSeat.booking_id.in_(live_bookings)))
+    }
 
-                # Random number of seats booked (simulate demand)
-                booked_count = random.randint(0, total_seats)
+    # seat ids per flight, in seat_id order, and the live seats among them
+    seat_ids: Dict[int, List[int]] = {fid: [] for fid in flight_ids}
+    live_count: Dict[int, int] = {fid: 0 for fid in flight_ids}
+    for fid, seat_id in (
+        db.query(Seat.flight_id, Seat.seat_id)
+        .filter(Seat.flight_id.in_(flight_ids))
+        .order_by(Seat.flight_id, Seat.seat_id)
+    ):
+        if seat_id in live:
+            live_count[fid] += 1
+        else:
+            seat_ids[fid].append(seat_id)
 
-                # Mark seats as booked / available
-                for i, seat in enumerate(seats):
-                    seat.is_booked = 1 if i < booked_count else 0
+    seat_params = []
+    fare_params = []
+    booked_by_flight = {}
+    for fid, base_fare in flights:
+        total_seats = len(seat_ids[fid]) + live_count[fid]
+        if total_seats == 0:
+            continue
 
-                # Compute dynamic price based on demand
-                availability_ratio = booked_count / total_seats  # 0.0 to 1.0
-                dynamic_price = flight.base_fare * (1 + availability_ratio * 0.5)
+        # Random number of the remaining seats booked (simulate demand), on top of the live ones
+        simulated = random.randint(0, len(seat_ids[fid]))
+        cutoff = seat_ids[fid][simulated - 1] if simulated else 0
+        seat_params.append({"fid": fid, "cutoff": cutoff})
+        booked_count = simulated + live_count[fid]
+        booked_by_flight[fid] = booked_count
 
-                # Add a little random fluctuation (optional realism)
-                dynamic_price *= random.uniform(0.95, 1.05)
+        # Compute dynamic price based on demand
+        availability_ratio = booked_count / total_seats  # 0.0 to 1.0
+        dynamic_price = base_fare * (1 + availability_ratio * 0.5)
 
-                # Update flight base_fare or add a separate field if you prefer
-                flight.base_fare = round(dynamic_price, 2)
+        # Add a little random fluctuation (optional realism)
+        dynamic_price *= random.uniform(0.95, 1.05)
 
-            db.commit()
-            print("Demand simulation updated successfully")
+        # Update flight base_fare or add a separate field if you prefer
+        fare_params.append({"fid": fid, "fare": round(dynamic_price, 2)})
+
+    if not seat_params:
+        return 0
 
-        except Exception as e:
-            print("Error in background task:", e)
+    conn = db.connection()
+    touched = conn.execute(_rewrite_seats, seat_params).rowcount
+    touched += conn.execute(_update_fare, fare_params).rowcount
+    set_booked_seats(db, booked_by_flight)
+    return touched
+
+
+def iter_demand_chunks(chunk_size: Optional[int] = None, now: Optional[datetime] = None) -> Iterator[dict]:
+    """
+    One demand-simulation cycle, processed incrementally.
+
+    Walks flights that have not departed yet in flight_id order, chunk_size
+    at a time. Every chunk runs in its own short transaction, so real
+    bookings can take the write lock between chunks. Yields per-chunk stats.
+    """
+    chunk_size = chunk_size or config.DEMAND_CHUNK_SIZE
+    now = now or datetime.utcnow()
+    last_id = 0
+    while True:
+        db: Session = SessionLocal()
+        try:
+            flights = (
+                db.query(Flight.flight_id, Flight.base_fare)
+                .filter(Flight.flight_id > last_id, Flight.departure_time > now)
+                .order_by(Flight.flight_id)
+                .limit(chunk_size)
+                .all()
+            )
+            if not flights:
+                return
+            touched = _simulate_chunk(db, flights)
+            db.commit()
+        except Exception:
             db.rollback()
+            raise
         finally:
             db.close()
 
-        # Wait for 5 minutes before next update (you can change this)
-        await asyncio.sleep(300)
+        flight_ids = [fid for fid, _ in flights]
+        # base fares and seat counts changed for every simulated flight
+        price_cache.invalidate(flight_ids)
+        seat_maps.invalidate(flight_ids)
+        last_id = flight_ids[-1]
+        yield {"flights": len(flight_ids), "rows_touched": touched, "last_flight_id": last_id}
+
+
+class DemandSimulator:
+    """
+    Runs demand-simulation cycles on a dedicated worker thread, so the
+    blocking database work never runs on the event loop.
+
+    start()/stop() are tied to app startup/shutdown; run_forever() is also
+    used by the standalone CLI (`python -m backend.utils.background_demand`)
+    when the simulator runs as its own process next to several uvicorn workers.
+    on_chunk() is called after every committed chunk.
+    """
+
+    def __init__(self, interval: Optional[float] = None, chunk_size: Optional[int] = None,
+                 chunk_pause: Optional[float] = None, on_chunk: Optional[Callable[[], None]] = None):
+        self.interval = config.DEMAND_INTERVAL_SECONDS if interval is None else interval
+        self.chunk_size = chunk_size or config.DEMAND_CHUNK_SIZE
+        self.chunk_pause = config.DEMAND_CHUNK_PAUSE_SECONDS if chunk_pause is None else chunk_pause
+        self.on_chunk = on_chunk
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+        self._stats = {
+            "cycles": 0,
+            "errors": 0,
+            "last_error": None,
+            "last_cycle_started_at": None,
+            "last_cycle_duration_seconds": None,
+            "last_cycle_flights": 0,
+            "last_cycle_rows_touched": 0,
+            "total_rows_touched": 0,
+            "lag_seconds": 0.0,
+        }
+        self._last_finished = None  # monotonic time of the last completed cycle
+
+    @property
+    def running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    def run_cycle(self) -> dict:
+        """Run one full cycle (all chunks) and record its metrics."""
+        started_at = datetime.utcnow()
+        start = time.perf_counter()
+        flights = rows = 0
+        for chunk in iter_demand_chunks(self.chunk_size):
+            flights += chunk["flights"]
+            rows += chunk["rows_touched"]
+            if self.on_chunk is not None:
+                self.on_chunk()
+            # give real bookings the write lock between chunks; exit early on stop()
+            if self._stop.wait(self.chunk_pause):
+                break
+        duration = time.perf_counter() - start
+
+        with self._lock:
+            self._stats["cycles"] += 1
+            self._stats["last_cycle_started_at"] = started_at.isoformat()
+            self._stats["last_cycle_duration_seconds"] = round(duration, 4)
+            self._stats["last_cycle_flights"] = flights
+            self._stats["last_cycle_rows_touched"] = rows
+            self._stats["total_rows_touched"] += rows
+            self._last_finished = time.monotonic()
+        return {"flights": flights, "rows_touched": rows, "duration_seconds": duration}
+
+    def run_forever(self):
+        scheduled = time.monotonic()
+        while not self._stop.is_set():
+            with self._lock:
+                # how late this cycle starts compared with its schedule
+                self._stats["lag_seconds"] = round(max(time.monotonic() - scheduled, 0.0), 4)
+            print("Simulating demand and availability changes...")
+            try:
+                result = self.run_cycle()
+                print(f"Demand simulation updated successfully "
+                      f"({result['flights']} flights, {result['rows_touched']} rows, "
+                      f"{result['duration_seconds']:.2f}s)")
+            except Exception as e:
+                print("Error in background task:", e)
+                with self._lock:
+                    self._stats["errors"] += 1
+                    self._stats["last_error"] = str(e)
+
+            scheduled += self.interval
+            # Wait before next update (DEMAND_INTERVAL_SECONDS, 5 minutes by default)
+            self._stop.wait(max(scheduled - time.monotonic(), 0.0))
+
+    def start(self):
+        if self.running:
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self.run_forever, name="demand-simulator", daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout: float = 10.0):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+
+    def stats(self) -> dict:
+        with self._lock:
+            stats = dict(self._stats)
+            last_finished = self._last_finished
+        stats["running"] = self.running
+        stats["interval_seconds"] = self.interval
+        stats["chunk_size"] = self.chunk_size
+        stats["seconds_since_last_cycle"] = (
+            round(time.monotonic() - last_finished, 2) if last_finished is not None else None
+        )
+        return stats
+
+
+# Simulator used by the app (DEMAND_SIMULATOR_MODE=thread)
+demand_simulator = DemandSimulator()
+
+
+if __name__ == "__main__":
+    # Standalone simulator process (DEMAND_SIMULATOR_MODE=process in the web workers)
+    from backend.database import engine
+    from backend.migrations import setup_schema
+    from backend.utils.invalidation_bus import SQLitePollingBus, connect_caches
+
+    setup_schema(engine)
+    # the web workers are other processes: their seat maps and price caches
+    # hear about the rewritten flights through the shared database
+    bus = SQLitePollingBus()
+    connect_caches(bus)
+    bus.start()
+    simulator = DemandSimulator(on_chunk=bus.flush)
+    try:
+        simulator.run_forever()
+    except KeyboardInterrupt:
+        print("Demand simulator stopped")
+    finally:
+        bus.stop()
@@ -0,0 +1,68 @@
+# backend/utils/db_retry.py
+import asyncio
+import random
+import time
+from typing import Awaitable, Callable, Optional, TypeVar
+
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.orm import Session
+
+from backend import config
+
+T = TypeVar("T")
+
+
+def is_lock_error(exc: Exception) -> bool:
+    """True for transient write-lock contention ("database is locked" / busy)."""
+    if not isinstance(exc, OperationalError):
+        return False
+    message = str(exc.orig).lower()
+    return "database is locked" in message or "database is busy" in message
+
+
+def _backoff_delay(backoff: float, attempt: int) -> float:
+    """Exponential backoff with jitter before retry number attempt."""
+    return backoff * 2 ** (attempt - 1) * random.uniform(0.5, 1.5)
+
+
+def run_with_retry(db: Session, work: Callable[[Session], T], attempts: Optional[int] = None,
+                   backoff: Optional[float] = None) -> T:
+    """
+    Run work(db) (which must commit) and retry it when the database is
+    locked: roll back, sleep with exponential backoff plus jitter, try again.
+    Other errors, and the last lock error, propagate after a rollback.
+    """
+    attempts = attempts or config.BOOKING_RETRY_ATTEMPTS
+    backoff = config.BOOKING_RETRY_BACKOFF_SECONDS if backoff is None else backoff
+    for attempt in range(1, attempts + 1):
+        try:
+            return work(db)
+        except OperationalError as e:
+            db.rollback()
+            if attempt == attempts or not is_lock_error(e):
+                raise
+            time.sleep(_backoff_delay(backoff, attempt))
+        except Exception:
+            db.rollback()
+            raise
+
+
+async def run_with_retry_async(db, work: Callable[..., Awaitable[T]], attempts: Optional[int] = None,
+                               backoff: Optional[float] = None) -> T:
+    """
+    run_with_retry for an AsyncSession: awaits work(db) and backs off with
+    asyncio.sleep, so a locked database never stalls the event loop.
+    """
+    attempts = attempts or config.BOOKING_RETRY_ATTEMPTS
+    backoff = config.BOOKING_RETRY_BACKOFF_SECONDS if backoff is None else backoff
+    for attempt in range(1, attempts + 1):
+        try:
+            return await work(db)
+        except OperationalError as e:
+            await db.rollback()
+            if attempt == attempts or not is_lock_error(e):
+                raise
+            await asyncio.sleep(_backoff_delay(backoff, attempt))
+        except Exception:
+            await db.rollback()
+            raise
@@ -1,10 +1,22 @@
 # backend/utils/dynamic_pricing.py
 from datetime import datetime
-from math import ceil
-from typing import Dict, Any
+from math import isnan
+from typing import Dict, Any, Iterable, List, Optional
 
+import numpy as np
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 from backend import models
+from backend.utils.seat_inventory import get_inventory
+from backend.utils.price_cache import price_cache
+
+# Keep IN (...) lists well below SQLite's bound-parameter limit
+PRICING_BATCH_SIZE = 500
+
+_EPOCH = datetime(1970, 1, 1)
+
+# Time-to-departure tier boundaries (hours) applied by price_kernel
+TIME_TIER_HOURS = (72, 24, 6, 0)
 
 def _parse_departure_time(departure_value):
     """
@@ -28,188 +40,316 @@ def _parse_departure_time(departure_value):
     return None
 
 
-def calculate_dynamic_price(flight_id: int, db: Session) -> Dict[str, Any]:
+def _departure_epoch(departure_value) -> float:
     """
-    Calculate dynamic price for the given flight_id using:
-      - remaining seat percentage
-      - time until departure
-      - simulated demand level
-      - base fare & pricing tiers
+    Departure time as seconds since the epoch (naive UTC), NaN when unknown.
+    """
+    if isinstance(departure_value, datetime):
+        return (departure_value - _EPOCH).total_seconds()
+    # legacy string values (pre-migration databases)
+    dep_dt = _parse_departure_time(departure_value)
+    if dep_dt is None:
+        return float("nan")
+    return (dep_dt - _EPOCH).total_seconds()
 
-    Returns a dict with breakdown and final_price.
+
+def _class_multiplier(travel_class) -> float:
     """
-    # Fetch flight
-    flight = db.query(models.flight.Flight).filter(models.flight.Flight.flight_id == flight_id).first()
-    if not flight:
-        raise ValueError(f"Flight id {flight_id} not found")
+    Travel class premium: Business => 1.6x, First => 2.2x, anything else => 1.0x
+    """
+    if not travel_class:
+        return 1.0
+    tc = str(travel_class).lower()
+    if "business" in tc:
+        return 1.6
+    if "first" in tc:
+        return 2.2
+    return 1.0
 
-    # Base fare
-    base_fare = float(getattr(flight, "base_fare", 0) or 0)
 
-    # 1) Seats: total seats for this flight
-    total_seats = db.query(models.seat.Seat).filter(models.seat.Seat.flight_id == flight_id).count()
+def price_kernel(base_fare, total_seats, booked_seats, bookings, departure_epoch,
+                 class_multiplier=None, now_epoch: Optional[float] = None) -> Dict[str, np.ndarray]:
+    """
+    Columnar pricing kernel: prices every flight at once.
 
-    # booked seats via BookingSeat association
-    booked_via_bookingseat = db.query(models.booking_seat.BookingSeat) \
-        .join(models.seat.Seat, models.booking_seat.BookingSeat.seat_id == models.seat.Seat.seat_id) \
-        .filter(models.seat.Seat.flight_id == flight_id).count()
+    All inputs are equal-length array-likes (one entry per flight); a NaN
+    departure_epoch means the departure time is unknown. Returns a dict of
+    arrays with the final price and every per-factor multiplier.
+    """
+    base_fare = np.asarray(base_fare, dtype=np.float64)
+    total_seats = np.asarray(total_seats, dtype=np.int64)
+    booked_seats = np.asarray(booked_seats, dtype=np.int64)
+    bookings = np.asarray(bookings, dtype=np.int64)
+    departure_epoch = np.asarray(departure_epoch, dtype=np.float64)
+    if class_multiplier is None:
+        class_multiplier = np.ones_like(base_fare)
+    else:
+        class_multiplier = np.asarray(class_multiplier, dtype=np.float64)
+    if now_epoch is None:
+        now_epoch = (datetime.utcnow() - _EPOCH).total_seconds()
 
-    # booked seats via seat.is_booked flag (if maintained)
-    booked_flag_count = db.query(models.seat.Seat).filter(
-        models.seat.Seat.flight_id == flight_id,
-        models.seat.Seat.is_booked == 1
-    ).count()
+    has_seats = total_seats > 0
+    safe_total = np.where(has_seats, total_seats, 1)
 
-    # take the higher (conservative)
-    booked_seats = max(booked_via_bookingseat, booked_flag_count)
+    # 1) Seats: available seats and remaining fraction
+    available_seats = np.maximum(total_seats - booked_seats, 0)
+    remaining_pct = np.where(has_seats, np.round(available_seats / safe_total, 4), 0.0)
 
-    # available seats
-    available_seats = max(total_seats - booked_seats, 0)
+    # Factor A: Remaining seat percentage effect (scarcity)
+    # remaining_pct <= 0.05 => 2.0x, <= 0.2 => 1.5x, <= 0.5 => 1.2x, else 1.0x
+    seat_multiplier = np.select(
+        [remaining_pct <= 0.05, remaining_pct <= 0.20, remaining_pct <= 0.50],
+        [2.0, 1.5, 1.2],
+        default=1.0,
+    )
+    # no seat inventory => no scarcity effect
+    seat_multiplier = np.where(has_seats, seat_multiplier, 1.0)
 
-    # safety: if total_seats is 0 then we cannot compute percentage
-    if total_seats == 0:
-        remaining_pct = 0.0
-    else:
-        remaining_pct = round(available_seats / total_seats, 4)  # fraction
+    # Factor B: Time-to-departure effect (hours, could be negative if in past)
+    # already departed => 1.0x, < 6 hours => 1.5x, < 24 hours => 1.3x,
+    # < 72 hours => 1.1x, else (or unknown departure) => 1.0x
+    hours_until_departure = np.maximum((departure_epoch - now_epoch) / 3600.0, -1.0)
+    with np.errstate(invalid="ignore"):
+        time_multiplier = np.select(
+            [hours_until_departure < 0, hours_until_departure < 6,
+             hours_until_departure < 24, hours_until_departure < 72],
+            [1.0, 1.5, 1.3, 1.1],
+            default=1.0,
+        )
 
-    # 2) Time until departure (in hours)
-    dep_dt = _parse_departure_time(getattr(flight, "departure_time", None))
-    now = datetime.utcnow()
-    if dep_dt is None:
-        hours_until_departure = None
-    else:
-        # compute hours (could be negative if in past)
-        hours_until_departure = max((dep_dt - now).total_seconds() / 3600.0, -1.0)
+    # Factor C: Simulated demand effect (bookings per seat, if seats known)
+    # demand_ratio >= 0.5 => 1.4x, >= 0.3 => 1.2x, >= 0.1 => 1.1x
+    demand_ratio = np.where(has_seats, bookings / safe_total, bookings.astype(np.float64))
+    demand_multiplier = np.select(
+        [demand_ratio >= 0.5, demand_ratio >= 0.3, demand_ratio >= 0.1],
+        [1.4, 1.2, 1.1],
+        default=1.0,
+    )
 
-    # 3) Simulated demand level
-    # Use number of bookings for this flight in DB as demand proxy
-    demand_count = db.query(models.booking.Booking).filter(models.booking.Booking.flight_id == flight_id).count()
+    # Factor D: Travel class premium (see _class_multiplier)
+    price = base_fare * seat_multiplier
+    price = price * time_multiplier
+    price = price * demand_multiplier
+    price = price * class_multiplier
 
-    # Normalize demand: bookings per seat (if seats known)
-    if total_seats > 0:
-        demand_ratio = demand_count / total_seats
-    else:
-        demand_ratio = float(demand_count)
+    # Pricing tiers / caps
+    # Minimum fare floor: 0.7 * base_fare
+    # Maximum fare cap: 4.0 * base_fare (protective cap)
+    min_price = np.round(base_fare * 0.7, 2)
+    max_price = np.round(base_fare * 4.0, 2)
+
+    # final rounding and clamp
+    raw_price = np.round(price, 2)
+    final_price = np.minimum(np.maximum(raw_price, min_price), max_price)
+
+    return {
+        # For friendly UI show integer rupee value (ceil to avoid selling at fraction)
+        "final_price": np.ceil(final_price),
+        "raw_calculated_price": raw_price,
+        "min_price": min_price,
+        "max_price": max_price,
+        "seat_multiplier": seat_multiplier,
+        "time_multiplier": time_multiplier,
+        "demand_multiplier": demand_multiplier,
+        "class_multiplier": class_multiplier,
+        "available_seats": available_seats,
+        "remaining_pct": remaining_pct,
+        "hours_until_departure": hours_until_departure,
+        "demand_ratio": demand_ratio,
+    }
 
-    # 4) Pricing logic: start with base_fare, apply multiplicative factors
-    price = base_fare
 
-    breakdown = {
+def _breakdown_at(priced: Dict[str, np.ndarray], i: int, base_fare: float, total_seats: int,
+                  demand_count: int, travel_class) -> Dict[str, Any]:
+    """
+    Build the per-flight breakdown dict for row i of a price_kernel result.
+    """
+    hours = float(priced["hours_until_departure"][i])
+    return {
         "base_fare": round(base_fare, 2),
-        "factors": {},
-        "final_price": None
+        "factors": {
+            "seat_multiplier": float(priced["seat_multiplier"][i]),
+            "available_seats": int(priced["available_seats"][i]),
+            "total_seats": total_seats,
+            "remaining_pct": float(priced["remaining_pct"][i]),
+            "time_multiplier": float(priced["time_multiplier"][i]),
+            "hours_until_departure": None if isnan(hours) else round(hours, 2),
+            "demand_multiplier": float(priced["demand_multiplier"][i]),
+            "demand_count": demand_count,
+            "demand_ratio": round(float(priced["demand_ratio"][i]), 4),
+            "class_multiplier": float(priced["class_multiplier"][i]),
+            "travel_class": travel_class,
+        },
+        "final_price": float(priced["final_price"][i]),
+        "min_price": float(priced["min_price"][i]),
+        "max_price": float(priced["max_price"][i]),
+        "raw_calculated_price": float(priced["raw_calculated_price"][i]),
     }
 
-    # Factor A: Remaining seat percentage effect (scarcity)
-    # If few seats left -> stronger multiplier
-    if total_seats == 0:
-        seat_multiplier = 1.0
-        breakdown["factors"]["seat_multiplier"] = seat_multiplier
-        breakdown["factors"]["available_seats"] = available_seats
-        breakdown["factors"]["total_seats"] = total_seats
-        breakdown["factors"]["remaining_pct"] = remaining_pct
-    else:
-        # exact numeric logic:
-        # remaining_pct <= 0.05 => 2.0x
-        # remaining_pct <= 0.2 => 1.5x
-        # remaining_pct <= 0.5 => 1.2x
-        # else => 1.0x
-        if remaining_pct <= 0.05:
-            seat_multiplier = 2.0
-        elif remaining_pct <= 0.20:
-            seat_multiplier = 1.5
-        elif remaining_pct <= 0.50:
-            seat_multiplier = 1.2
-        else:
-            seat_multiplier = 1.0
-
-        price *= seat_multiplier
-        breakdown["factors"]["seat_multiplier"] = seat_multiplier
-        breakdown["factors"]["available_seats"] = available_seats
-        breakdown["factors"]["total_seats"] = total_seats
-        breakdown["factors"]["remaining_pct"] = remaining_pct
-
-    # Factor B: Time-to-departure effect
-    # If departure very near -> increase price
-    time_multiplier = 1.0
-    if hours_until_departure is None:
-        time_multiplier = 1.0
-    else:
-        # hours -> apply multipliers conservatively
-        # < 6 hours => 1.5x
-        # < 24 hours => 1.3x
-        # < 72 hours => 1.1x
-        # else => 1.0
-        if hours_until_departure < 0:
-            # flight already departed - keep price same
-            time_multiplier = 1.0
-        elif hours_until_departure < 6:
-            time_multiplier = 1.5
-        elif hours_until_departure < 24:
-            time_multiplier = 1.3
-        elif hours_until_departure < 72:
-            time_multiplier = 1.1
-        else:
-            time_multiplier = 1.0
-
-    price *= time_multiplier
-    breakdown["factors"]["time_multiplier"] = time_multiplier
-    breakdown["factors"]["hours_until_departure"] = round(hours_until_departure, 2) if hours_until_departure is not None else None
-
-    # Factor C: Simulated demand effect (bookings / seats)
-    # If demand_ratio is high -> increase price
-    # demand_ratio >= 0.5 => 1.4x, >=0.3 => 1.2x, >=0.1 => 1.1x
-    demand_multiplier = 1.0
-    if demand_ratio >= 0.5:
-        demand_multiplier = 1.4
-    elif demand_ratio >= 0.3:
-        demand_multiplier = 1.2
-    elif demand_ratio >= 0.1:
-        demand_multiplier = 1.1
+
+def _seconds_to_next_tier(hours: float) -> Optional[float]:
+    """
+    Seconds until hours_until_departure drops below the next tier boundary,
+    or None when no boundary is left (departed or unknown departure).
+    """
+    if isnan(hours):
+        return None
+    passed = [b for b in TIME_TIER_HOURS if b <= hours]
+    if not passed:
+        return None
+    return (hours - max(passed)) * 3600.0
+
+
+def _copy_breakdown(breakdown: Dict[str, Any]) -> Dict[str, Any]:
+    return {**breakdown, "factors": dict(breakdown["factors"])}
+
+
+def _chunked(values: List[int], size: int = PRICING_BATCH_SIZE):
+    for i in range(0, len(values), size):
+        yield values[i:i + size]
+
+
+def _fetch_pricing_columns(flight_ids: Optional[List[int]], db: Session) -> Dict[str, list]:
+    """
+    Fetch the pricing inputs as plain columns (no ORM objects): one flight
+    query plus a flight_inventory counter lookup per chunk of ids.
+    flight_ids=None loads the whole inventory.
+    """
+    Flight = models.flight.Flight
+    columns = {name: [] for name in (
+        "flight_id", "base_fare", "total_seats", "booked_seats",
+        "bookings", "departure_epoch", "travel_class", "version",
+    )}
+
+    flight_query = db.query(
+        Flight.flight_id, Flight.base_fare, Flight.departure_time, Flight.travel_class
+    )
+    if flight_ids is None:
+        flight_rows = flight_query.all()
     else:
-        demand_multiplier = 1.0
-
-    price *= demand_multiplier
-    breakdown["factors"]["demand_multiplier"] = demand_multiplier
-    breakdown["factors"]["demand_count"] = demand_count
-    breakdown["factors"]["demand_ratio"] = round(demand_ratio, 4)
-
-    # Factor D: Travel class premium
-    # If flight has a travel_class attribute use it; otherwise no-op
-    travel_class = getattr(flight, "travel_class", None)
-    class_multiplier = 1.0
-    if travel_class:
-        tc = str(travel_class).lower()
-        if "business" in tc:
-            class_multiplier = 1.6
-        elif "first" in tc:
-            class_multiplier = 2.2
-        else:
-            class_multiplier = 1.0
-
-    price *= class_multiplier
-    breakdown["factors"]["class_multiplier"] = class_multiplier
-    breakdown["factors"]["travel_class"] = travel_class
+        flight_rows = []
+        for chunk in _chunked(flight_ids):
+            flight_rows.extend(flight_query.filter(Flight.flight_id.in_(chunk)).all())
 
-    # Pricing tiers / caps
-    # Minimum fare floor: 0.7 * base_fare
-    # Maximum fare cap: 4.0 * base_fare (protective cap)
-    min_price = round(base_fare * 0.7, 2)
-    max_price = round(base_fare * 4.0, 2)
+    for rows in _chunked(flight_rows):
+        inventory = get_inventory(db, [row[0] for row in rows])
+        for fid, base_fare, departure_time, travel_class in rows:
+            total, flagged, linked, bookings, version = inventory.get(fid, (0, 0, 0, 0, 0))
+            columns["flight_id"].append(fid)
+            columns["base_fare"].append(float(base_fare or 0))
+            columns["total_seats"].append(total)
+            # take the higher of BookingSeat links and is_booked flags (conservative)
+            columns["booked_seats"].append(max(linked, flagged))
+            columns["bookings"].append(bookings)
+            columns["departure_epoch"].append(_departure_epoch(departure_time))
+            columns["travel_class"].append(travel_class)
+            columns["version"].append(version)
+    return columns
 
-    # final rounding and clamp
-    final_price = round(price, 2)
-    if final_price < min_price:
-        final_price = min_price
-    if final_price > max_price:
-        final_price = max_price
 
-    # For friendly UI show integer rupee value (ceil to avoid selling at fraction)
-    final_price_display = float(ceil(final_price))
+def calculate_price_columns(db: Session, flight_ids: Optional[Iterable[int]] = None):
+    """
+    Whole-inventory repricing: returns (flight_ids, price_kernel result) as
+    arrays without building per-flight dicts. flight_ids=None prices every flight.
+    """
+    ids = None if flight_ids is None else list(dict.fromkeys(int(fid) for fid in flight_ids))
+    columns = _fetch_pricing_columns(ids, db)
+    priced = price_kernel(
+        columns["base_fare"],
+        columns["total_seats"],
+        columns["booked_seats"],
+        columns["bookings"],
+        columns["departure_epoch"],
+        [_class_multiplier(tc) for tc in columns["travel_class"]],
+    )
+    return np.asarray(columns["flight_id"], dtype=np.int64), priced
+
+
+def _cached_prices(ids: List[int], use_cache: bool):
+    """Split ids into cached breakdowns (copies) and the ids still to price."""
+    results = {}
+    if use_cache:
+        for fid in ids:
+            cached = price_cache.get(fid)
+            if cached is not None:
+                results[fid] = _copy_breakdown(cached)
+        ids = [fid for fid in ids if fid not in results]
+    return results, ids
+
+
+def _price_columns(columns: Dict[str, list], results: Dict[int, Dict[str, Any]],
+                   use_cache: bool) -> Dict[int, Dict[str, Any]]:
+    """Price fetched columns with one price_kernel call, adding breakdowns to results."""
+    if not columns["flight_id"]:
+        return results
+
+    priced = price_kernel(
+        columns["base_fare"],
+        columns["total_seats"],
+        columns["booked_seats"],
+        columns["bookings"],
+        columns["departure_epoch"],
+        [_class_multiplier(tc) for tc in columns["travel_class"]],
+    )
+
+    for i, fid in enumerate(columns["flight_id"]):
+        breakdown = _breakdown_at(
+            priced, i,
+            columns["base_fare"][i],
+            columns["total_seats"][i],
+            columns["bookings"][i],
+            columns["travel_class"][i],
+        )
+        if use_cache:
+            max_age = _seconds_to_next_tier(float(priced["hours_until_departure"][i]))
+            price_cache.set(fid, _copy_breakdown(breakdown), max_age=max_age)
+        results[fid] = breakdown
+    return results
 
-    breakdown["final_price"] = final_price_display
-    breakdown["min_price"] = min_price
-    breakdown["max_price"] = max_price
-    breakdown["raw_calculated_price"] = round(price, 2)
 
-    return breakdown
+def calculate_dynamic_prices(flight_ids: Iterable[int], db: Session,
+                             use_cache: bool = True) -> Dict[int, Dict[str, Any]]:
+    """
+    Batch version of calculate_dynamic_price.
+
+    Prices every flight in flight_ids with a constant number of queries per
+    chunk (counters come from flight_inventory) and a single price_kernel call.
+    Results are served from / stored in price_cache unless use_cache is False;
+    cached entries expire no later than the next time-to-departure tier.
+    Returns {flight_id: breakdown}; ids that do not exist are left out of the result.
+    """
+    results, ids = _cached_prices(list(dict.fromkeys(int(fid) for fid in flight_ids)), use_cache)
+    if not ids:
+        return results
+    return _price_columns(_fetch_pricing_columns(ids, db), results, use_cache)
+
+
+async def calculate_dynamic_prices_async(flight_ids: Iterable[int], db: AsyncSession,
+                                         use_cache: bool = True) -> Dict[int, Dict[str, Any]]:
+    """
+    calculate_dynamic_prices on an AsyncSession (DB_MODE=async). Cache hits
+    never touch the database; the pricing columns of the misses are read on
+    the session's async connection.
+    """
+    results, ids = _cached_prices(list(dict.fromkeys(int(fid) for fid in flight_ids)), use_cache)
+    if not ids:
+        return results
+    columns = await db.run_sync(lambda session: _fetch_pricing_columns(ids, session))
+    return _price_columns(columns, results, use_cache)
+
+
+def calculate_dynamic_price(flight_id: int, db: Session) -> Dict[str, Any]:
+    """
+    Calculate dynamic price for the given flight_id using:
+      - remaining seat percentage
+      - time until departure
+      - simulated demand level
+      - base fare & pricing tiers
+
+    Thin scalar wrapper over the batch path (and so over price_kernel).
+    Returns a dict with breakdown and final_price.
+    """
+    prices = calculate_dynamic_prices([flight_id], db)
+    if flight_id not in prices:
+        raise ValueError(f"Flight id {flight_id} not found")
+    return prices[flight_id]
@@ -0,0 +1,132 @@
+# backend/utils/flight_sync.py
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from sqlalchemy import insert, select, tuple_
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.orm import Session
+
+from backend.models.flight import Flight
+from backend.models.seat import Seat
+from backend.utils.airport_index import airport_index
+from backend.utils.dynamic_pricing import _parse_departure_time
+from backend.utils.seat_inventory import init_inventory
+from backend.utils.seat_layout import SEATS_PER_CLASS, seat_rows
+from backend.utils.price_cache import price_cache
+from backend.utils.route_graph import route_graph
+
+# Flights written per INSERT ... ON CONFLICT statement
+SYNC_BATCH_SIZE = 1000
+
+_flights = Flight.__table__
+_seats = Seat.__table__
+
+# natural key of a flight; backed by the unique index ux_flights_code_route_departure
+_KEY_COLUMNS = ("flight_code", "origin_airport_id", "destination_airport_id", "departure_time")
+_UPDATE_COLUMNS = ("company_name", "arrival_time", "duration_minutes", "stops", "base_fare", "travel_class")
+
+
+def _upsert_statement(dialect_name: str):
+    """INSERT ... ON CONFLICT (natural key) DO UPDATE for SQLite and Postgres."""
+    dialect_insert = postgresql.insert if dialect_name == "postgresql" else sqlite.insert
+    stmt = dialect_insert(_flights)
+    return (
+        stmt.on_conflict_do_update(
+            index_elements=[_flights.c[name] for name in _KEY_COLUMNS],
+            set_={name: stmt.excluded[name] for name in _UPDATE_COLUMNS},
+        )
+        .returning(_flights.c.flight_id)
+    )
+
+
+def normalize_flights(records: Iterable[dict], db: Session) -> Tuple[List[dict], int]:
+    """
+    Turn feed records into flights rows: resolve airports from the in-memory
+    airport index, parse datetimes and drop duplicates of the natural key
+    (the last record wins). Returns (rows, skipped).
+    """
+    rows: Dict[tuple, dict] = {}
+    skipped = 0
+    for record in records:
+        origin_id = airport_index.lookup(record.get("origin"), db)
+        destination_id = airport_index.lookup(record.get("destination"), db)
+        departure = _parse_departure_time(record.get("departure_time"))
+        arrival = _parse_departure_time(record.get("arrival_time"))
+        if not origin_id or not destination_id or origin_id == destination_id or departure is None or arrival is None:
+            skipped += 1
+            continue
+        row = {
+            "company_name": record["company_name"],
+            "flight_code": record["flight_code"],
+            "origin_airport_id": origin_id,
+            "destination_airport_id": destination_id,
+            "departure_time": departure,
+            "arrival_time": arrival,
+            "duration_minutes": int(record.get("duration_minutes") or (arrival - departure).total_seconds() // 60),
+            "stops": int(record.get("stops") or 0),
+            "base_fare": float(record["base_fare"]),
+            "travel_class": record["travel_class"],
+        }
+        rows[tuple(row[name] for name in _KEY_COLUMNS)] = row
+    return list(rows.values()), skipped
+
+
+def _stored_flight_ids(conn, batch: List[dict]) -> set:
+    """Ids of the flights of batch that already exist, matched on the natural key."""
+    key = tuple_(*(_flights.c[name] for name in _KEY_COLUMNS))
+    keys = [tuple(row[name] for name in _KEY_COLUMNS) for row in batch]
+    return set(conn.execute(select(_flights.c.flight_id).where(key.in_(keys))).scalars())
+
+
+def upsert_flights(db: Session, rows: List[dict], batch_size: int = SYNC_BATCH_SIZE,
+                   seats_per_class: int = SEATS_PER_CLASS,
+                   written_ids: Optional[List[int]] = None) -> Dict[str, int]:
+    """
+    Write normalized flights in batches inside the caller's transaction.
+    New flights get their seats and inventory counters in bulk; existing
+    ones have schedule and fare fields updated in place. The ids of every
+    written flight are appended to written_ids when given; invalidate their
+    cached prices once the transaction has committed.
+    """
+    stats = {"inserted": 0, "updated": 0, "seats_created": 0}
+    if not rows:
+        return stats
+    upsert = _upsert_statement(db.get_bind().dialect.name)
+    seats_per_flight = len(seat_rows(0, seats_per_class))
+    conn = db.connection()
+    for start in range(0, len(rows), batch_size):
+        batch = rows[start:start + batch_size]
+        # read in the same transaction as the upsert, so every id it returns is either stored or inserted
+        stored_ids = _stored_flight_ids(conn, batch)
+        flight_ids = conn.execute(upsert, batch).scalars().all()
+        if written_ids is not None:
+            written_ids.extend(flight_ids)
+
+        # seats for the inserted flights, and for stored ones still without seats (old per-row sync)
+        seated = set(conn.execute(
+            select(_seats.c.flight_id).where(_seats.c.flight_id.in_(flight_ids)).group_by(_seats.c.flight_id)
+        ).scalars())
+        seatless_ids = [fid for fid in flight_ids if fid not in seated]
+
+        seat_params = [row for fid in seatless_ids for row in seat_rows(fid, seats_per_class)]
+        if seat_params:
+            conn.execute(insert(_seats), seat_params)
+        init_inventory(db, {fid: seats_per_flight for fid in seatless_ids})
+
+        inserted = sum(1 for fid in flight_ids if fid not in stored_ids)
+        stats["inserted"] += inserted
+        stats["updated"] += len(flight_ids) - inserted
+        stats["seats_created"] += len(seat_params)
+    return stats
+
+
+def sync_flights(db: Session, records: Iterable[dict], batch_size: Optional[int] = None) -> Dict[str, int]:
+    """Normalize, dedupe and upsert one feed snapshot, commit, then refresh prices and the route graph."""
+    rows, skipped = normalize_flights(records, db)
+    flight_ids: List[int] = []
+    stats = upsert_flights(db, rows, batch_size or SYNC_BATCH_SIZE, written_ids=flight_ids)
+    db.commit()
+    # fares may have changed for updated flights
+    price_cache.invalidate(flight_ids)
+    route_graph.upsert(db, flight_ids)
+    stats["skipped"] = skipped
+    return stats
@@ -0,0 +1,221 @@
+# backend/utils/hold_expiry.py
+import heapq
+import threading
+import time
+from collections import defaultdict
+from datetime import datetime, timedelta
+from typing import Callable, Dict, Iterable, List, Optional
+
+from sqlalchemy import select, update
+from sqlalchemy.orm import Session
+
+from backend import config
+from backend.database import SessionLocal
+from backend.models.booking import Booking
+from backend.models.booking_seat import BookingSeat
+from backend.models.seat import Seat
+from backend.models.seat_hold import SeatHold
+from backend.utils.seat_inventory import adjust_inventory
+from backend.utils.price_cache import price_cache
+from backend.utils.seat_map import seat_maps
+
+_EPOCH = datetime(1970, 1, 1)
+
+
+def _expiry_epoch(timer_expiry) -> Optional[float]:
+    """timer_expiry (naive UTC, ISO string or datetime) as seconds since the epoch."""
+    if timer_expiry is None:
+        return None
+    if not isinstance(timer_expiry, datetime):
+        try:
+            timer_expiry = datetime.fromisoformat(timer_expiry)
+        except ValueError:
+            return None
+    return (timer_expiry - _EPOCH).total_seconds()
+
+
+def expire_holds(db: Session, booking_ids: List[int], now: Optional[datetime] = None) -> Dict[int, List[int]]:
+    """
+    Expire the given bookings if they are still PENDING past timer_expiry and
+    release their seats with one bulk UPDATE. Runs inside the caller's
+    transaction; returns {flight_id: [released seat_id, ...]}.
+    """
+    if not booking_ids:
+        return {}
+    now_iso = (now or datetime.utcnow()).isoformat()
+
+    # status flip first: a concurrent payment/cancel wins or loses atomically here
+    expired = db.execute(
+        update(Booking)
+        .where(
+            Booking.booking_id.in_(booking_ids),
+            Booking.status == "PENDING",
+            Booking.timer_expiry <= now_iso,
+        )
+        .values(status="EXPIRED")
+        .returning(Booking.booking_id)
+        .execution_options(synchronize_session=False)
+    ).scalars().all()
+    if not expired:
+        return {}
+
+    # held seats (plus passenger-linked seats of older bookings without hold rows)
+    held = select(SeatHold.seat_id).where(SeatHold.booking_id.in_(expired))
+    linked = select(BookingSeat.seat_id).where(BookingSeat.booking_id.in_(expired))
+    released_rows = db.execute(
+        update(Seat)
+        .where(Seat.seat_id.in_(held.union(linked)), Seat.is_booked == 1)
+        .values(is_booked=0)
+        .returning(Seat.flight_id, Seat.seat_id)
+        .execution_options(synchronize_session=False)
+    ).all()
+
+    released: Dict[int, List[int]] = defaultdict(list)
+    for flight_id, seat_id in released_rows:
+        released[flight_id].append(seat_id)
+    for flight_id, seat_ids in released.items():
+        adjust_inventory(db, flight_id, booked=-len(seat_ids))
+    return dict(released)
+
+
+class HoldExpiryService:
+    """
+    Releases seats of PENDING bookings whose hold (timer_expiry) ran out.
+
+    Pending holds sit in a min-heap of (expiry_epoch, booking_id): O(log n)
+    per add/pop, rebuilt from the bookings table on start. Paid or cancelled
+    bookings are not removed from the heap; the conditional UPDATE in
+    expire_holds() simply skips them when they come due.
+    """
+
+    def __init__(self, batch_size: Optional[int] = None):
+        self.batch_size = batch_size or config.HOLD_EXPIRY_BATCH_SIZE
+        self._heap: List[tuple] = []
+        self._cond = threading.Condition()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self.processed_total = 0
+        self.released_seats_total = 0
+        self._listeners: List[Callable[[List[list]], None]] = []
+
+    @property
+    def running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    def rebuild(self, db: Session):
+        rows = db.query(Booking.booking_id, Booking.timer_expiry).filter(Booking.status == "PENDING").all()
+        heap = []
+        for booking_id, timer_expiry in rows:
+            expiry = _expiry_epoch(timer_expiry)
+            if expiry is not None:
+                heap.append((expiry, booking_id))
+        with self._cond:
+            # keep holds add()ed while the table was read; duplicates are harmless
+            heap.extend(self._heap)
+            heapq.heapify(heap)
+            self._heap = heap
+            self._cond.notify()
+
+    def add_listener(self, listener: Callable[[List[list]], None]):
+        """listener([[booking_id, expiry_iso]]) hears about every hold add()ed, running or not."""
+        self._listeners.append(listener)
+
+    def add(self, booking_id: int, timer_expiry):
+        expiry = _expiry_epoch(timer_expiry)
+        if expiry is not None and self._listeners:
+            hold = [[booking_id, (_EPOCH + timedelta(seconds=expiry)).isoformat()]]
+            for listener in self._listeners:
+                listener(hold)
+        if expiry is None or not self.running:
+            # a stopped reaper picks the hold up from the bookings table on its next start
+            return
+        with self._cond:
+            heapq.heappush(self._heap, (expiry, booking_id))
+            if self._heap[0][1] == booking_id:
+                # new earliest deadline: wake the worker to re-arm its timer
+                self._cond.notify()
+
+    def _pop_due(self) -> List[int]:
+        """Wait until holds are due (or stop) and pop up to batch_size of them."""
+        with self._cond:
+            while not self._stop.is_set():
+                now = time.time()
+                if self._heap and self._heap[0][0] <= now:
+                    due = []
+                    while self._heap and self._heap[0][0] <= now and len(due) < self.batch_size:
+                        due.append(heapq.heappop(self._heap)[1])
+                    return due
+                timeout = self._heap[0][0] - now if self._heap else None
+                self._cond.wait(timeout)
+        return []
+
+    def process(self, booking_ids: Iterable[int]) -> Dict[int, List[int]]:
+        """Expire a batch in its own transaction and refresh the in-memory views."""
+        db = SessionLocal()
+        try:
+            booking_ids = list(booking_ids)
+            released = expire_holds(db, booking_ids)
+            db.commit()
+        except Exception:
+            db.rollback()
+            raise
+        finally:
+            db.close()
+
+        for flight_id, seat_ids in released.items():
+            seat_maps.mark(flight_id, seat_ids, booked=False)
+            self.released_seats_total += len(seat_ids)
+        price_cache.invalidate(released.keys())
+        return released
+
+    def run_forever(self):
+        db = SessionLocal()
+        try:
+            self.rebuild(db)
+        finally:
+            db.close()
+
+        while not self._stop.is_set():
+            due = self._pop_due()
+            if not due:
+                continue
+            try:
+                self.process(due)
+                self.processed_total += len(due)
+            except Exception as e:
+                print("Error expiring seat holds:", e)
+                # retry the batch later instead of leaking the holds
+                with self._cond:
+                    for booking_id in due:
+                        heapq.heappush(self._heap, (time.time() + 5, booking_id))
+
+    def start(self):
+        if self.running:
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self.run_forever, name="hold-expiry", daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout: float = 10.0):
+        self._stop.set()
+        with self._cond:
+            self._cond.notify_all()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+
+    def stats(self) -> dict:
+        with self._cond:
+            pending = len(self._heap)
+            next_expiry = self._heap[0][0] if self._heap else None
+        return {
+            "running": self.running,
+            "tracked_holds": pending,
+            "next_expiry_in_seconds": round(next_expiry - time.time(), 2) if next_expiry is not None else None,
+            "processed_holds": self.processed_total,
+            "released_seats_total": self.released_seats_total,
+        }
+
+
+# Reaper used by the app
+hold_reaper = HoldExpiryService()
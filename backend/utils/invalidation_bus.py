@@ -0,0 +1,324 @@
+# backend/utils/invalidation_bus.py
+import json
+import threading
+import time
+from collections import defaultdict
+from datetime import datetime, timedelta
+from typing import Callable, Dict, Iterable, List, Optional
+
+from sqlalchemy import delete, func
+
+from backend import config
+from backend.database import SessionLocal
+from backend.models.cache_invalidation import CacheInvalidation
+from backend.utils.leader import WORKER_ID
+
+# Handlers get the published keys, or None for "everything"
+Handler = Callable[[Optional[List]], None]
+
+# How often the SQLite bus deletes events older than the retention window
+PRUNE_INTERVAL_SECONDS = 60.0
+
+
+def _hashable(key):
+    # JSON turns tuples into lists; keep multi-part keys (e.g. holds) usable in sets
+    return tuple(key) if isinstance(key, list) else key
+
+
+class InvalidationBus:
+    """
+    Keeps the per-worker caches (prices, seat maps, airports, route graph,
+    hold deadlines) coherent across workers.
+
+    Caches publish what they invalidated on a topic; every other worker's
+    subscribed handlers apply the same invalidation to their own copy. This
+    base bus is the single-process one: there is nobody else to tell, so
+    publish() only counts. Invalidations applied by a handler are not
+    published again.
+    """
+
+    name = "local"
+
+    def __init__(self):
+        self._handlers: Dict[str, List[Handler]] = defaultdict(list)
+        self._applying = threading.local()
+        self._lock = threading.Lock()
+        self.published = 0
+        self.received = 0
+        self.handler_errors = 0
+
+    def subscribe(self, topic: str, handler: Handler):
+        self._handlers[topic].append(handler)
+
+    def publish(self, topic: str, keys: Optional[Iterable] = None):
+        if getattr(self._applying, "active", False):
+            return  # echo of a remote invalidation
+        with self._lock:
+            self.published += 1
+        self._send(topic, None if keys is None else list(keys))
+
+    def _send(self, topic: str, keys: Optional[List]):
+        pass
+
+    def _dispatch(self, topic: str, keys: Optional[List]):
+        self._applying.active = True
+        try:
+            for handler in self._handlers.get(topic, ()):
+                try:
+                    handler(keys)
+                except Exception as e:
+                    print(f"Error applying {topic} invalidation:", e)
+                    with self._lock:
+                        self.handler_errors += 1
+        finally:
+            self._applying.active = False
+        with self._lock:
+            self.received += 1
+
+    def start(self):
+        pass
+
+    def stop(self, timeout: float = 10.0):
+        pass
+
+    def stats(self) -> Dict:
+        with self._lock:
+            return {
+                "backend": self.name,
+                "published": self.published,
+                "received": self.received,
+                "handler_errors": self.handler_errors,
+            }
+
+
+class SQLitePollingBus(InvalidationBus):
+    """
+    Invalidation bus over the cache_invalidations table of the shared
+    database, so workers need no extra service.
+
+    publish() only queues: keys are merged per topic and a worker thread
+    writes them as one row per topic every poll interval, so a burst of
+    bookings costs one insert. The same thread reads the rows other workers
+    wrote since the last poll, applies them and prunes rows older than the
+    retention window. A worker only sees events published after it started;
+    its caches are empty at that point anyway.
+    """
+
+    name = "sqlite"
+
+    def __init__(self, poll_seconds: Optional[float] = None, retention_seconds: Optional[float] = None,
+                 worker_id: str = WORKER_ID):
+        super().__init__()
+        self.poll_seconds = config.INVALIDATION_POLL_SECONDS if poll_seconds is None else poll_seconds
+        self.retention_seconds = (config.INVALIDATION_RETENTION_SECONDS if retention_seconds is None
+                                  else retention_seconds)
+        self.worker_id = worker_id
+        self._pending: Dict[str, Optional[set]] = {}   # topic -> keys, None = everything
+        self._pending_lock = threading.Lock()
+        self._last_event_id: Optional[int] = None
+        self._last_prune = 0.0
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self.events_written = 0
+        self.polls = 0
+        self.errors = 0
+        self.last_error: Optional[str] = None
+
+    @property
+    def running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    def _send(self, topic: str, keys: Optional[List]):
+        with self._pending_lock:
+            if keys is None:
+                self._pending[topic] = None
+            elif topic not in self._pending:
+                self._pending[topic] = {_hashable(k) for k in keys}
+            elif self._pending[topic] is not None:
+                self._pending[topic].update(_hashable(k) for k in keys)
+
+    def _take_pending(self) -> Dict[str, Optional[set]]:
+        with self._pending_lock:
+            pending, self._pending = self._pending, {}
+        return pending
+
+    def _requeue(self, pending: Dict[str, Optional[set]]):
+        for topic, keys in pending.items():
+            self._send(topic, None if keys is None else list(keys))
+
+    def flush(self):
+        """Write queued events, one row per topic."""
+        pending = self._take_pending()
+        if not pending:
+            return
+        now = datetime.utcnow()
+        db = SessionLocal()
+        try:
+            db.add_all([
+                CacheInvalidation(
+                    topic=topic,
+                    keys=None if keys is None else json.dumps(sorted(keys, key=repr)),
+                    origin=self.worker_id,
+                    created_at=now,
+                )
+                for topic, keys in pending.items()
+            ])
+            db.commit()
+            self.events_written += len(pending)
+        except Exception:
+            db.rollback()
+            self._requeue(pending)
+            raise
+        finally:
+            db.close()
+
+    def poll(self):
+        """Apply the events other workers wrote since the last poll."""
+        db = SessionLocal()
+        try:
+            if self._last_event_id is None:
+                self._last_event_id = db.query(func.max(CacheInvalidation.event_id)).scalar() or 0
+                return
+            rows = (
+                db.query(CacheInvalidation.event_id, CacheInvalidation.topic,
+                         CacheInvalidation.keys, CacheInvalidation.origin)
+                .filter(CacheInvalidation.event_id > self._last_event_id)
+                .order_by(CacheInvalidation.event_id)
+                .all()
+            )
+        finally:
+            db.close()
+        self.polls += 1
+        for event_id, topic, keys, origin in rows:
+            self._last_event_id = event_id
+            if origin != self.worker_id:
+                self._dispatch(topic, None if keys is None else json.loads(keys))
+
+    def prune(self):
+        cutoff = datetime.utcnow() - timedelta(seconds=self.retention_seconds)
+        db = SessionLocal()
+        try:
+            db.execute(delete(CacheInvalidation).where(CacheInvalidation.created_at < cutoff))
+            db.commit()
+        except Exception:
+            db.rollback()
+            raise
+        finally:
+            db.close()
+
+    def run_forever(self):
+        while True:
+            stopping = self._stop.is_set()
+            try:
+                self.flush()
+                if stopping:
+                    return
+                self.poll()
+                if time.monotonic() - self._last_prune > PRUNE_INTERVAL_SECONDS:
+                    self._last_prune = time.monotonic()
+                    self.prune()
+            except Exception as e:
+                print("Invalidation bus error:", e)
+                with self._lock:
+                    self.errors += 1
+                    self.last_error = str(e)
+                if stopping:
+                    return
+            self._stop.wait(self.poll_seconds)
+
+    def start(self):
+        if self.running:
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self.run_forever, name="invalidation-bus", daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout: float = 10.0):
+        """Stop polling after writing whatever is still queued."""
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+
+    def stats(self) -> Dict:
+        stats = super().stats()
+        with self._pending_lock:
+            pending = len(self._pending)
+        with self._lock:
+            stats.update(
+                worker_id=self.worker_id,
+                running=self.running,
+                poll_seconds=self.poll_seconds,
+                pending_topics=pending,
+                events_written=self.events_written,
+                last_event_id=self._last_event_id,
+                polls=self.polls,
+                errors=self.errors,
+                last_error=self.last_error,
+            )
+        return stats
+
+
+def build_bus(kind: Optional[str] = None) -> InvalidationBus:
+    kind = kind or config.INVALIDATION_BUS
+    if kind == "sqlite":
+        return SQLitePollingBus()
+    if kind != "local":
+        print(f"Unknown INVALIDATION_BUS {kind!r}, using the local bus")
+    return InvalidationBus()
+
+
+def connect_caches(bus: InvalidationBus):
+    """
+    Publish every cache's invalidations on the bus and apply other workers'
+    invalidations to this worker's caches.
+    """
+    from backend.utils.airport_index import airport_index
+    from backend.utils.hold_expiry import hold_reaper
+    from backend.utils.price_cache import price_cache
+    from backend.utils.route_graph import route_graph
+    from backend.utils.seat_map import seat_maps
+
+    def apply_price(flight_ids):
+        if flight_ids is None:
+            price_cache.clear()
+        else:
+            price_cache.invalidate(flight_ids)
+
+    def apply_seat_map(flight_ids):
+        # the remote write's seat ids aren't sent: reload the map on next use
+        if flight_ids is None:
+            seat_maps.clear()
+        else:
+            seat_maps.invalidate(flight_ids)
+
+    def apply_route_graph(flight_ids):
+        if flight_ids is None:
+            route_graph.invalidate()
+            return
+        db = SessionLocal()
+        try:
+            route_graph.upsert(db, flight_ids)
+        finally:
+            db.close()
+
+    def apply_holds(holds):
+        # only the leader's reaper is running; add() ignores holds elsewhere
+        for booking_id, timer_expiry in holds or ():
+            hold_reaper.add(booking_id, timer_expiry)
+
+    price_cache.add_listener(lambda flight_ids: bus.publish("price", flight_ids))
+    seat_maps.add_listener(lambda flight_ids: bus.publish("seat_map", flight_ids))
+    airport_index.add_listener(lambda _: bus.publish("airports"))
+    route_graph.add_listener(lambda flight_ids: bus.publish("route_graph", flight_ids))
+    hold_reaper.add_listener(lambda holds: bus.publish("hold", holds))
+
+    bus.subscribe("price", apply_price)
+    bus.subscribe("seat_map", apply_seat_map)
+    bus.subscribe("airports", lambda _: airport_index.invalidate())
+    bus.subscribe("route_graph", apply_route_graph)
+    bus.subscribe("hold", apply_holds)
+
+
+# Bus used by the app (INVALIDATION_BUS)
+invalidation_bus = build_bus()
@@ -0,0 +1,174 @@
+# backend/utils/leader.py
+import os
+import socket
+import threading
+import time
+import uuid
+from datetime import datetime, timedelta
+from typing import Callable, Dict, List, Optional
+
+from sqlalchemy import case, update
+from sqlalchemy.exc import IntegrityError
+
+from backend import config
+from backend.database import SessionLocal
+from backend.models.worker_lease import WorkerLease
+
+# Identifies this process in leases and invalidation events
+WORKER_ID = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:6]}"
+
+
+class LeaderElector:
+    """
+    Leader election between the workers of one deployment through a lease
+    row in worker_leases.
+
+    Every worker tries to take or renew the lease every lease_seconds / 3
+    with a conditional UPDATE (only the holder, or anyone once the lease has
+    expired, matches). The winner runs the on_elected callbacks, and a
+    worker that loses the lease, or cannot renew it in time, runs
+    on_demoted. stop() releases the lease so another worker takes over
+    without waiting for it to expire.
+    """
+
+    def __init__(self, name: str = "background-jobs", lease_seconds: Optional[float] = None,
+                 worker_id: str = WORKER_ID):
+        self.name = name
+        self.lease_seconds = config.LEADER_LEASE_SECONDS if lease_seconds is None else lease_seconds
+        self.worker_id = worker_id
+        self._on_elected: List[Callable[[], None]] = []
+        self._on_demoted: List[Callable[[], None]] = []
+        self._is_leader = False
+        self._renewed_at: Optional[float] = None
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._stats = {"elections": 0, "demotions": 0, "errors": 0, "last_error": None}
+
+    @property
+    def running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    @property
+    def is_leader(self) -> bool:
+        return self._is_leader
+
+    def on_elected(self, callback: Callable[[], None]):
+        self._on_elected.append(callback)
+
+    def on_demoted(self, callback: Callable[[], None]):
+        self._on_demoted.append(callback)
+
+    def try_acquire(self) -> bool:
+        """Take or renew the lease in its own transaction; True while this worker holds it."""
+        now = datetime.utcnow()
+        expires_at = now + timedelta(seconds=self.lease_seconds)
+        db = SessionLocal()
+        try:
+            renewed = db.execute(
+                update(WorkerLease)
+                .where(
+                    WorkerLease.name == self.name,
+                    (WorkerLease.holder == self.worker_id) | (WorkerLease.expires_at < now),
+                )
+                .values(
+                    holder=self.worker_id,
+                    expires_at=expires_at,
+                    acquired_at=case((WorkerLease.holder == self.worker_id, WorkerLease.acquired_at), else_=now),
+                )
+                .execution_options(synchronize_session=False)
+            ).rowcount
+            if not renewed:
+                # no lease row yet, or another worker holds it: the insert settles which
+                db.add(WorkerLease(name=self.name, holder=self.worker_id, acquired_at=now, expires_at=expires_at))
+            db.commit()
+            return True
+        except IntegrityError:
+            db.rollback()
+            return False
+        except Exception:
+            db.rollback()
+            raise
+        finally:
+            db.close()
+
+    def release(self):
+        """Expire our lease now (no-op if another worker holds it)."""
+        db = SessionLocal()
+        try:
+            db.execute(
+                update(WorkerLease)
+                .where(WorkerLease.name == self.name, WorkerLease.holder == self.worker_id)
+                .values(expires_at=datetime.utcnow())
+                .execution_options(synchronize_session=False)
+            )
+            db.commit()
+        except Exception as e:
+            db.rollback()
+            print("Error releasing leader lease:", e)
+        finally:
+            db.close()
+
+    def _run_callbacks(self, callbacks: List[Callable[[], None]]):
+        for callback in callbacks:
+            try:
+                callback()
+            except Exception as e:
+                print("Error in leader election callback:", e)
+
+    def _set_leader(self, leading: bool):
+        if leading == self._is_leader:
+            return
+        with self._lock:
+            self._is_leader = leading
+            self._stats["elections" if leading else "demotions"] += 1
+        print(f"Worker {self.worker_id} {'is now' if leading else 'is no longer'} the leader for {self.name}")
+        self._run_callbacks(self._on_elected if leading else self._on_demoted)
+
+    def run_forever(self):
+        while not self._stop.is_set():
+            try:
+                leading = self.try_acquire()
+                if leading:
+                    self._renewed_at = time.monotonic()
+            except Exception as e:
+                print("Error renewing leader lease:", e)
+                with self._lock:
+                    self._stats["errors"] += 1
+                    self._stats["last_error"] = str(e)
+                # keep leading only while the last renewal is certainly still valid
+                leading = (self._is_leader and self._renewed_at is not None
+                           and time.monotonic() - self._renewed_at < self.lease_seconds * 2 / 3)
+            self._set_leader(leading)
+            self._stop.wait(self.lease_seconds / 3)
+
+    def start(self):
+        if self.running:
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self.run_forever, name="leader-election", daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout: float = 10.0):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+        if self._is_leader:
+            self._set_leader(False)
+            self.release()
+
+    def stats(self) -> Dict:
+        with self._lock:
+            stats = dict(self._stats)
+        stats.update(
+            worker_id=self.worker_id,
+            is_leader=self._is_leader,
+            running=self.running,
+            lease_seconds=self.lease_seconds,
+        )
+        return stats
+
+
+# Elector used by the app when MULTI_WORKER is set
+leader = LeaderElector()
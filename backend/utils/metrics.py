@@ -0,0 +1,301 @@
+# backend/utils/metrics.py
+"""
+Per-request SQL instrumentation and Prometheus metrics.
+
+SQLAlchemy cursor hooks time every statement and charge it to the request
+being served (tracked with a ContextVar, which FastAPI's threadpool copies
+into sync endpoints). QueryMetricsMiddleware opens that per-request record,
+adds a Server-Timing header in DEBUG mode and folds the request into
+per-route totals. Statements slower than SLOW_QUERY_MS are logged together
+with their EXPLAIN QUERY PLAN (SQLite).
+
+MetricsRegistry.render() returns everything in the Prometheus text format
+for GET /metrics: request and query counters per route, a request duration
+histogram, pool checkout waits, and the stats of the background services.
+"""
+import contextvars
+import threading
+import time
+from collections import defaultdict, deque
+from datetime import datetime
+from typing import Callable, Dict, List, Optional
+
+from sqlalchemy import event
+
+from backend import config
+
+# Request duration / pool wait histogram buckets (seconds)
+DURATION_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+# Slowest statements kept per request (Server-Timing) and per route
+SLOWEST_PER_REQUEST = 3
+# Statement text is cut to this length in logs and headers
+STATEMENT_PREVIEW_CHARS = 200
+
+
+class RequestQueries:
+    """SQL executed while serving one request."""
+
+    __slots__ = ("count", "seconds", "slowest")
+
+    def __init__(self):
+        self.count = 0
+        self.seconds = 0.0
+        self.slowest: List[tuple] = []   # (seconds, statement), longest first
+
+    def add(self, seconds: float, statement: str):
+        self.count += 1
+        self.seconds += seconds
+        if len(self.slowest) < SLOWEST_PER_REQUEST or seconds > self.slowest[-1][0]:
+            self.slowest.append((seconds, statement))
+            self.slowest.sort(key=lambda item: item[0], reverse=True)
+            del self.slowest[SLOWEST_PER_REQUEST:]
+
+
+_current = contextvars.ContextVar("request_queries", default=None)
+
+
+def current_queries() -> Optional[RequestQueries]:
+    return _current.get()
+
+
+def _preview(statement: str) -> str:
+    statement = " ".join(statement.split())
+    return statement if len(statement) <= STATEMENT_PREVIEW_CHARS else statement[:STATEMENT_PREVIEW_CHARS] + "..."
+
+
+class _Histogram:
+    def __init__(self, buckets=DURATION_BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * len(buckets)
+        self.total = 0
+        self.sum = 0.0
+
+    def observe(self, value: float):
+        self.total += 1
+        self.sum += value
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                self.counts[i] += 1
+                break
+
+    def lines(self, name: str, labels: str = "") -> List[str]:
+        sep = "," if labels else ""
+        out, cumulative = [], 0
+        for bound, count in zip(self.buckets, self.counts):
+            cumulative += count
+            out.append(f'{name}_bucket{{{labels}{sep}le="{bound}"}} {cumulative}')
+        out.append(f'{name}_bucket{{{labels}{sep}le="+Inf"}} {self.total}')
+        out.append(f"{name}_sum{{{labels}}} {self.sum:.6f}" if labels else f"{name}_sum {self.sum:.6f}")
+        out.append(f"{name}_count{{{labels}}} {self.total}" if labels else f"{name}_count {self.total}")
+        return out
+
+
+class MetricsRegistry:
+    """Process-wide counters behind /metrics; updated from request and pool threads."""
+
+    def __init__(self, slow_log_size: Optional[int] = None):
+        self._lock = threading.Lock()
+        self.requests: Dict[tuple, int] = defaultdict(int)          # (method, route, status) -> count
+        self.durations: Dict[tuple, _Histogram] = {}                # (method, route) -> histogram
+        self.route_queries: Dict[tuple, int] = defaultdict(int)     # (method, route) -> statements
+        self.route_db_seconds: Dict[tuple, float] = defaultdict(float)
+        self.queries_total = 0
+        self.query_seconds_total = 0.0
+        self.slow_queries_total = 0
+        self.pool_wait = _Histogram()
+        self.slow_log = deque(maxlen=slow_log_size or config.SLOW_QUERY_LOG_SIZE)
+        self._gauges: Dict[str, Callable[[], Dict]] = {}
+
+    def observe_query(self, seconds: float):
+        with self._lock:
+            self.queries_total += 1
+            self.query_seconds_total += seconds
+
+    def observe_slow_query(self, entry: dict):
+        with self._lock:
+            self.slow_queries_total += 1
+            self.slow_log.append(entry)
+
+    def observe_pool_wait(self, seconds: float):
+        with self._lock:
+            self.pool_wait.observe(seconds)
+
+    def observe_request(self, method: str, route: str, status: int, seconds: float, queries: RequestQueries):
+        key = (method, route)
+        with self._lock:
+            self.requests[(method, route, status)] += 1
+            histogram = self.durations.get(key)
+            if histogram is None:
+                histogram = self.durations[key] = _Histogram()
+            histogram.observe(seconds)
+            self.route_queries[key] += queries.count
+            self.route_db_seconds[key] += queries.seconds
+
+    def add_gauges(self, component: str, stats: Callable[[], Dict]):
+        """Export the numeric values of stats() as flightbooking_<component>_<key> gauges."""
+        self._gauges[component] = stats
+
+    def slow_queries(self) -> List[dict]:
+        with self._lock:
+            return list(reversed(self.slow_log))
+
+    def render(self) -> str:
+        lines: List[str] = []
+
+        def family(name: str, kind: str, help_text: str):
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} {kind}")
+
+        with self._lock:
+            family("http_requests_total", "counter", "HTTP requests by route and status.")
+            for (method, route, status), count in sorted(self.requests.items()):
+                lines.append(f'http_requests_total{{method="{method}",route="{route}",status="{status}"}} {count}')
+            family("http_request_duration_seconds", "histogram", "HTTP request duration by route.")
+            for (method, route), histogram in sorted(self.durations.items()):
+                lines.extend(histogram.lines("http_request_duration_seconds", f'method="{method}",route="{route}"'))
+            family("http_request_db_queries_total", "counter", "SQL statements executed while serving each route.")
+            for (method, route), count in sorted(self.route_queries.items()):
+                lines.append(f'http_request_db_queries_total{{method="{method}",route="{route}"}} {count}')
+            family("http_request_db_seconds_total", "counter", "Time spent in SQL while serving each route.")
+            for (method, route), seconds in sorted(self.route_db_seconds.items()):
+                lines.append(f'http_request_db_seconds_total{{method="{method}",route="{route}"}} {seconds:.6f}')
+            family("db_queries_total", "counter", "SQL statements executed by the process.")
+            lines.append(f"db_queries_total {self.queries_total}")
+            family("db_query_seconds_total", "counter", "Time spent executing SQL statements.")
+            lines.append(f"db_query_seconds_total {self.query_seconds_total:.6f}")
+            family("db_slow_queries_total", "counter", f"Statements slower than {config.SLOW_QUERY_MS} ms.")
+            lines.append(f"db_slow_queries_total {self.slow_queries_total}")
+            family("db_pool_wait_seconds", "histogram", "Time spent waiting for a pooled connection.")
+            lines.extend(self.pool_wait.lines("db_pool_wait_seconds"))
+            gauges = dict(self._gauges)
+
+        for component, stats in gauges.items():
+            try:
+                values = stats()
+            except Exception as e:
+                print(f"Metrics: could not read {component} stats:", e)
+                continue
+            for key, value in values.items():
+                if isinstance(value, bool):
+                    value = int(value)
+                if not isinstance(value, (int, float)):
+                    continue
+                name = f"flightbooking_{component}_{key}"
+                family(name, "gauge", f"{component} {key.replace('_', ' ')}.")
+                lines.append(f"{name} {value}")
+        return "\n".join(lines) + "\n"
+
+
+# Registry used by the app
+metrics = MetricsRegistry()
+
+
+# ----------------------
+# SQLAlchemy hooks
+# ----------------------
+def _explain(conn, statement: str, parameters) -> Optional[List[str]]:
+    """EXPLAIN QUERY PLAN on a separate cursor of the same connection (SQLite only)."""
+    if conn.dialect.name != "sqlite" or not statement.lstrip().upper().startswith(("SELECT", "WITH", "UPDATE", "DELETE")):
+        return None
+    cursor = conn.connection.cursor()
+    try:
+        cursor.execute(f"EXPLAIN QUERY PLAN {statement}", parameters or ())
+        return [row[-1] for row in cursor.fetchall()]
+    except Exception as e:
+        return [f"(explain failed: {e})"]
+    finally:
+        cursor.close()
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    # kept on the statement's execution context, which is dropped with it when the statement fails
+    if context is not None:
+        context._metrics_query_start = time.perf_counter()
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    start = getattr(context, "_metrics_query_start", None)
+    if start is None:
+        return
+    seconds = time.perf_counter() - start
+    metrics.observe_query(seconds)
+    request = _current.get()
+    if request is not None:
+        request.add(seconds, statement)
+
+    if config.SLOW_QUERY_MS and seconds * 1000 >= config.SLOW_QUERY_MS:
+        plan = _explain(conn, statement, parameters) if config.SLOW_QUERY_EXPLAIN and not executemany else None
+        entry = {
+            "at": datetime.utcnow().isoformat(),
+            "ms": round(seconds * 1000, 3),
+            "statement": _preview(statement),
+            "plan": plan,
+        }
+        metrics.observe_slow_query(entry)
+        print(f"Slow query ({entry['ms']} ms): {entry['statement']}" + (f" | plan: {'; '.join(plan)}" if plan else ""))
+
+
+def install_query_hooks(engine):
+    """Time every statement on engine."""
+    if event.contains(engine, "before_cursor_execute", _before_cursor_execute):
+        return
+    event.listen(engine, "before_cursor_execute", _before_cursor_execute)
+    event.listen(engine, "after_cursor_execute", _after_cursor_execute)
+
+
+# ----------------------
+# ASGI middleware
+# ----------------------
+def _server_timing(queries: RequestQueries, seconds: float) -> str:
+    parts = [
+        f'db;dur={queries.seconds * 1000:.2f};desc="{queries.count} queries"',
+        f"app;dur={seconds * 1000:.2f}",
+    ]
+    for i, (query_seconds, statement) in enumerate(queries.slowest, start=1):
+        desc = _preview(statement)[:80].replace('"', "'")
+        parts.append(f'sql{i};dur={query_seconds * 1000:.2f};desc="{desc}"')
+    return ", ".join(parts)
+
+
+class QueryMetricsMiddleware:
+    """
+    Pure ASGI middleware (no extra task per request): opens the per-request
+    query record, adds Server-Timing when config.DEBUG is set and records the
+    request under its route template. Queries run while a streaming body is
+    being sent are counted in the process totals but not in the header.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        queries = RequestQueries()
+        token = _current.set(queries)
+        start = time.perf_counter()
+        status = {"code": 500}
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                status["code"] = message["status"]
+                if config.DEBUG:
+                    headers = list(message.get("headers", []))
+                    headers.append((b"server-timing", _server_timing(queries, time.perf_counter() - start).encode()))
+                    message = {**message, "headers": headers}
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            _current.reset(token)
+            route = scope.get("route")
+            metrics.observe_request(
+                scope["method"],
+                getattr(route, "path", "unmatched"),
+                status["code"],
+                time.perf_counter() - start,
+                queries,
+            )
@@ -0,0 +1,103 @@
+# backend/utils/price_cache.py
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Iterable, List, Optional
+
+# Defaults for the shared pricing cache
+PRICE_CACHE_MAXSIZE = 10000
+PRICE_CACHE_TTL_SECONDS = 60
+
+
+class PriceCache:
+    """
+    Bounded LRU cache of price breakdowns keyed by flight_id.
+
+    Every entry expires after ttl_seconds, or earlier when the caller passes
+    a shorter max_age (e.g. the time left until the next pricing tier).
+    Writes that change a flight's inventory must call invalidate(); listeners
+    added with add_listener() hear about every invalidation (flight ids, or
+    None after clear()).
+    """
+
+    def __init__(self, maxsize: int = PRICE_CACHE_MAXSIZE, ttl_seconds: float = PRICE_CACHE_TTL_SECONDS,
+                 clock=time.monotonic):
+        self.maxsize = maxsize
+        self.ttl_seconds = ttl_seconds
+        self._clock = clock
+        self._entries: "OrderedDict[int, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.invalidations = 0
+        self._listeners: List[Callable[[Optional[List[int]]], None]] = []
+
+    def add_listener(self, listener: Callable[[Optional[List[int]]], None]):
+        self._listeners.append(listener)
+
+    def _notify(self, flight_ids: Optional[List[int]]):
+        for listener in self._listeners:
+            listener(flight_ids)
+
+    def get(self, flight_id: int) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            entry = self._entries.get(flight_id)
+            if entry is None:
+                self.misses += 1
+                return None
+            expires_at, value = entry
+            if expires_at <= self._clock():
+                del self._entries[flight_id]
+                self.expirations += 1
+                self.misses += 1
+                return None
+            self._entries.move_to_end(flight_id)
+            self.hits += 1
+            return value
+
+    def set(self, flight_id: int, value: Dict[str, Any], max_age: Optional[float] = None):
+        ttl = self.ttl_seconds if max_age is None else min(self.ttl_seconds, max_age)
+        if ttl <= 0 or self.maxsize <= 0:
+            return
+        with self._lock:
+            self._entries[flight_id] = (self._clock() + ttl, value)
+            self._entries.move_to_end(flight_id)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def invalidate(self, flight_ids: Iterable[int]):
+        flight_ids = list(flight_ids)
+        with self._lock:
+            for fid in flight_ids:
+                if self._entries.pop(fid, None) is not None:
+                    self.invalidations += 1
+        if flight_ids:
+            self._notify(flight_ids)
+
+    def clear(self):
+        with self._lock:
+            self.invalidations += len(self._entries)
+            self._entries.clear()
+        self._notify(None)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "size": len(self._entries),
+                "maxsize": self.maxsize,
+                "ttl_seconds": self.ttl_seconds,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_ratio": round(self.hits / lookups, 4) if lookups else 0.0,
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+                "invalidations": self.invalidations,
+            }
+
+
+# Shared cache used by the pricing layer
+price_cache = PriceCache()
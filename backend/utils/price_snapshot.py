@@ -0,0 +1,239 @@
+# backend/utils/price_snapshot.py
+import json
+import threading
+import time
+from datetime import datetime, timedelta
+from typing import Dict, Iterable, List, Optional, Set
+
+from sqlalchemy import and_, func, or_
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.orm import Session
+
+from backend import config
+from backend.database import SessionLocal
+from backend.models.flight import Flight
+from backend.models.flight_inventory import FlightInventory
+from backend.models.flight_price_snapshot import FlightPriceSnapshot
+from backend.utils.dynamic_pricing import (
+    PRICING_BATCH_SIZE, _breakdown_at, _chunked, _class_multiplier,
+    _fetch_pricing_columns, _seconds_to_next_tier, price_kernel,
+)
+from backend.utils.price_cache import price_cache
+
+_snapshots = FlightPriceSnapshot.__table__
+_SNAPSHOT_FIELDS = ("final_price", "breakdown", "base_fare", "travel_class",
+                    "inventory_version", "computed_at", "valid_until")
+
+
+def snapshot_is_fresh(now: datetime):
+    """
+    SQL condition: the flight's snapshot exists and was computed from its
+    current base fare, class and inventory version, inside the current
+    time-to-departure tier. Needs flight_price_snapshot and flight_inventory
+    outer-joined to flights.
+    """
+    return and_(
+        FlightPriceSnapshot.flight_id.isnot(None),
+        FlightPriceSnapshot.inventory_version == func.coalesce(FlightInventory.version, 0),
+        FlightPriceSnapshot.base_fare == Flight.base_fare,
+        FlightPriceSnapshot.travel_class == Flight.travel_class,
+        or_(FlightPriceSnapshot.valid_until.is_(None), FlightPriceSnapshot.valid_until > now),
+    )
+
+
+def stale_flight_ids(db: Session, now: Optional[datetime] = None) -> List[int]:
+    """Flights whose snapshot is missing or out of date."""
+    now = now or datetime.utcnow()
+    rows = (
+        db.query(Flight.flight_id)
+        .outerjoin(FlightPriceSnapshot, FlightPriceSnapshot.flight_id == Flight.flight_id)
+        .outerjoin(FlightInventory, FlightInventory.flight_id == Flight.flight_id)
+        .filter(~snapshot_is_fresh(now))
+        .all()
+    )
+    return [fid for (fid,) in rows]
+
+
+def _upsert_statement(dialect_name: str):
+    dialect_insert = postgresql.insert if dialect_name == "postgresql" else sqlite.insert
+    stmt = dialect_insert(_snapshots)
+    return stmt.on_conflict_do_update(
+        index_elements=[_snapshots.c.flight_id],
+        set_={name: stmt.excluded[name] for name in _SNAPSHOT_FIELDS},
+    )
+
+
+def refresh_snapshots(db: Session, flight_ids: Iterable[int], now: Optional[datetime] = None) -> int:
+    """
+    Reprice the given flights with the batch kernel and upsert their
+    snapshots inside the caller's transaction. Returns the rows written.
+    """
+    now = now or datetime.utcnow()
+    now_epoch = (now - datetime(1970, 1, 1)).total_seconds()
+    upsert = _upsert_statement(db.get_bind().dialect.name)
+    written = 0
+    for chunk in _chunked(list(dict.fromkeys(flight_ids)), PRICING_BATCH_SIZE):
+        columns = _fetch_pricing_columns(chunk, db)
+        if not columns["flight_id"]:
+            continue
+        priced = price_kernel(
+            columns["base_fare"],
+            columns["total_seats"],
+            columns["booked_seats"],
+            columns["bookings"],
+            columns["departure_epoch"],
+            [_class_multiplier(tc) for tc in columns["travel_class"]],
+            now_epoch=now_epoch,
+        )
+        rows = []
+        for i, fid in enumerate(columns["flight_id"]):
+            breakdown = _breakdown_at(
+                priced, i,
+                columns["base_fare"][i],
+                columns["total_seats"][i],
+                columns["bookings"][i],
+                columns["travel_class"][i],
+            )
+            to_next_tier = _seconds_to_next_tier(float(priced["hours_until_departure"][i]))
+            rows.append({
+                "flight_id": fid,
+                "final_price": breakdown["final_price"],
+                "breakdown": json.dumps(breakdown),
+                "base_fare": columns["base_fare"][i],
+                "travel_class": columns["travel_class"][i],
+                "inventory_version": columns["version"][i],
+                "computed_at": now.isoformat(),
+                "valid_until": None if to_next_tier is None else now + timedelta(seconds=to_next_tier),
+            })
+        db.execute(upsert, rows)
+        written += len(rows)
+    return written
+
+
+class Repricer:
+    """
+    Keeps flight_price_snapshot current from a worker thread.
+
+    Flights are repriced when their price cache entry is invalidated (every
+    inventory or fare write goes through price_cache.invalidate), when the
+    earliest snapshot reaches its time-tier boundary, and on a periodic
+    sweep for snapshots made stale by other processes.
+    """
+
+    def __init__(self, interval: Optional[float] = None, debounce: Optional[float] = None):
+        self.interval = config.REPRICER_INTERVAL_SECONDS if interval is None else interval
+        self.debounce = config.REPRICER_DEBOUNCE_SECONDS if debounce is None else debounce
+        self._cond = threading.Condition()
+        self._pending: Set[int] = set()
+        self._sweep_requested = True  # first pass prices everything that is stale
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._stats = {"passes": 0, "repriced": 0, "errors": 0, "last_error": None,
+                       "last_pass_seconds": None, "next_tier_boundary": None}
+        price_cache.add_listener(self.notify)
+
+    @property
+    def running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    def notify(self, flight_ids: Optional[List[int]]):
+        """Price-cache listener: queue the flights (None = everything) for repricing."""
+        if not self.running:
+            return
+        with self._cond:
+            if flight_ids is None:
+                self._sweep_requested = True
+            else:
+                self._pending.update(flight_ids)
+            self._cond.notify()
+
+    def _next_boundary(self, db: Session) -> Optional[datetime]:
+        return (
+            db.query(func.min(FlightPriceSnapshot.valid_until))
+            .filter(FlightPriceSnapshot.valid_until.isnot(None))
+            .scalar()
+        )
+
+    def run_pass(self, flight_ids: Optional[Iterable[int]] = None) -> int:
+        """Reprice the given flights, or every stale one when flight_ids is None."""
+        start = time.perf_counter()
+        db = SessionLocal()
+        try:
+            now = datetime.utcnow()
+            ids = stale_flight_ids(db, now) if flight_ids is None else list(flight_ids)
+            written = refresh_snapshots(db, ids, now) if ids else 0
+            db.commit()
+            boundary = self._next_boundary(db)
+        except Exception:
+            db.rollback()
+            raise
+        finally:
+            db.close()
+        with self._cond:
+            self._stats["passes"] += 1
+            self._stats["repriced"] += written
+            self._stats["last_pass_seconds"] = round(time.perf_counter() - start, 4)
+            self._stats["next_tier_boundary"] = boundary
+        return written
+
+    def _wait_for_work(self):
+        """Block until flights are queued, a tier boundary passes or the sweep interval ends."""
+        with self._cond:
+            boundary = self._stats["next_tier_boundary"]
+            timeout = self.interval
+            if boundary is not None:
+                timeout = min(timeout, max((boundary - datetime.utcnow()).total_seconds(), 0.0))
+            if not self._pending and not self._sweep_requested:
+                if not self._cond.wait(timeout):
+                    self._sweep_requested = True  # timer fired: boundary reached or periodic sweep
+
+    def run_forever(self):
+        while not self._stop.is_set():
+            self._wait_for_work()
+            if self._stop.is_set():
+                break
+            # let a burst of bookings coalesce into one pass
+            self._stop.wait(self.debounce)
+            with self._cond:
+                sweep, pending = self._sweep_requested, self._pending
+                self._sweep_requested, self._pending = False, set()
+            try:
+                self.run_pass(None if sweep else pending)
+            except Exception as e:
+                print("Error repricing flights:", e)
+                with self._cond:
+                    self._stats["errors"] += 1
+                    self._stats["last_error"] = str(e)
+                    self._pending |= pending
+                self._stop.wait(1.0)
+
+    def start(self):
+        if self.running:
+            return
+        self._stop.clear()
+        with self._cond:
+            self._sweep_requested = True
+        self._thread = threading.Thread(target=self.run_forever, name="repricer", daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout: float = 10.0):
+        self._stop.set()
+        with self._cond:
+            self._cond.notify_all()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+
+    def stats(self) -> Dict:
+        with self._cond:
+            stats = dict(self._stats)
+            stats["queued"] = len(self._pending)
+        boundary = stats.pop("next_tier_boundary")
+        stats["next_tier_boundary"] = boundary.isoformat() if boundary else None
+        stats["running"] = self.running
+        stats["interval_seconds"] = self.interval
+        return stats
+
+
+# Repricer used by the app
+repricer = Repricer()
@@ -0,0 +1,193 @@
+# backend/utils/route_graph.py
+import bisect
+import threading
+import time
+from datetime import datetime
+from typing import Callable, Dict, Iterable, List, NamedTuple, Optional, Sequence, Tuple
+
+from sqlalchemy.orm import Session
+
+from backend import config
+from backend.models.flight import Flight
+from backend.utils.dynamic_pricing import _departure_epoch
+
+# Longest itinerary searched (i.e. up to two connections)
+MAX_LEGS = 3
+# Partial itineraries kept per round (guards against blow-up on dense hubs)
+MAX_FRONTIER = 20000
+
+
+class Leg(NamedTuple):
+    """One timed edge of the graph: a flight from origin to destination."""
+    departure: float        # epoch seconds (naive UTC)
+    arrival: float
+    flight_id: int
+    origin: int
+    destination: int
+    stops: int
+    company_name: str
+    travel_class: str
+
+
+class Itinerary(NamedTuple):
+    legs: Tuple[Leg, ...]
+
+    @property
+    def departure(self) -> float:
+        return self.legs[0].departure
+
+    @property
+    def arrival(self) -> float:
+        return self.legs[-1].arrival
+
+    @property
+    def duration_minutes(self) -> int:
+        return int((self.arrival - self.departure) // 60)
+
+    @property
+    def stops(self) -> int:
+        """Connections plus the intermediate stops of every leg."""
+        return len(self.legs) - 1 + sum(leg.stops for leg in self.legs)
+
+
+_COLUMNS = (
+    Flight.flight_id, Flight.origin_airport_id, Flight.destination_airport_id,
+    Flight.departure_time, Flight.arrival_time, Flight.stops,
+    Flight.company_name, Flight.travel_class,
+)
+
+
+def _leg(row) -> Optional[Leg]:
+    flight_id, origin, destination, departure_time, arrival_time, stops, company_name, travel_class = row
+    departure, arrival = _departure_epoch(departure_time), _departure_epoch(arrival_time)
+    if departure != departure or arrival != arrival:  # NaN: unparseable legacy value
+        return None
+    return Leg(departure, arrival, flight_id, origin, destination, int(stops or 0), company_name, travel_class)
+
+
+class RouteGraph:
+    """
+    In-memory time-expanded route graph: airports are nodes and every flight
+    is a timed edge. Departures are kept per origin airport sorted by time, so
+    "flights leaving X between t1 and t2" is a bisect.
+
+    Built once (lazily), patched by upsert() after a sync and reloaded after
+    max_age seconds so flights synced by other workers show up. Each origin's
+    (legs, departure times) pair is one tuple, replaced and never mutated, so
+    searches can run without holding the lock and never mix two versions.
+    """
+
+    def __init__(self, max_age: Optional[float] = None):
+        self.max_age = config.ROUTE_GRAPH_MAX_AGE_SECONDS if max_age is None else max_age
+        self._lock = threading.Lock()
+        # origin -> (legs sorted by departure, their departure epochs)
+        self._by_origin: Dict[int, Tuple[List[Leg], List[float]]] = {}
+        self._origin_of: Dict[int, int] = {}           # flight_id -> origin airport
+        self._loaded_at: Optional[float] = None
+        self._listeners: List[Callable[[Optional[List[int]]], None]] = []
+
+    def add_listener(self, listener: Callable[[Optional[List[int]]], None]):
+        """listener(flight_ids) after upsert(), listener(None) after invalidate()."""
+        self._listeners.append(listener)
+
+    def _notify(self, flight_ids: Optional[List[int]]):
+        for listener in self._listeners:
+            listener(flight_ids)
+
+    def load(self, db: Session):
+        by_origin: Dict[int, List[Leg]] = {}
+        origin_of = {}
+        for row in db.query(*_COLUMNS):
+            leg = _leg(row)
+            if leg is None:
+                continue
+            by_origin.setdefault(leg.origin, []).append(leg)
+            origin_of[leg.flight_id] = leg.origin
+        for legs in by_origin.values():
+            legs.sort()
+        with self._lock:
+            self._by_origin = {origin: (legs, [leg.departure for leg in legs]) for origin, legs in by_origin.items()}
+            self._origin_of = origin_of
+            self._loaded_at = time.monotonic()
+
+    def _ensure_loaded(self, db: Session):
+        if self._loaded_at is None or time.monotonic() - self._loaded_at > self.max_age:
+            self.load(db)
+
+    def upsert(self, db: Session, flight_ids: Iterable[int]):
+        """Add or replace the given flights (e.g. after /flights/sync) without a full rebuild."""
+        flight_ids = list(flight_ids)
+        if flight_ids:
+            self._notify(flight_ids)
+        if self._loaded_at is None or not flight_ids:
+            return  # loads everything on first use anyway
+        legs = [leg for leg in (_leg(row) for row in db.query(*_COLUMNS).filter(Flight.flight_id.in_(flight_ids)))
+                if leg is not None]
+        with self._lock:
+            touched = {self._origin_of[fid] for fid in flight_ids if fid in self._origin_of}
+            touched |= {leg.origin for leg in legs}
+            replaced = set(flight_ids)
+            by_origin = {origin: [leg for leg in self._by_origin.get(origin, ((), ()))[0]
+                                  if leg.flight_id not in replaced]
+                         for origin in touched}
+            for leg in legs:
+                bisect.insort(by_origin[leg.origin], leg)
+                self._origin_of[leg.flight_id] = leg.origin
+            for origin, origin_legs in by_origin.items():
+                self._by_origin[origin] = (origin_legs, [leg.departure for leg in origin_legs])
+
+    def invalidate(self):
+        with self._lock:
+            self._loaded_at = None
+        self._notify(None)
+
+    def _departures(self, airport_id: int, earliest: float, latest: float) -> Sequence[Leg]:
+        departures = self._by_origin.get(airport_id)
+        if not departures:
+            return ()
+        legs, times = departures
+        return legs[bisect.bisect_left(times, earliest):bisect.bisect_left(times, latest)]
+
+    def connections(self, db: Session, origin_ids: Sequence[int], destination_ids: Sequence[int],
+                    window_start: datetime, window_end: datetime, max_legs: int = 2) -> List[Itinerary]:
+        """
+        Itineraries of 2..max_legs flights from any origin to any destination,
+        first leg departing inside the window. Round k (RAPTOR-style) extends
+        every itinerary of k legs by the flights leaving its arrival airport
+        between MIN_CONNECTION_MINUTES and MAX_LAYOVER_MINUTES (config) later;
+        airports are never revisited. Direct flights are left to the regular
+        search.
+        """
+        self._ensure_loaded(db)
+        max_legs = min(max_legs, MAX_LEGS)
+        destinations = set(destination_ids)
+        start, end = _departure_epoch(window_start), _departure_epoch(window_end)
+        min_connection, max_layover = config.MIN_CONNECTION_MINUTES * 60, config.MAX_LAYOVER_MINUTES * 60
+
+        # round 1: first legs that do not already end at the destination
+        frontier = [
+            (leg,)
+            for origin in origin_ids
+            for leg in self._departures(origin, start, end)
+            if leg.destination not in destinations and leg.destination not in origin_ids
+        ]
+        found: List[Itinerary] = []
+        for _round in range(2, max_legs + 1):
+            next_frontier = []
+            for path in frontier:
+                last = path[-1]
+                visited = {path[0].origin, *(leg.destination for leg in path)}
+                for leg in self._departures(last.destination, last.arrival + min_connection,
+                                            last.arrival + max_layover + 1):
+                    if leg.destination in destinations:
+                        found.append(Itinerary(path + (leg,)))
+                    elif leg.destination not in visited and len(next_frontier) < MAX_FRONTIER:
+                        next_frontier.append(path + (leg,))
+            frontier = next_frontier
+            if not frontier:
+                break
+        return found
+
+
+# Shared graph used by the search route
+route_graph = RouteGraph()
@@ -0,0 +1,243 @@
+# backend/utils/seat_inventory.py
+"""
+Per-flight seat inventory counters.
+
+The flight_inventory table holds, for every flight, the counts that pricing
+needs (total seats, seats flagged is_booked, booking_seats links, bookings).
+Booking writes adjust the counters in the same transaction as the seat
+changes, so price reads are a primary-key lookup instead of COUNT(*) queries.
+
+Run `python -m backend.utils.seat_inventory` to rebuild the counters from the
+base tables and report any drift (`--check` reports without fixing).
+"""
+import argparse
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+
+from sqlalchemy import case, distinct, func, update
+from sqlalchemy.orm import Session
+
+from backend import models
+from backend.utils.price_cache import price_cache
+from backend.utils.seat_map import seat_maps
+
+COUNTER_FIELDS = ("total_seats", "booked_seats", "linked_seats", "booking_count")
+
+
+def count_inventory(db: Session, flight_ids: Optional[List[int]] = None) -> Dict[int, Dict[str, int]]:
+    """
+    Count inventory from the base tables: one GROUP BY over seats/booking_seats
+    and one over bookings. flight_ids=None counts every flight.
+    """
+    Flight = models.flight.Flight
+    Seat = models.seat.Seat
+    BookingSeat = models.booking_seat.BookingSeat
+    Booking = models.booking.Booking
+
+    # total seats, seats flagged is_booked and BookingSeat links, per flight
+    seat_query = (
+        db.query(
+            Seat.flight_id,
+            func.count(distinct(Seat.seat_id)),
+            func.count(distinct(case((Seat.is_booked == 1, Seat.seat_id)))),
+            func.count(BookingSeat.booking_seat_id),
+        )
+        .outerjoin(BookingSeat, BookingSeat.seat_id == Seat.seat_id)
+        .group_by(Seat.flight_id)
+    )
+    booking_query = (
+        db.query(Booking.flight_id, func.count(Booking.booking_id))
+        .group_by(Booking.flight_id)
+    )
+    flight_query = db.query(Flight.flight_id)
+    if flight_ids is not None:
+        seat_query = seat_query.filter(Seat.flight_id.in_(flight_ids))
+        booking_query = booking_query.filter(Booking.flight_id.in_(flight_ids))
+        flight_query = flight_query.filter(Flight.flight_id.in_(flight_ids))
+
+    counts = {
+        fid: {"total_seats": 0, "booked_seats": 0, "linked_seats": 0, "booking_count": 0}
+        for (fid,) in flight_query.all()
+    }
+    for fid, total, flagged, linked in seat_query.all():
+        if fid in counts:
+            counts[fid].update(total_seats=int(total), booked_seats=int(flagged), linked_seats=int(linked))
+    for fid, count in booking_query.all():
+        if fid in counts:
+            counts[fid]["booking_count"] = int(count)
+    return counts
+
+
+def _insert_rows(db: Session, counts: Dict[int, Dict[str, int]]):
+    now = datetime.utcnow().isoformat()
+    db.add_all(
+        models.flight_inventory.FlightInventory(flight_id=fid, version=1, updated_at=now, **c)
+        for fid, c in counts.items()
+    )
+    db.flush()
+
+
+def get_inventory(db: Session, flight_ids: List[int]) -> Dict[int, Tuple[int, int, int, int, int]]:
+    """
+    Read counters for the given flights as
+    {flight_id: (total_seats, booked_seats, linked_seats, booking_count, version)}.
+
+    Flights without a counter row yet (e.g. created by another path) are
+    counted from the base tables instead; they get a row on their next write
+    or on the next reconcile. Unknown flight ids are left out.
+    """
+    Inventory = models.flight_inventory.FlightInventory
+    rows = (
+        db.query(
+            Inventory.flight_id, Inventory.total_seats, Inventory.booked_seats,
+            Inventory.linked_seats, Inventory.booking_count, Inventory.version,
+        )
+        .filter(Inventory.flight_id.in_(flight_ids))
+        .all()
+    )
+    result = {fid: (total, booked, linked, bookings, version)
+              for fid, total, booked, linked, bookings, version in rows}
+
+    missing = [fid for fid in flight_ids if fid not in result]
+    if missing:
+        for fid, c in count_inventory(db, missing).items():
+            result[fid] = (c["total_seats"], c["booked_seats"], c["linked_seats"], c["booking_count"], 0)
+    return result
+
+
+def init_inventory(db: Session, total_by_flight: Dict[int, int]):
+    """
+    Counters for flights whose seats were just generated in bulk (nothing
+    booked yet). Flights that already have a row get their total bumped.
+    """
+    if not total_by_flight:
+        return
+    Inventory = models.flight_inventory.FlightInventory
+    existing = {fid for (fid,) in db.query(Inventory.flight_id)
+                .filter(Inventory.flight_id.in_(list(total_by_flight))).all()}
+    for fid in existing:
+        adjust_inventory(db, fid, total=total_by_flight[fid])
+    _insert_rows(db, {
+        fid: {"total_seats": total, "booked_seats": 0, "linked_seats": 0, "booking_count": 0}
+        for fid, total in total_by_flight.items()
+        if fid not in existing
+    })
+
+
+def adjust_inventory(db: Session, flight_id: int, total: int = 0, booked: int = 0,
+                     linked: int = 0, bookings: int = 0):
+    """
+    Apply counter deltas for one flight inside the caller's transaction.
+    Call after the base-table write: a missing row is rebuilt from the base
+    tables, which then already include the change.
+    """
+    Inventory = models.flight_inventory.FlightInventory
+    result = db.execute(
+        update(Inventory)
+        .where(Inventory.flight_id == flight_id)
+        .values(
+            total_seats=Inventory.total_seats + total,
+            booked_seats=Inventory.booked_seats + booked,
+            linked_seats=Inventory.linked_seats + linked,
+            booking_count=Inventory.booking_count + bookings,
+            version=Inventory.version + 1,
+            updated_at=datetime.utcnow().isoformat(),
+        )
+        .execution_options(synchronize_session=False)
+    )
+    if result.rowcount == 0:
+        _insert_rows(db, count_inventory(db, [flight_id]))
+
+
+def set_booked_seats(db: Session, booked_by_flight: Dict[int, int]):
+    """
+    Overwrite booked_seats for several flights at once (used by the demand
+    simulator, which rewrites is_booked wholesale).
+    """
+    if not booked_by_flight:
+        return
+    Inventory = models.flight_inventory.FlightInventory
+    now = datetime.utcnow().isoformat()
+    existing = {fid for (fid,) in db.query(Inventory.flight_id)
+                .filter(Inventory.flight_id.in_(list(booked_by_flight))).all()}
+    for fid, booked in booked_by_flight.items():
+        if fid not in existing:
+            continue
+        db.execute(
+            update(Inventory)
+            .where(Inventory.flight_id == fid)
+            .values(booked_seats=booked, version=Inventory.version + 1, updated_at=now)
+            .execution_options(synchronize_session=False)
+        )
+    missing = [fid for fid in booked_by_flight if fid not in existing]
+    if missing:
+        _insert_rows(db, count_inventory(db, missing))
+
+
+def reconcile_inventory(db: Session, fix: bool = True) -> List[Dict]:
+    """
+    Rebuild the counters from the base tables and report any drift.
+    Returns one entry per flight whose row was missing, stale or orphaned.
+    """
+    Inventory = models.flight_inventory.FlightInventory
+    actual = count_inventory(db)
+    stored = {row.flight_id: row for row in db.query(Inventory).all()}
+
+    drift = []
+    missing = {}
+    now = datetime.utcnow().isoformat()
+    for fid, counts in actual.items():
+        row = stored.get(fid)
+        if row is None:
+            drift.append({"flight_id": fid, "issue": "missing", "expected": counts})
+            missing[fid] = counts
+            continue
+        diff = {
+            field: {"stored": getattr(row, field), "expected": counts[field]}
+            for field in COUNTER_FIELDS
+            if getattr(row, field) != counts[field]
+        }
+        if diff:
+            drift.append({"flight_id": fid, "issue": "drift", "fields": diff})
+            if fix:
+                for field in COUNTER_FIELDS:
+                    setattr(row, field, counts[field])
+                row.version = (row.version or 0) + 1
+                row.updated_at = now
+
+    for fid, row in stored.items():
+        if fid not in actual:
+            drift.append({"flight_id": fid, "issue": "orphaned"})
+            if fix:
+                db.delete(row)
+
+    if fix:
+        if missing:
+            _insert_rows(db, missing)
+        db.commit()
+        if drift:
+            price_cache.clear()
+            seat_maps.clear()
+    return drift
+
+
+if __name__ == "__main__":
+    from backend.database import Base, SessionLocal, engine
+
+    parser = argparse.ArgumentParser(description="Rebuild flight_inventory counters from the base tables.")
+    parser.add_argument("--check", action="store_true", help="only report drift, do not fix it")
+    args = parser.parse_args()
+
+    Base.metadata.create_all(bind=engine)
+    db = SessionLocal()
+    try:
+        report = reconcile_inventory(db, fix=not args.check)
+    finally:
+        db.close()
+
+    if not report:
+        print("Inventory counters are in sync.")
+    else:
+        for entry in report:
+            print(entry)
+        print(f"{len(report)} flight(s) with drift" + ("" if args.check else " (fixed)"))
@@ -0,0 +1,54 @@
+# backend/utils/seat_layout.py
+from typing import Dict, List, Sequence, Tuple
+
+from backend.utils.seat_map import SEAT_CLASSES
+
+# Default cabin for generated flights: seats per class, in SEAT_CLASSES order
+SEATS_PER_CLASS = 5
+
+# Share of a larger cabin per class (Economy, Business, First) used by cabin_layout()
+CABIN_SHARES = (0.8, 0.15, 0.05)
+
+
+def cabin_layout(seats_per_flight: int) -> Tuple[int, ...]:
+    """
+    Seats per class for a cabin of seats_per_flight seats, in SEAT_CLASSES
+    order: mostly Economy, at least one Business and First seat when the
+    cabin has room for them.
+    """
+    if seats_per_flight < len(SEAT_CLASSES):
+        return (seats_per_flight,) + (0,) * (len(SEAT_CLASSES) - 1)
+    premium = [max(1, int(seats_per_flight * share)) for share in CABIN_SHARES[1:]]
+    return (seats_per_flight - sum(premium), *premium)
+
+
+def seat_template(layout: Sequence[int]) -> List[Tuple[str, str, float]]:
+    """
+    (seat_number, travel_class, seat_price) for every seat of a cabin with
+    layout[i] seats of SEAT_CLASSES[i]: E1..E5, B6..B10, F11..F15 for the
+    sample layout, priced 1000 + 200 per seat number.
+    """
+    template = []
+    seat_number = 1
+    for travel_class, count in zip(SEAT_CLASSES, layout):
+        for _ in range(count):
+            template.append((f"{travel_class[0]}{seat_number}", travel_class, 1000 + seat_number * 200))
+            seat_number += 1
+    return template
+
+
+def seat_rows(flight_id: int, seats_per_class: int = SEATS_PER_CLASS) -> List[Dict]:
+    """
+    Seat rows for a new flight, ready for a Core executemany insert.
+    Same layout as the sample data: seats_per_class seats of every class.
+    """
+    return [
+        {
+            "flight_id": flight_id,
+            "seat_number": seat_number,
+            "travel_class": travel_class,
+            "is_booked": 0,
+            "seat_price": seat_price,
+        }
+        for seat_number, travel_class, seat_price in seat_template((seats_per_class,) * len(SEAT_CLASSES))
+    ]
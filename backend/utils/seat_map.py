@@ -0,0 +1,208 @@
+# backend/utils/seat_map.py
+import threading
+import zlib
+from array import array
+from collections import OrderedDict
+from typing import Callable, Dict, Iterable, List, Optional
+
+from sqlalchemy.orm import Session
+from backend import models
+
+SEAT_CLASSES = ("Economy", "Business", "First")
+
+# Seat maps kept in memory at once (least recently used are dropped)
+SEAT_MAP_CACHE_SIZE = 2048
+
+
+class SeatMap:
+    """
+    Compact seat inventory for one flight.
+
+    Seats are kept in seat_id order in parallel arrays (ids, numbers, class
+    codes, prices); booked/held seats are the set bits of a single int
+    bitset, and every class has its own bit mask. Free-seat and adjacency
+    queries are a handful of big-int operations instead of per-seat loops.
+    """
+
+    __slots__ = ("flight_id", "seat_ids", "seat_numbers", "classes", "prices",
+                 "booked", "_index", "_class_masks", "_etag")
+
+    def __init__(self, flight_id: int, seats: Iterable[tuple]):
+        """seats: (seat_id, seat_number, travel_class, seat_price, is_booked) in seat_id order."""
+        self.flight_id = flight_id
+        self.seat_ids = array("q")
+        self.seat_numbers: List[str] = []
+        self.classes = bytearray()
+        self.prices = array("d")
+        self.booked = 0
+        self._class_masks = [0] * len(SEAT_CLASSES)
+        for i, (seat_id, seat_number, travel_class, seat_price, is_booked) in enumerate(seats):
+            code = SEAT_CLASSES.index(travel_class) if travel_class in SEAT_CLASSES else 0
+            self.seat_ids.append(seat_id)
+            self.seat_numbers.append(seat_number)
+            self.classes.append(code)
+            self.prices.append(float(seat_price or 0))
+            self._class_masks[code] |= 1 << i
+            if int(is_booked or 0):
+                self.booked |= 1 << i
+        self._index = {seat_id: i for i, seat_id in enumerate(self.seat_ids)}
+        self._etag = None
+
+    def __len__(self):
+        return len(self.seat_ids)
+
+    @property
+    def etag(self) -> str:
+        """Content-based validator: the same inventory gives the same ETag in every worker."""
+        if self._etag is None:
+            state = self.booked.to_bytes((len(self) + 7) // 8 or 1, "little")
+            self._etag = f'"{self.flight_id}-{len(self)}-{zlib.crc32(state):08x}"'
+        return self._etag
+
+    def _mask(self, travel_class: Optional[str]) -> int:
+        if travel_class is None:
+            return (1 << len(self)) - 1
+        if travel_class not in SEAT_CLASSES:
+            return 0
+        return self._class_masks[SEAT_CLASSES.index(travel_class)]
+
+    def free_mask(self, travel_class: Optional[str] = None) -> int:
+        return self._mask(travel_class) & ~self.booked
+
+    def free_count(self, travel_class: Optional[str] = None) -> int:
+        return bin(self.free_mask(travel_class)).count("1")
+
+    def set_booked(self, seat_ids: Iterable[int], booked: bool):
+        """Update seats in place after a committed booking write."""
+        bits = 0
+        for seat_id in seat_ids:
+            i = self._index.get(seat_id)
+            if i is not None:
+                bits |= 1 << i
+        new_state = (self.booked | bits) if booked else (self.booked & ~bits)
+        if new_state != self.booked:
+            self.booked = new_state
+            self._etag = None
+
+    def find_adjacent(self, count: int, travel_class: Optional[str] = None, limit: int = 10) -> List[List[int]]:
+        """
+        Up to `limit` blocks of `count` adjacent free seats (consecutive in
+        seat order, same class). Bit i of `runs` is set when seats i..i+count-1
+        are all free.
+        """
+        if count <= 0:
+            return []
+        if travel_class is None:
+            masks = [self.free_mask(tc) for tc in SEAT_CLASSES]
+        else:
+            masks = [self.free_mask(travel_class)]
+
+        blocks = []
+        for free in masks:
+            runs = free
+            for k in range(1, count):
+                runs &= free >> k
+            while runs and len(blocks) < limit:
+                start = (runs & -runs).bit_length() - 1
+                blocks.append([self.seat_ids[i] for i in range(start, start + count)])
+                # next block must not overlap this one
+                runs &= ~((1 << (start + count)) - 1)
+        return blocks
+
+    def to_dict(self, travel_class: Optional[str] = None) -> Dict:
+        mask = self._mask(travel_class)
+        seats = [
+            {
+                "seat_id": self.seat_ids[i],
+                "seat_number": self.seat_numbers[i],
+                "travel_class": SEAT_CLASSES[self.classes[i]],
+                "seat_price": self.prices[i],
+                "is_booked": bool(self.booked >> i & 1),
+            }
+            for i in range(len(self))
+            if mask >> i & 1
+        ]
+        return {
+            "flight_id": self.flight_id,
+            "total_seats": len(seats),
+            "available_seats": self.free_count(travel_class),
+            "seats": seats,
+        }
+
+
+class SeatMapStore:
+    """
+    Process-wide LRU of SeatMaps, loaded lazily and updated in place by the
+    booking routes. Listeners added with add_listener() hear about every
+    change (flight ids, or None after clear()).
+    """
+
+    def __init__(self, maxsize: int = SEAT_MAP_CACHE_SIZE):
+        self.maxsize = maxsize
+        self._maps: "OrderedDict[int, SeatMap]" = OrderedDict()
+        self._writes: Dict[int, int] = {}  # per-flight write counter, guards racing loads
+        self._lock = threading.Lock()
+        self._listeners: List[Callable[[Optional[List[int]]], None]] = []
+
+    def add_listener(self, listener: Callable[[Optional[List[int]]], None]):
+        self._listeners.append(listener)
+
+    def _notify(self, flight_ids: Optional[List[int]]):
+        for listener in self._listeners:
+            listener(flight_ids)
+
+    def get(self, flight_id: int, db: Session) -> SeatMap:
+        with self._lock:
+            seat_map = self._maps.get(flight_id)
+            if seat_map is not None:
+                self._maps.move_to_end(flight_id)
+                return seat_map
+            writes_before = self._writes.get(flight_id, 0)
+
+        Seat = models.seat.Seat
+        rows = (
+            db.query(Seat.seat_id, Seat.seat_number, Seat.travel_class, Seat.seat_price, Seat.is_booked)
+            .filter(Seat.flight_id == flight_id)
+            .order_by(Seat.seat_id)
+            .all()
+        )
+        seat_map = SeatMap(flight_id, rows)
+        if not len(seat_map):
+            # unknown flight (or no seats yet): don't let bogus ids evict real maps
+            return seat_map
+        with self._lock:
+            if self._writes.get(flight_id, 0) != writes_before:
+                # a booking write landed while loading; serve this copy but don't keep it
+                return seat_map
+            self._maps[flight_id] = seat_map
+            while len(self._maps) > self.maxsize:
+                self._maps.popitem(last=False)
+        return seat_map
+
+    def mark(self, flight_id: int, seat_ids: Iterable[int], booked: bool):
+        with self._lock:
+            self._writes[flight_id] = self._writes.get(flight_id, 0) + 1
+            seat_map = self._maps.get(flight_id)
+            if seat_map is not None:
+                seat_map.set_booked(seat_ids, booked)
+        self._notify([flight_id])
+
+    def invalidate(self, flight_ids: Iterable[int]):
+        flight_ids = list(flight_ids)
+        with self._lock:
+            for fid in flight_ids:
+                self._writes[fid] = self._writes.get(fid, 0) + 1
+                self._maps.pop(fid, None)
+        if flight_ids:
+            self._notify(flight_ids)
+
+    def clear(self):
+        with self._lock:
+            for fid in self._maps:
+                self._writes[fid] = self._writes.get(fid, 0) + 1
+            self._maps.clear()
+        self._notify(None)
+
+
+# Shared store used by the routers
+seat_maps = SeatMapStore()
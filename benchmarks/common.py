@@ -0,0 +1,82 @@
+# benchmarks/common.py
+"""
+Shared pieces of the benchmark scripts: the throwaway database every run
+works on, and latency statistics.
+
+Benchmarks never touch the real flightbooking.db. They either copy it
+(--db) or, by default, generate a synthetic schedule with
+backend.populate_sample_data into a temporary directory. DATABASE_URL and
+the background-job switches are set before backend is imported, so the app
+under test is bound to that copy.
+"""
+import os
+import shutil
+import statistics
+import tempfile
+
+
+def add_database_args(parser):
+    group = parser.add_argument_group("database")
+    group.add_argument("--db", default=None,
+                       help="SQLite database to copy (default: generate a synthetic one)")
+    group.add_argument("--airports", type=int, default=20, help="synthetic: airports (max 20)")
+    group.add_argument("--flights", type=int, default=2000, help="synthetic: flights")
+    group.add_argument("--days", type=int, default=7, help="synthetic: days of schedule, starting tomorrow")
+    group.add_argument("--seats-per-flight", type=int, default=15, help="synthetic: seats per flight")
+    group.add_argument("--users", type=int, default=100, help="synthetic: users")
+    group.add_argument("--seed", type=int, default=42)
+
+
+def prepare_database(args, prefix: str = "bench_") -> str:
+    """
+    Copy or generate the benchmark database into a temporary directory and
+    point the app at it. Returns the directory; remove it with cleanup().
+    """
+    workdir = tempfile.mkdtemp(prefix=prefix)
+    db_path = os.path.join(workdir, "flightbooking.db")
+    if args.db:
+        shutil.copy(args.db, db_path)
+
+    # settings must be in place before the app is imported
+    os.environ["DATABASE_URL"] = f"sqlite:///{db_path}"
+    os.environ.setdefault("DEMAND_SIMULATOR_MODE", "off")
+    os.environ.setdefault("HOLD_REAPER_ENABLED", "0")
+    os.environ.setdefault("REPRICER_ENABLED", "0")
+    os.environ.setdefault("DB_POOL_SIZE", "20")
+    os.environ.setdefault("DB_MAX_OVERFLOW", "20")
+
+    if not args.db:
+        from backend.populate_sample_data import generate_flights
+        generate_flights(
+            args.flights,
+            seats_per_flight=args.seats_per_flight,
+            days=args.days,
+            seed=args.seed,
+            airports=args.airports,
+            users=args.users,
+        )
+    return workdir
+
+
+def cleanup(workdir: str):
+    shutil.rmtree(workdir, ignore_errors=True)
+
+
+def percentile(values, pct):
+    if not values:
+        return None
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))]
+
+
+def latency_summary(seconds) -> dict:
+    """p50/p95/p99/mean/max in milliseconds."""
+    if not seconds:
+        return {"p50": None, "p95": None, "p99": None, "mean": None, "max": None}
+    return {
+        "p50": round(percentile(seconds, 50) * 1000, 3),
+        "p95": round(percentile(seconds, 95) * 1000, 3),
+        "p99": round(percentile(seconds, 99) * 1000, 3),
+        "mean": round(statistics.mean(seconds) * 1000, 3),
+        "max": round(max(seconds) * 1000, 3),
+    }
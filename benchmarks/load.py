@@ -0,0 +1,290 @@
+# benchmarks/load.py
+"""
+In-process load driver: concurrent clients call the ASGI app directly
+(httpx.ASGITransport, no server or sockets) with a mix of
+
+    search  GET  /flights/search
+    book    POST /bookings/initiate -> /{id}/passengers -> /{id}/pay
+    cancel  POST /bookings/initiate -> /{id}/cancel
+
+    python -m benchmarks.load --requests 1000 --concurrency 32 --mix search=70,book=20,cancel=10
+    python -m benchmarks.load --db flightbooking.db --out run.json --baseline previous.json
+
+Reports p50/p95/p99 latency, throughput, status codes and SQL queries per
+request for every endpoint as JSON. With --baseline, the p50/p95 and
+queries-per-request change against an earlier report is added, so runs
+on two commits can be compared. Runs on a synthetic database (or a copy
+of --db); background jobs are off unless enabled through the environment.
+"""
+import argparse
+import asyncio
+import contextlib
+import contextvars
+import json
+import os
+import random
+import subprocess
+import sys
+import time
+from collections import Counter, defaultdict
+
+from benchmarks.common import add_database_args, cleanup, latency_summary, prepare_database
+
+# SQL statements run while serving the current request (a list so threadpool copies share it)
+_request_queries = contextvars.ContextVar("request_queries", default=None)
+
+
+def _count_query(conn, cursor, statement, parameters, context, executemany):
+    counter = _request_queries.get()
+    if counter is not None:
+        counter[0] += 1
+
+
+def _parse_mix(value: str) -> dict:
+    mix = {}
+    for part in value.split(","):
+        name, _, weight = part.partition("=")
+        if name not in ("search", "book", "cancel"):
+            raise argparse.ArgumentTypeError(f"unknown scenario {name!r}")
+        mix[name] = int(weight or 1)
+    return mix
+
+
+def _git_revision():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                              check=True, cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip()
+    except Exception:
+        return None
+
+
+class LoadDriver:
+    def __init__(self, client, search_targets, free_seats, rng):
+        self.client = client
+        self.search_targets = search_targets
+        self.free_seats = free_seats        # {flight_id: [seat_id, ...]} handed out without overlap
+        self.rng = rng
+        self.latencies = defaultdict(list)
+        self.statuses = defaultdict(Counter)
+        self.queries = defaultdict(list)
+        self.skipped = Counter()
+
+    async def call(self, endpoint: str, method: str, url: str, **kwargs):
+        counter = [0]
+        token = _request_queries.set(counter)
+        start = time.perf_counter()
+        try:
+            response = await self.client.request(method, url, **kwargs)
+        finally:
+            elapsed = time.perf_counter() - start
+            _request_queries.reset(token)
+        self.latencies[endpoint].append(elapsed)
+        self.statuses[endpoint][response.status_code] += 1
+        self.queries[endpoint].append(counter[0])
+        return response
+
+    def _take_seats(self, count: int):
+        flights = [fid for fid, seats in self.free_seats.items() if len(seats) >= count]
+        if not flights:
+            return None, None
+        flight_id = self.rng.choice(flights)
+        seats = self.free_seats[flight_id]
+        taken, self.free_seats[flight_id] = seats[:count], seats[count:]
+        return flight_id, taken
+
+    async def search(self):
+        origin, destination, date = self.rng.choice(self.search_targets)
+        params = {"origin": origin, "destination": destination, "date": date, "limit": 20}
+        sort_by = self.rng.choice([None, "price", "duration"])
+        if sort_by:
+            params["sort_by"] = sort_by
+        await self.call("GET /flights/search", "GET", "/flights/search", params=params)
+
+    async def _initiate(self, scenario: str):
+        flight_id, seat_ids = self._take_seats(self.rng.choice([1, 1, 2]))
+        if flight_id is None:
+            self.skipped[scenario] += 1
+            return None
+        response = await self.call("POST /bookings/initiate", "POST", "/bookings/initiate", json={
+            "user_id": self.rng.randint(1, 50), "flight_id": flight_id, "seat_ids": seat_ids,
+        })
+        if response.status_code != 201:
+            return None
+        return response.json()
+
+    async def book(self):
+        booking = await self._initiate("book")
+        if booking is None:
+            return
+        booking_id = booking["booking_id"]
+        travellers = [
+            {"first_name": f"Bench{i}", "last_name": "Traveller", "email": f"bench{i}@example.com"}
+            for i in range(len(booking["reserved_seat_ids"]))
+        ]
+        response = await self.call("POST /bookings/{id}/passengers", "POST", f"/bookings/{booking_id}/passengers",
+                                   json={"booking_id": booking_id, "travellers": travellers})
+        if response.status_code != 200:
+            return
+        await self.call("POST /bookings/{id}/pay", "POST", f"/bookings/{booking_id}/pay",
+                        json={"booking_id": booking_id, "simulate_success": True})
+
+    async def cancel(self):
+        booking = await self._initiate("cancel")
+        if booking is None:
+            return
+        await self.call("POST /bookings/{id}/cancel", "POST", f"/bookings/{booking['booking_id']}/cancel")
+
+    async def run(self, jobs, concurrency: int) -> float:
+        queue = asyncio.Queue()
+        for job in jobs:
+            queue.put_nowait(job)
+
+        async def worker():
+            while True:
+                try:
+                    job = queue.get_nowait()
+                except asyncio.QueueEmpty:
+                    return
+                await getattr(self, job)()
+
+        start = time.perf_counter()
+        await asyncio.gather(*(worker() for _ in range(concurrency)))
+        return time.perf_counter() - start
+
+    def report(self, elapsed: float) -> dict:
+        endpoints = {}
+        for endpoint, latencies in sorted(self.latencies.items()):
+            queries = self.queries[endpoint]
+            statuses = self.statuses[endpoint]
+            endpoints[endpoint] = {
+                "requests": len(latencies),
+                "errors": sum(count for code, count in statuses.items() if code >= 500),
+                "status_codes": {str(code): count for code, count in sorted(statuses.items())},
+                "throughput_rps": round(len(latencies) / elapsed, 2) if elapsed else None,
+                "latency_ms": latency_summary(latencies),
+                "queries_per_request": {
+                    "mean": round(sum(queries) / len(queries), 2),
+                    "max": max(queries),
+                },
+            }
+        total = sum(len(latencies) for latencies in self.latencies.values())
+        return {
+            "elapsed_seconds": round(elapsed, 4),
+            "total_requests": total,
+            "throughput_rps": round(total / elapsed, 2) if elapsed else None,
+            "skipped_jobs": dict(self.skipped),
+            "endpoints": endpoints,
+        }
+
+
+def _compare(report: dict, baseline: dict) -> dict:
+    """Relative change (%) of p50/p95 latency and queries per request against a baseline report."""
+    def change(new, old):
+        if new is None or not old:
+            return None
+        return round((new - old) / old * 100, 1)
+
+    comparison = {"baseline_revision": baseline.get("revision")}
+    for endpoint, stats in report["endpoints"].items():
+        before = baseline.get("endpoints", {}).get(endpoint)
+        if not before:
+            continue
+        comparison[endpoint] = {
+            "p50_change_pct": change(stats["latency_ms"]["p50"], before["latency_ms"]["p50"]),
+            "p95_change_pct": change(stats["latency_ms"]["p95"], before["latency_ms"]["p95"]),
+            "queries_change_pct": change(stats["queries_per_request"]["mean"],
+                                         before["queries_per_request"]["mean"]),
+        }
+    return comparison
+
+
+def _targets(db):
+    """Searchable (origin code, destination code, day) triples and free seats per flight."""
+    from sqlalchemy import func
+    from backend.models import Airport, Flight, Seat
+
+    codes = dict(db.query(Airport.airport_id, Airport.code).all())
+    routes = (
+        db.query(Flight.origin_airport_id, Flight.destination_airport_id, func.date(Flight.departure_time))
+        .distinct().all()
+    )
+    search_targets = [(codes[o], codes[d], day) for o, d, day in routes if o in codes and d in codes]
+    free_seats = defaultdict(list)
+    for flight_id, seat_id in (db.query(Seat.flight_id, Seat.seat_id)
+                               .filter(Seat.is_booked == 0).order_by(Seat.seat_id)):
+        free_seats[flight_id].append(seat_id)
+    return search_targets, dict(free_seats)
+
+
+async def _drive(app, driver_args, jobs, concurrency):
+    import httpx
+
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        driver = LoadDriver(client, *driver_args)
+        if driver.search_targets:
+            await driver.search()  # warm-up: lazy imports, airport index, caches
+        for store in (driver.latencies, driver.statuses, driver.queries):
+            store.clear()
+        elapsed = await driver.run(jobs, concurrency)
+    return driver.report(elapsed)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    add_database_args(parser)
+    parser.add_argument("--requests", type=int, default=500, help="scenario runs (a booking flow is one run)")
+    parser.add_argument("--concurrency", type=int, default=16, help="concurrent clients")
+    parser.add_argument("--mix", type=_parse_mix, default=_parse_mix("search=70,book=20,cancel=10"),
+                        help="scenario weights, e.g. search=70,book=20,cancel=10")
+    parser.add_argument("--out", default=None, help="also write the JSON report here")
+    parser.add_argument("--baseline", default=None, help="earlier report to compare against")
+    args = parser.parse_args()
+
+    workdir = prepare_database(args, prefix="bench_load_")
+    try:
+        from sqlalchemy import event
+        from backend import config, database
+        from backend.main import app
+
+        event.listen(database.engine, "before_cursor_execute", _count_query)
+        if database.async_engine is not None:
+            event.listen(database.async_engine.sync_engine, "before_cursor_execute", _count_query)
+
+        db = database.SessionLocal()
+        try:
+            search_targets, free_seats = _targets(db)
+        finally:
+            db.close()
+
+        rng = random.Random(args.seed)
+        names = list(args.mix)
+        jobs = rng.choices(names, weights=[args.mix[name] for name in names], k=args.requests)
+        if not search_targets:
+            jobs = [job for job in jobs if job != "search"]
+
+        # app logs (slow queries, ...) go to stderr so stdout stays valid JSON
+        with contextlib.redirect_stdout(sys.stderr):
+            report = asyncio.run(_drive(app, (search_targets, free_seats, rng), jobs, args.concurrency))
+        report = {
+            "benchmark": "load",
+            "revision": _git_revision(),
+            "database": args.db or "synthetic",
+            "db_mode": config.DB_MODE,
+            "concurrency": args.concurrency,
+            "mix": args.mix,
+            **report,
+        }
+        if args.baseline:
+            with open(args.baseline) as f:
+                report["comparison"] = _compare(report, json.load(f))
+        print(json.dumps(report, indent=2))
+        if args.out:
+            with open(args.out, "w") as f:
+                json.dump(report, f, indent=2)
+    finally:
+        cleanup(workdir)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,118 @@
+# benchmarks/micro.py
+"""
+Micro-benchmarks for the pricing hot paths.
+
+    python -m benchmarks.micro --flights 5000 --repeat 5
+
+Times _parse_departure_time on every input shape it accepts, and the
+single and batch dynamic pricing calls with a cold and a warm price
+cache. Each case is run --repeat times and the best and median
+per-call times are reported as JSON (--out to also write a file).
+"""
+import argparse
+import json
+import statistics
+import time
+
+from benchmarks.common import add_database_args, cleanup, prepare_database
+
+
+def _time_case(fn, number: int, repeat: int, setup=None) -> dict:
+    """Best and median seconds per call over `repeat` runs of `number` calls."""
+    per_call = []
+    for _ in range(repeat):
+        if setup is not None:
+            setup()
+        start = time.perf_counter()
+        for _ in range(number):
+            fn()
+        per_call.append((time.perf_counter() - start) / number)
+    best = min(per_call)
+    return {
+        "calls": number,
+        "best_us": round(best * 1e6, 3),
+        "median_us": round(statistics.median(per_call) * 1e6, 3),
+        "ops_per_second": round(1 / best, 1) if best else None,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    add_database_args(parser)
+    parser.add_argument("--number", type=int, default=2000, help="calls per timing run")
+    parser.add_argument("--repeat", type=int, default=5, help="timing runs per case")
+    parser.add_argument("--out", default=None, help="also write the JSON report here")
+    args = parser.parse_args()
+
+    workdir = prepare_database(args, prefix="bench_micro_")
+    try:
+        from datetime import datetime
+        from backend.database import SessionLocal
+        from backend.models import Flight
+        from backend.utils.dynamic_pricing import (
+            _parse_departure_time, calculate_dynamic_price, calculate_dynamic_prices,
+        )
+        from backend.utils.price_cache import price_cache
+
+        number, repeat = args.number, args.repeat
+        results = {}
+
+        parse_inputs = {
+            "datetime": datetime(2025, 10, 22, 6, 30),
+            "iso_t": "2025-10-22T06:30:00",
+            "iso_space": "2025-10-22 06:30:00",
+            "invalid": "not a date",
+        }
+        for name, value in parse_inputs.items():
+            results[f"parse_departure_time[{name}]"] = _time_case(
+                lambda value=value: _parse_departure_time(value), number * 10, repeat
+            )
+
+        db = SessionLocal()
+        try:
+            flight_ids = [fid for (fid,) in db.query(Flight.flight_id).order_by(Flight.flight_id)]
+            if not flight_ids:
+                raise SystemExit("database has no flights")
+            sample = flight_ids[:: max(1, len(flight_ids) // 100)][:100]
+            cursor = {"i": 0}
+
+            def price_next():
+                cursor["i"] = (cursor["i"] + 1) % len(sample)
+                calculate_dynamic_price(sample[cursor["i"]], db)
+
+            results["calculate_dynamic_price[cold]"] = _time_case(
+                lambda: (price_cache.clear(), price_next()), max(number // 10, 1), repeat
+            )
+            results["calculate_dynamic_price[warm]"] = _time_case(
+                price_next, number, repeat, setup=lambda: [calculate_dynamic_price(fid, db) for fid in sample]
+            )
+
+            batch = flight_ids[:500]
+            cold = _time_case(lambda: calculate_dynamic_prices(batch, db, use_cache=False), 10, repeat)
+            cold["per_flight_us"] = round(cold["best_us"] / len(batch), 3)
+            results[f"calculate_dynamic_prices[{len(batch)} flights, no cache]"] = cold
+            warm = _time_case(lambda: calculate_dynamic_prices(batch, db), 10, repeat,
+                              setup=lambda: calculate_dynamic_prices(batch, db))
+            warm["per_flight_us"] = round(warm["best_us"] / len(batch), 3)
+            results[f"calculate_dynamic_prices[{len(batch)} flights, warm]"] = warm
+            flight_count = len(flight_ids)
+        finally:
+            db.close()
+
+        report = {
+            "benchmark": "micro",
+            "database": args.db or "synthetic",
+            "flights": flight_count,
+            "repeat": repeat,
+            "results": results,
+        }
+        print(json.dumps(report, indent=2))
+        if args.out:
+            with open(args.out, "w") as f:
+                json.dump(report, f, indent=2)
+    finally:
+        cleanup(workdir)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,141 @@
+# benchmarks/seat_race.py
+"""
+Seat reservation race: many clients call POST /bookings/initiate at the same
+time for overlapping seats of one flight, then the database is checked for
+double bookings.
+
+    python -m benchmarks.seat_race --clients 200 --pool 8 --seats 2
+
+Runs in-process against a temporary copy of the database (--db), so the
+real flightbooking.db is never modified. Prints a JSON report and exits
+with status 1 if any seat ended up held by more than one booking.
+"""
+import argparse
+import json
+import os
+import random
+import shutil
+import statistics
+import tempfile
+import threading
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+
+from benchmarks.common import percentile
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--db", default="flightbooking.db", help="SQLite database to copy")
+    parser.add_argument("--clients", type=int, default=200, help="concurrent clients")
+    parser.add_argument("--pool", type=int, default=8, help="contested free seats")
+    parser.add_argument("--seats", type=int, default=2, help="seats per reservation")
+    parser.add_argument("--flight-id", type=int, default=None, help="flight to race on (default: most free seats)")
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix="seat_race_")
+    try:
+        _race(args, workdir)
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+def _race(args, workdir: str):
+    db_path = os.path.join(workdir, "flightbooking.db")
+    shutil.copy(args.db, db_path)
+    # settings must be in place before the app is imported
+    os.environ["DATABASE_URL"] = f"sqlite:///{db_path}"
+    os.environ.setdefault("DEMAND_SIMULATOR_MODE", "off")
+    os.environ.setdefault("HOLD_REAPER_ENABLED", "0")
+    os.environ.setdefault("REPRICER_ENABLED", "0")
+    os.environ.setdefault("DB_POOL_SIZE", "20")
+    os.environ.setdefault("DB_MAX_OVERFLOW", "20")
+
+    from fastapi.testclient import TestClient
+    from sqlalchemy import func
+    from backend.main import app
+    from backend.database import SessionLocal
+    from backend.models.booking import Booking
+    from backend.models.seat import Seat
+    from backend.models.seat_hold import SeatHold
+    from backend.utils.seat_inventory import reconcile_inventory
+
+    db = SessionLocal()
+    try:
+        reconcile_inventory(db)  # start from consistent counters
+        flight_id = args.flight_id or (
+            db.query(Seat.flight_id).filter(Seat.is_booked == 0)
+            .group_by(Seat.flight_id).order_by(func.count().desc()).limit(1).scalar()
+        )
+        pool = [seat_id for (seat_id,) in db.query(Seat.seat_id)
+                .filter(Seat.flight_id == flight_id, Seat.is_booked == 0)
+                .order_by(Seat.seat_id).limit(args.pool)]
+    finally:
+        db.close()
+    if len(pool) < args.seats:
+        raise SystemExit(f"flight {flight_id} has fewer than {args.seats} free seats")
+
+    rng = random.Random(args.seed)
+    requests = [rng.sample(pool, args.seats) for _ in range(args.clients)]
+    barrier = threading.Barrier(args.clients)
+    client = TestClient(app)
+
+    def race(seat_ids):
+        barrier.wait()
+        start = time.perf_counter()
+        response = client.post("/bookings/initiate", json={"user_id": 1, "flight_id": flight_id, "seat_ids": seat_ids})
+        return response.status_code, time.perf_counter() - start
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=args.clients) as executor:
+        results = list(executor.map(race, requests))
+    elapsed = time.perf_counter() - started
+
+    latencies = [latency for _, latency in results]
+    statuses = Counter(code for code, _ in results)
+
+    db = SessionLocal()
+    try:
+        holders = (
+            db.query(SeatHold.seat_id, func.count())
+            .join(Booking, Booking.booking_id == SeatHold.booking_id)
+            .filter(SeatHold.seat_id.in_(pool), Booking.status.in_(["PENDING", "CONFIRMED"]))
+            .group_by(SeatHold.seat_id)
+            .all()
+        )
+        held = {seat_id: count for seat_id, count in holders}
+        booked = {seat_id for (seat_id,) in db.query(Seat.seat_id).filter(Seat.seat_id.in_(pool), Seat.is_booked == 1)}
+        drift = reconcile_inventory(db, fix=False)
+    finally:
+        db.close()
+
+    double_booked = sorted(seat_id for seat_id, count in held.items() if count > 1)
+    unheld_booked = sorted(booked - set(held))
+    report = {
+        "flight_id": flight_id,
+        "clients": args.clients,
+        "contested_seats": len(pool),
+        "seats_per_request": args.seats,
+        "status_codes": dict(sorted(statuses.items())),
+        "elapsed_seconds": round(elapsed, 4),
+        "throughput_rps": round(args.clients / elapsed, 2) if elapsed else None,
+        "latency_ms": {
+            "p50": round(percentile(latencies, 50) * 1000, 2),
+            "p95": round(percentile(latencies, 95) * 1000, 2),
+            "p99": round(percentile(latencies, 99) * 1000, 2),
+            "mean": round(statistics.mean(latencies) * 1000, 2),
+        },
+        "seats_booked": len(booked),
+        "double_booked_seats": double_booked,
+        "booked_without_hold": unheld_booked,
+        "inventory_drift": len(drift),
+    }
+    print(json.dumps(report, indent=2))
+    if double_booked or unheld_booked or drift:
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()